@@ -14,7 +14,7 @@ interface VideoRecorderProps {
     timeLeft: number; // interview timer
     setTimeLeft: React.Dispatch<React.SetStateAction<number>>; // pass in the setter for the parent's timeLeft state
     setCameraError: React.Dispatch<React.SetStateAction<string>>; // pass in the setter for the parent's cameraError state
-    onTranscriptChange?: (transcript: string, isFinal: boolean) => void; // optional callback for sending the transcript to the parent component
+    onTranscriptChange?: (transcript: string, isFinal: boolean, words?: { start: number, end: number }[]) => void; // optional callback for sending the transcript (and the timestamps of its words) to the parent component
 }
 
 /**
@@ -202,7 +202,7 @@ function VideoRecorder({startInterview, stopInterview, timeLeft, setTimeLeft, se
                 // AssemblyAI provides partial (in-progress) sentences as well as final sentences 
                 // for now, we'll only send the completed sentences
                 if (message.end_of_turn && onTranscriptChange) {
-                    onTranscriptChange(`${userData?.name || "User"}: ${message.transcript}`, true);
+                    onTranscriptChange(`${userData?.name || "User"}: ${message.transcript}`, true, message.words.map(({ start, end }) => ({ start, end })));
                 }
             });
 
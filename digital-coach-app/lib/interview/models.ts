@@ -35,6 +35,40 @@ export interface IMetrics {
   wpm: number | undefined,
 }
 
+/**
+ * Word-level timestamps of the user's speech from the live AssemblyAI transcript, as parallel arrays (one entry per word).
+ *
+ * (Note: This should match the SpeechTimings Pydantic model in /mlapi/schemas/interview.py)
+ */
+export interface ISpeechTimings {
+  starts: number[], // when each word started, in milliseconds since the transcription started
+  ends: number[], // when each word ended, in milliseconds since the transcription started
+  answers: number[], // index of the answer each word belongs to (i.e. the number of questions asked before it)
+}
+
+/**
+ * Speech-rate and pacing metrics computed by the backend from the user's word timestamps.
+ *
+ * (Note: This should match the SpeechMetrics Pydantic model in /mlapi/schemas/interview.py)
+ */
+export interface ISpeechMetrics {
+  wpm: number,
+  speaking_seconds: number,
+  rate_timeline: number[], // words per minute in each timeline_bucket_seconds window of the interview
+  timeline_bucket_seconds: number,
+  pause_count: number,
+  long_pause_count: number,
+  pause_median_ms: number | null,
+  pause_p90_ms: number | null,
+  pause_histogram: number[],
+  answer_count: number,
+  answer_words_mean: number,
+  answer_words_median: number,
+  answer_words_max: number,
+  answer_seconds_mean: number,
+  answer_seconds_max: number,
+}
+
 /**
  *  Interface of the overall sentiment analysis percentages.
  */
@@ -60,5 +94,8 @@ export interface IInterview {
   transcript: string[] | string, // transcript may either be an array of dialogues from avatar and user or a single long string
   sentiment: string | ISentiments | undefined, // sentiment analysis (this is used to store the initial analysis and then be replaced with the sentiment percentages later)
   url: string | undefined,
-  is_analyzed: boolean // flag representing when the interview is done being analyzed
+  is_analyzed: boolean, // flag representing when the interview is done being analyzed
+  analysis_outcome?: Record<string, "full" | "degraded" | "shed"> // analysis stage -> how it ran, only stages that started past their deadline are recorded
+  turn_index?: object // speaker turns of the transcript parsed by the backend for its analysis tasks (not used by the app)
+  speech_metrics?: ISpeechMetrics | null // computed by the backend when the word timestamps were sent with the interview
 }
\ No newline at end of file
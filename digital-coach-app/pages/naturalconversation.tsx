@@ -1,4 +1,4 @@
-import { useState } from "react";
+import { useRef, useState } from "react";
 import AuthGuard from "@App/lib/auth/AuthGuard";
 import { v4 as uuidv4 } from "uuid";
 import styles from "@App/styles/interview/NaturalConversationPage.module.scss";
@@ -9,7 +9,7 @@ import { CircleAlert } from "lucide-react";
 import { MAX_SESSION_TIME } from "@App/components/video";
 import { useAuth } from "@App/lib/auth/AuthContextProvider";
 import Spinner from "@App/components/atoms/Spinner";
-import { IInterview } from "@App/lib/interview/models";
+import { IInterview, ISpeechTimings } from "@App/lib/interview/models";
 import { computeWPM } from "@App/util/computeMetrics";
 
 export default function NaturalConversationPage() {
@@ -24,6 +24,10 @@ export default function NaturalConversationPage() {
   const [isLoading, setIsLoading] = useState(false);
   const [loadingMessage, setLoadingMessage] = useState("");
   const host = process.env.NEXT_PUBLIC_HOST;
+  const [interviewId] = useState(() => uuidv4()); // created up front so the interview's answers can be analyzed while it's in progress
+  const turnSeq = useRef(0); // sequence number of the next final turn sent to the backend
+  const questionCount = useRef(0); // number of interviewer turns so far, i.e. the answer the user's next words belong to
+  const speechTimings = useRef<ISpeechTimings>({ starts: [], ends: [], answers: [] }); // timestamps of the user's words for the backend's speech metrics
 
   /**
    * Requests backend to get a session token from HeyGen LiveAvatar API.
@@ -62,7 +66,7 @@ export default function NaturalConversationPage() {
     const wpm = computeWPM(fullTranscript, duration, userData ? userData.name : "User");
 
     const newInterview: IInterview = {
-      id: uuidv4(), // create intreview id
+      id: interviewId, // same id the live turns were sent with
       date: new Date().toLocaleDateString("en-US", {
         month: "2-digit",
         day: "2-digit",
@@ -90,6 +94,7 @@ export default function NaturalConversationPage() {
     const req = {
       userId: user!.uid,
       interview: newInterview,
+      speech: speechTimings.current.starts.length > 0 ? speechTimings.current : undefined,
     }
     // submit new interview to backend
     setIsLoading(true);
@@ -127,15 +132,43 @@ export default function NaturalConversationPage() {
       return `${mins}:${secs}`;
   }
 
+  /**
+   * Sends a final turn to the backend so each answer is analyzed as soon as the user finishes it. The turn is still part of the
+   * transcript submitted at the end of the interview, so a turn that fails to send is analyzed then instead.
+   * @param transcript Final transcript of the turn, including the speaker
+   */
+  const sendLiveTurn = (transcript: string) => {
+    if (!user) return;
+    const seq = turnSeq.current++;
+    fetch(`${host}/api/interview/live/${interviewId}/turns`, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify({ user_id: user.uid, turns: [{ seq, text: transcript }] }),
+    }).catch((error) => console.error(`Failed to send live turn: ${error}`));
+  }
+
   /**
    * Handler for when transcript is updated during the interview. AssemblyAI uses turn-based transcription where each turn is represented as a turn event. Each turn has its own partial/final transcript where a partial transcript are intermediate results that may change when more audio gets processed and the final transcript is the true final transcript for this turn. 
    * @param transcript New transcript segment, this will include the speaker (e.g. "Interviewer": "Hey Adora!")
    * @param isFinal Boolean indicating whether this segment is the final transcript for the current turn.
+   * @param words Timestamps of the words of the user's turns (the interviewer's turns don't have any)
    */
-  const updateTranscript = (transcript: string, isFinal: boolean) => {
+  const updateTranscript = (transcript: string, isFinal: boolean, words?: { start: number, end: number }[]) => {
     // only add the final transcript for this turn to the overall transcript
     if (isFinal) {
+      if (words) {
+        for (const { start, end } of words) {
+          speechTimings.current.starts.push(start);
+          speechTimings.current.ends.push(end);
+          speechTimings.current.answers.push(questionCount.current);
+        }
+      } else {
+        questionCount.current++;
+      }
       setFullTranscript((prevTranscript) => `${prevTranscript}${transcript}\n`); 
+      sendLiveTurn(transcript);
     }
   }
 
@@ -0,0 +1,3 @@
+"""
+Benchmarks for the backend. Run them from the backend's root directory, e.g. `python -m benchmarks.worker_startup`.
+"""
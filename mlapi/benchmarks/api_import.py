@@ -0,0 +1,51 @@
+"""
+Benchmarks how long importing the API (main.py) takes, i.e. how long the process needs before it can serve /healthz.
+
+Each run imports the API in a fresh interpreter with `-X importtime` so the slowest imports show what to load lazily next.
+Importing the API must not connect to Redis or Firebase, so this runs without either being up.
+
+Run with `python -m benchmarks.api_import --runs 5` inside the API's container.
+"""
+import sys
+import argparse
+import statistics
+import subprocess
+
+
+def import_api() -> dict[str, int]:
+    """
+    Import the API in a fresh interpreter.
+
+    Returns:
+        cumulative (dict[str, int]): Microseconds each module took to import, including the modules it imported
+    """
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"Importing the API failed:\n{process.stderr}")
+
+    cumulative = {}
+    for line in process.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, module = line[len("import time:"):].split("|")
+        cumulative[module.strip()] = int(cumulative_us)
+    return cumulative
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark how long importing the API takes.")
+    parser.add_argument("--runs", type=int, default=5, help="number of fresh imports")
+    parser.add_argument("--top", type=int, default=15, help="number of slowest top-level imports to show")
+    args = parser.parse_args()
+
+    runs = [import_api() for _ in range(args.runs)]
+    totals = [run["main"] / 1000 for run in runs]
+    print(f"import main: median={statistics.median(totals):.1f}ms min={min(totals):.1f}ms max={max(totals):.1f}ms")
+
+    # slowest packages, nested modules are already counted in their package's cumulative time
+    last = runs[-1]
+    packages = {module: us for module, us in last.items() if "." not in module and module != "main"}
+    print(f"slowest imports (last run):")
+    for module, us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {module:<40} {us / 1000:8.1f}ms")
@@ -0,0 +1,107 @@
+"""
+Benchmarks a candidate model for an analysis stage against a reference model on a local corpus, to decide whether the stage can be
+routed to it (see services.llm_client.get_routes and LLM_ROUTE_<STAGE>).
+
+Every input of the corpus is sent to both models with the stage's prompt. The latency of each model, the share of valid responses, and
+how much the candidate's results agree with the reference's are reported. Agreement is between 0 and 1 and depends on the stage: the
+share of sentences with the same sentiment, or how close the counts and scores are.
+
+The corpus is a JSON Lines file with one {"text": ...} per line, each text being what the stage sends to the LLM (the candidate's lines,
+or "QUESTION: ...\nANSWER: ..." for STAR). Without a corpus, the stage's sample input from benchmarks.prompts is used.
+
+Run with `python -m benchmarks.model_routing --stage filler_hedge --candidate ai/qwen3:0.6B --corpus answers.jsonl` inside the worker's
+container.
+
+No results yet: no candidate model has been compared against a runner, so every route should stay unset (the default MODEL) until
+this benchmark shows a candidate is valid and agrees with it.
+"""
+import json
+import time
+import argparse
+import statistics
+from pydantic import BaseModel
+from services.llm_client import RESPONSE_MODELS, build_messages, complete_with, get_model_name, get_routes, parse_routes
+from tasks.prompts import TASK_PROMPTS
+from benchmarks.prompts import SAMPLE_INPUTS
+
+
+def agreement(stage: str, reference: BaseModel, candidate: BaseModel) -> float:
+    """
+    How much a candidate's result agrees with the reference's, between 0 (not at all) and 1 (the same).
+    """
+    if stage == "sentiment":
+        sentences = max(len(reference.sentiment_analysis), len(candidate.sentiment_analysis))
+        if sentences == 0:
+            return 1.0
+        same = sum(a.sentiment == b.sentiment for a, b in zip(reference.sentiment_analysis, candidate.sentiment_analysis))
+        return same / sentences
+    if stage == "filler_hedge":
+        expected = reference.filler_count + reference.hedge_count
+        actual = candidate.filler_count + candidate.hedge_count
+        return max(0.0, 1 - abs(expected - actual) / max(expected, 1))
+    if stage == "competency":
+        competencies = ("clarity", "confidence", "engagement")
+        return 1 - sum(abs(getattr(reference, c).score - getattr(candidate, c).score) for c in competencies) / (10 * len(competencies))
+    if stage == "star":
+        return 1 - abs(reference.score - candidate.score) / 10
+    if stage == "overall":
+        return 1 - abs(reference.overall_score - candidate.overall_score) / 100
+    raise ValueError(f"Unknown stage {stage}")
+
+
+def run(stage: str, route: tuple[str, str], text: str) -> tuple[float, BaseModel | None]:
+    """
+    Send one input of the corpus to a model and report the latency (in milliseconds) and the validated result (None if invalid).
+    """
+    prompt, response_model = TASK_PROMPTS[stage]
+    model, base_url = route
+    start = time.perf_counter()
+    try:
+        content = complete_with(model, base_url, build_messages(prompt, text), response_model, text)
+        return (time.perf_counter() - start) * 1000, response_model.model_validate_json(content)
+    except ValueError: # invalid or cut off (ResponseTruncatedError)
+        return (time.perf_counter() - start) * 1000, None
+
+
+def summarize(name: str, route: tuple[str, str], latencies: list[float], valid: int, total: int) -> None:
+    p90 = statistics.quantiles(latencies, n=10)[-1] if len(latencies) > 1 else latencies[0]
+    print(f"{name:<10} {route[0]:<30} latency: median={statistics.median(latencies):8.1f}ms p90={p90:8.1f}ms | valid={valid / total:4.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark a candidate model for a stage against a reference model.")
+    parser.add_argument("--stage", required=True, choices=list(RESPONSE_MODELS), help="analysis stage")
+    parser.add_argument("--candidate", required=True, help="candidate route, <model>@<base url> or <model> (at LM_BASE_URL)")
+    parser.add_argument("--reference", help="reference route, defaults to the default MODEL")
+    parser.add_argument("--corpus", help="JSON Lines file of {\"text\": ...} inputs, defaults to the stage's sample input")
+    args = parser.parse_args()
+
+    candidate = parse_routes(args.candidate)[0]
+    reference = parse_routes(args.reference)[0] if args.reference else parse_routes(get_model_name())[0]
+    if args.corpus:
+        with open(args.corpus) as corpus:
+            texts = [json.loads(line)["text"] for line in corpus if line.strip()]
+    else:
+        texts = [SAMPLE_INPUTS[args.stage]]
+
+    reference_latencies, candidate_latencies = [], []
+    reference_valid = candidate_valid = 0
+    agreements = []
+    for text in texts:
+        reference_ms, reference_result = run(args.stage, reference, text)
+        candidate_ms, candidate_result = run(args.stage, candidate, text)
+        reference_latencies.append(reference_ms)
+        candidate_latencies.append(candidate_ms)
+        reference_valid += reference_result is not None
+        candidate_valid += candidate_result is not None
+        if reference_result is not None:
+            # an invalid candidate result disagrees completely
+            agreements.append(agreement(args.stage, reference_result, candidate_result) if candidate_result is not None else 0.0)
+
+    print(f"stage={args.stage}, {len(texts)} inputs, currently routed to {', '.join(model for model, _ in get_routes(args.stage))}")
+    summarize("reference", reference, reference_latencies, reference_valid, len(texts))
+    summarize("candidate", candidate, candidate_latencies, candidate_valid, len(texts))
+    if agreements:
+        print(f"agreement: mean={statistics.mean(agreements):.2f} min={min(agreements):.2f}")
+    speedup = statistics.median(reference_latencies) / statistics.median(candidate_latencies)
+    print(f"candidate is {speedup:.1f}x {'faster' if speedup >= 1 else 'slower'} than the reference")
@@ -0,0 +1,73 @@
+"""
+Benchmarks the prefill time of an interview's transcript stages (sentiment, competency, filler/hedge) with and without the prefix-stable
+prompt layout (see services.llm_client.build_messages and cache_options).
+
+Without the mode, every stage sends its instructions before the transcript and the runner prefills the whole prompt every time. With
+it, the transcript is a prefix shared by the stages, pinned to one slot, so only the first stage prefills it. The stages run one after
+another, like they do when a single worker picks them up. Every run uses a different transcript so nothing is cached between runs.
+
+Run with `python -m benchmarks.prefix_cache --runs 3 --answers 8` inside the worker's container, against a llama.cpp-based runner.
+
+No results yet: the benchmark hasn't been run against a runner, so the prefill time the prefix-stable layout saves is unverified.
+"""
+import time
+import uuid
+import argparse
+import statistics
+from services.llm_client import build_messages, cache_options, get_llm_client, get_model_name, get_response_format
+from tasks.prompts import TASK_PROMPTS
+from benchmarks.prompts import ANSWER
+
+STAGES = ("sentiment", "competency", "filler_hedge") # stages that analyze the candidate's lines of the transcript
+
+
+def run_stages(transcript: str, prefix_cache: bool) -> list[dict]:
+    """
+    Send every transcript stage's request for one interview and report each one's prefill time and cached prompt tokens.
+    """
+    cache_key = str(uuid.uuid4()) # a new interview
+    results = []
+    for stage in STAGES:
+        prompt, response_model = TASK_PROMPTS[stage]
+        start = time.perf_counter()
+        response = get_llm_client().chat.completions.create(
+            model=get_model_name(),
+            messages=build_messages(prompt, transcript, prefix_cache),
+            response_format=get_response_format(response_model),
+            max_tokens=2048,
+            extra_body=cache_options(cache_key, prefix_cache) or {"cache_prompt": False},
+        )
+        elapsed = (time.perf_counter() - start) * 1000
+        timings = (response.model_extra or {}).get("timings") or {}
+        results.append({
+            "prefill_ms": timings.get("prompt_ms", elapsed),
+            "cached_tokens": timings.get("cache_n", 0),
+            "prompt_tokens": response.usage.prompt_tokens if response.usage else 0,
+        })
+    return results
+
+
+def summarize(name: str, runs: list[list[dict]]) -> None:
+    for i, stage in enumerate(STAGES):
+        prefill = statistics.median(run[i]["prefill_ms"] for run in runs)
+        cached = statistics.median(run[i]["cached_tokens"] for run in runs)
+        tokens = statistics.median(run[i]["prompt_tokens"] for run in runs)
+        print(f"{name:<10} {stage:<13} prefill={prefill:8.1f}ms cached={cached:6.0f}/{tokens:.0f} tokens")
+    total = statistics.median(sum(result["prefill_ms"] for result in run) for run in runs)
+    print(f"{name:<10} {'all stages':<13} prefill={total:8.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark prefill time with and without the prefix-stable prompt layout.")
+    parser.add_argument("--runs", type=int, default=3, help="interviews per mode")
+    parser.add_argument("--answers", type=int, default=8, help="answers per interview, i.e. the transcript's length")
+    args = parser.parse_args()
+
+    modes = {"classic": [], "prefix": []}
+    for run in range(args.runs):
+        for name, prefix_cache in (("classic", False), ("prefix", True)):
+            transcript = "\n".join(f"({name} {run}.{answer}) {ANSWER}" for answer in range(args.answers)) # unique per run and mode
+            modes[name].append(run_stages(transcript, prefix_cache))
+
+    for name, runs in modes.items():
+        summarize(name, runs)
@@ -0,0 +1,114 @@
+"""
+Benchmarks the size of every task's system prompt (see tasks.prompts) and, against a running LLM, the prefill time and output validity
+of the current prompts compared to the prompts of another commit.
+
+Without --llm, only the prompts' estimated token counts are reported. With --llm, every task's prompt is sent with a sample input to
+the LLM runner configured by LM_BASE_URL and MODEL, and the prompt tokens and prefill time it reports (llama.cpp's timings, falling back
+to the request's latency) are compared along with the share of responses that validate against the task's response model.
+
+Run with `python -m benchmarks.prompts --baseline-ref HEAD~1 --llm --runs 5` inside the worker's container.
+
+Only the offline estimates have been measured so far: the compact prompts are about half the size of the prompts they replaced, e.g.
+sentiment ~138 tokens instead of ~350 and overall ~330 instead of ~664. The --llm comparison hasn't been run against a runner yet, so
+the prefill time saved and whether the responses are still as often valid are unverified.
+"""
+import time
+import argparse
+import statistics
+import subprocess
+from tasks.prompts import TASK_PROMPTS, PROMPT_VERSION
+from utils.tokens import estimateTokens
+
+# task -> name of its prompt in tasks.prompts
+PROMPT_NAMES = {
+    "sentiment": "SENTIMENT_ANALYSIS_PROMPT",
+    "star": "STAR_ANSWER_PROMPT",
+    "competency": "COMPETENCY_FEEDBACK_PROMPT",
+    "filler_hedge": "FILLER_HEDGE_COUNT_PROMPT",
+    "overall": "OVERALL_FEEDBACK_PROMPT",
+}
+
+ANSWER = (
+    "Um, so at my last job our release was, like, blocked because two engineers disagreed on the database design. I guess my task was "
+    "to get us unblocked before the deadline. I set up a design review, you know, where both of them presented their trade-offs, and "
+    "I think we picked a hybrid. We shipped on time and the on-call pages dropped by about thirty percent."
+)
+QUESTION = "Tell me about a time you resolved a conflict on your team."
+
+# task -> sample input, shaped like what the task sends as its user message
+SAMPLE_INPUTS = {
+    "sentiment": ANSWER,
+    "star": f"QUESTION: {QUESTION}\nANSWER: {ANSWER}",
+    "competency": ANSWER,
+    "filler_hedge": ANSWER,
+    "overall": (
+        "COMPETENCIES (score out of 10: summary):\n- STAR: 7: You described the situation well but rushed the result.\n"
+        "- Clarity: 8: You communicated clearly.\n- Confidence: 6: Hedging undermined your points.\n- Engagement: 7: You stayed on topic.\n"
+        "SENTIMENT: 60% positive, 30% neutral, 10% negative sentences\nWPM: 142\n"
+        f"FILLER WORDS: 3, HEDGE PHRASES: 2, MOST FREQUENT: um, like, i guess\nEXCERPT OF THE CANDIDATE'S ANSWERS: {ANSWER}"
+    ),
+}
+
+
+def baseline_prompts(ref: str) -> dict[str, str]:
+    """
+    Get the prompts of another commit, by task. Tasks that didn't have a prompt in that commit are left out.
+    """
+    source = subprocess.run(["git", "show", f"{ref}:./tasks/prompts.py"], capture_output=True, text=True, check=True).stdout
+    namespace = {}
+    exec(compile(source, f"{ref}:tasks/prompts.py", "exec"), namespace)
+    return {task: namespace[name] for task, name in PROMPT_NAMES.items() if name in namespace}
+
+
+def measure(prompt: str, task: str, runs: int) -> dict:
+    """
+    Send a task's prompt with its sample input to the LLM and report the median prompt tokens and prefill time, and the share of valid
+    responses.
+    """
+    from services.llm_client import get_llm_client, get_model_name, get_response_format
+
+    response_model = TASK_PROMPTS[task][1]
+    messages = [{"role": "system", "content": prompt}, {"role": "user", "content": SAMPLE_INPUTS[task]}]
+    tokens, prefill, valid = [], [], 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        response = get_llm_client().chat.completions.create(
+            model=get_model_name(),
+            messages=messages,
+            response_format=get_response_format(response_model),
+            max_tokens=2048,
+            extra_body={"cache_prompt": False}, # measure the full prefill on every run
+        )
+        elapsed = (time.perf_counter() - start) * 1000
+        timings = (response.model_extra or {}).get("timings") or {}
+        prefill.append(timings.get("prompt_ms", elapsed))
+        tokens.append(response.usage.prompt_tokens if response.usage else 0)
+        try:
+            response_model.model_validate_json(response.choices[0].message.content)
+            valid += 1
+        except ValueError:
+            pass
+    return {"tokens": statistics.median(tokens), "prefill_ms": statistics.median(prefill), "valid": valid / runs}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the size, prefill time, and output validity of the task prompts.")
+    parser.add_argument("--baseline-ref", help="git commit to compare the prompts against, e.g. HEAD~1")
+    parser.add_argument("--llm", action="store_true", help="send the prompts to the LLM runner")
+    parser.add_argument("--runs", type=int, default=5, help="requests per task and prompt with --llm")
+    args = parser.parse_args()
+
+    baseline = baseline_prompts(args.baseline_ref) if args.baseline_ref else {}
+    print(f"prompt version {PROMPT_VERSION}")
+    for task, (prompt, _) in TASK_PROMPTS.items():
+        line = f"{task:<13} current ~{estimateTokens(prompt):5d} tokens"
+        if task in baseline:
+            line += f" | {args.baseline_ref} ~{estimateTokens(baseline[task]):5d} tokens"
+        print(line)
+
+        if args.llm:
+            for name, variant in (("current", prompt), (args.baseline_ref, baseline.get(task))):
+                if variant is None:
+                    continue
+                result = measure(variant, task, args.runs)
+                print(f"    {name:<11} prompt={result['tokens']:6.0f} tokens prefill={result['prefill_ms']:8.1f}ms valid={result['valid']:4.0%}")
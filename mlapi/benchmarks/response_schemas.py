@@ -0,0 +1,90 @@
+"""
+Benchmarks the CPU each analysis job spends on its response model: building the structured output JSON schema and validating the LLM's
+response.
+
+Per call is how jobs used to do it: the competency task defined its response model inside the task (so its schema was rebuilt on every
+call) and every task validated the response twice, once in client.beta.chat.completions.parse and again with model_validate.
+Registry is how jobs do it now (see services.llm_client.RESPONSE_FORMATS): the schemas are built when the module is imported and the
+response is validated once. The LLM's responses are synthetic but the size of real ones.
+
+Run with `python -m benchmarks.response_schemas --runs 200`.
+"""
+import json
+import time
+import argparse
+import statistics
+from pydantic import create_model
+from services.llm_client import RESPONSE_FORMATS, build_response_format, get_response_format
+from schemas import (
+    SentimentAnalysisResult,
+    CompetencyAnalysisResult,
+    FillerHedgeResponse,
+    OverallAnalysisResponse,
+    StarAnswerEvaluation,
+)
+
+COMPETENCY = {"score": 7.5, "summary": "The candidate explained their reasoning clearly and gave concrete examples. " * 3}
+
+# response model -> a response the LLM could have sent
+RESPONSES = {
+    SentimentAnalysisResult: {"sentiment_analysis": [
+        {"text": f"This is sentence number {i} of the candidate's answers.", "sentiment": "POSITIVE", "confidence": 0.87} for i in range(60)
+    ]},
+    CompetencyAnalysisResult: {"clarity": COMPETENCY, "confidence": COMPETENCY, "engagement": COMPETENCY},
+    FillerHedgeResponse: {"filler_count": 12, "hedge_count": 4, "most_frequent": ["um", "like", "i think"]},
+    OverallAnalysisResponse: {"overall_feedback": "Overall the candidate performed well. " * 10, "overall_score": 78},
+    StarAnswerEvaluation: {
+        "question": "Tell me about a time you resolved a conflict on your team.",
+        "star_breakdown": {"situation": "Two engineers disagreed.", "task": "Unblock the release.", "action": "Ran a design review.", "result": "Shipped on time."},
+        "star_percentages": {"situation_percentage": 20, "task_percentage": 20, "action_percentage": 40, "result_percentage": 20},
+        "score": 8,
+        "feedback": "Quantify the result.",
+    },
+}
+
+
+def per_call(model, content: str) -> None:
+    """
+    A job that defines its response model on every call and validates the response twice.
+    """
+    fresh = create_model(model.__name__, __base__=model) # a new class, like a model defined inside the task
+    build_response_format(fresh)
+    parsed = fresh.model_validate_json(content) # client.beta.chat.completions.parse
+    model.model_validate(parsed.model_dump()) # the task's own validation
+
+
+def registry(model, content: str) -> None:
+    """
+    A job that uses the registered JSON schema and validates the response once.
+    """
+    get_response_format(model)
+    model.model_validate_json(content)
+
+
+def measure(job, model, content: str, runs: int) -> float:
+    """
+    Median CPU time (in microseconds) of a job's response model handling.
+    """
+    samples = []
+    for _ in range(runs):
+        start = time.process_time_ns()
+        job(model, content)
+        samples.append((time.process_time_ns() - start) / 1000)
+    return statistics.median(samples)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-call vs registered response schemas.")
+    parser.add_argument("--runs", type=int, default=200, help="number of simulated jobs per model and mode")
+    args = parser.parse_args()
+
+    assert set(RESPONSES) == set(RESPONSE_FORMATS), "every registered response model needs a sample response"
+    total_per_call = total_registry = 0
+    for model, response in RESPONSES.items():
+        content = json.dumps(response)
+        slow = measure(per_call, model, content, args.runs)
+        fast = measure(registry, model, content, args.runs)
+        total_per_call += slow
+        total_registry += fast
+        print(f"{model.__name__:<26} per call={slow:8.1f}us registry={fast:8.1f}us saved={slow - fast:8.1f}us ({slow / fast:4.1f}x)")
+    print(f"{'all tasks':<26} per call={total_per_call:8.1f}us registry={total_registry:8.1f}us saved={total_per_call - total_registry:8.1f}us per job of each task")
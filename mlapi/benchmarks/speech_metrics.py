@@ -0,0 +1,57 @@
+"""
+Benchmarks computing the speech metrics (see utils.speech_metrics) of many interviews in a single vectorized batch against computing
+them one interview at a time.
+
+The word timestamps are synthetic: each interview has a few answers of words with random durations and pauses between them.
+
+Run with `python -m benchmarks.speech_metrics --interviews 5000`.
+"""
+import time
+import argparse
+import numpy as np
+from schemas import SpeechTimings
+from utils.speech_metrics import computeSpeechMetrics, computeSpeechMetricsBatch
+
+
+def synthetic_interview(rng: np.random.Generator, answers: int, words_per_answer: int) -> SpeechTimings:
+    """
+    Generate the word timestamps of an interview with the given number of answers.
+    """
+    starts, ends, answer_ids = [], [], []
+    t = 0
+    for answer in range(answers):
+        t += int(rng.integers(5000, 20000)) # the interviewer asks the next question
+        count = int(rng.integers(words_per_answer // 2, words_per_answer * 3 // 2))
+        durations = rng.integers(150, 450, count)
+        gaps = np.where(rng.random(count) < 0.1, rng.integers(250, 3000, count), rng.integers(0, 150, count))
+        word_starts = t + np.cumsum(gaps) + np.concatenate(([0], np.cumsum(durations)[:-1]))
+        starts += word_starts.tolist()
+        ends += (word_starts + durations).tolist()
+        answer_ids += [answer] * count
+        t = int(ends[-1])
+    return SpeechTimings(starts=starts, ends=ends, answers=answer_ids)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark batched vs per-interview speech metrics.")
+    parser.add_argument("--interviews", type=int, default=5000, help="number of interviews")
+    parser.add_argument("--answers", type=int, default=5, help="answers per interview")
+    parser.add_argument("--words", type=int, default=120, help="average words per answer")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    batch = [synthetic_interview(rng, args.answers, args.words) for _ in range(args.interviews)]
+    words = sum(len(timings.starts) for timings in batch)
+
+    start = time.perf_counter()
+    batched = computeSpeechMetricsBatch(batch)
+    batch_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    single = [computeSpeechMetrics(timings) for timings in batch]
+    single_seconds = time.perf_counter() - start
+
+    assert batched == single, "batched and per-interview metrics differ"
+    print(f"{args.interviews} interviews, {words} words")
+    print(f"  batch:         {batch_seconds * 1000:8.1f}ms ({words / batch_seconds / 1e6:.1f}M words/s)")
+    print(f"  per interview: {single_seconds * 1000:8.1f}ms ({words / single_seconds / 1e6:.1f}M words/s)")
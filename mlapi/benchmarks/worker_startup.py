@@ -0,0 +1,91 @@
+"""
+Benchmarks the worker's startup cost and the per-job overhead of the process RQ forks for every job, with and without preloading
+(see redisStore.preload).
+
+Each job is simulated the way RQ runs it: the worker process forks and the child does what an analysis job does before its first
+LLM request (import the task, get the LLM client and response format, initialize Firebase). The child's private dirty memory shows
+how much of the parent's memory it had to copy.
+
+Run with `python -m benchmarks.worker_startup --runs 10` inside the worker's container.
+"""
+import os
+import json
+import time
+import argparse
+import statistics
+
+
+def job_setup() -> None:
+    """
+    What an analysis job does before it sends its first request to the LLM.
+    """
+    import tasks.ml_tasks as ml_tasks
+    from services.firebase_init import initialize_firebase
+    from services.llm_client import get_llm_client, get_response_format
+
+    get_llm_client().chat.completions
+    get_response_format(ml_tasks.CompetencyAnalysisResult)
+    initialize_firebase()
+
+
+def private_dirty_kb() -> int:
+    """
+    Memory (in kB) the current process has written to since it was forked, i.e. the pages it couldn't share with its parent.
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as smaps:
+            return sum(int(line.split()[1]) for line in smaps if line.startswith("Private_Dirty"))
+    except OSError:
+        return 0 # not on Linux
+
+
+def measure_jobs(runs: int) -> list[dict]:
+    """
+    Fork a child per run that performs job_setup and report how long it took and how much memory it copied.
+    """
+    results = []
+    for _ in range(runs):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            # never return from the child, it would continue running the benchmark
+            try:
+                os.close(read_fd)
+                start = time.perf_counter()
+                job_setup()
+                result = {"seconds": time.perf_counter() - start, "private_dirty_kb": private_dirty_kb()}
+                os.write(write_fd, json.dumps(result).encode())
+            finally:
+                os._exit(0)
+
+        os.close(write_fd)
+        with os.fdopen(read_fd) as pipe:
+            output = pipe.read()
+        os.waitpid(pid, 0)
+        if not output:
+            raise RuntimeError("Simulated job failed, see its traceback above")
+        results.append(json.loads(output))
+    return results
+
+
+def summarize(name: str, results: list[dict]) -> None:
+    seconds = [result["seconds"] * 1000 for result in results]
+    memory = [result["private_dirty_kb"] for result in results]
+    print(f"{name:<12} per-job overhead: median={statistics.median(seconds):8.1f}ms max={max(seconds):8.1f}ms | copied memory: median={statistics.median(memory):8.0f}kB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark worker startup and per-job overhead with and without preloading.")
+    parser.add_argument("--runs", type=int, default=10, help="number of simulated jobs per mode")
+    args = parser.parse_args()
+
+    # without preloading every job imports and initializes everything itself (the parent must not import the tasks before this)
+    cold = measure_jobs(args.runs)
+
+    from redisStore.preload import preload
+    startup = preload()
+    preloaded = measure_jobs(args.runs)
+
+    print(f"worker startup (preload): {startup * 1000:.1f}ms")
+    summarize("cold", cold)
+    summarize("preloaded", preloaded)
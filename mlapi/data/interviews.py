@@ -4,7 +4,8 @@ Data functions related to interviews.
 
 from services.firebase_init import get_firestore_client
 from utils.logger_config import get_logger
-from schemas.interview import Interview
+from schemas.interview import Interview, AnalysisOutcome, TurnIndex
+from utils.transcript import parseTranscript, TURN_INDEX_VERSION
 from pydantic import ValidationError
 from google.cloud import firestore
 from fastapi import HTTPException, status
@@ -21,8 +22,11 @@ async def createInterview(userId: str, interview: Interview):
 
     db = get_firestore_client()
     logger.info(f"Attempting to create new interview document for user={userId}...")
+    # parse the transcript's speaker turns once so the analysis tasks don't have to
+    if interview.turn_index is None:
+        interview = interview.model_copy(update={"turn_index": parseTranscript(interview.transcript)})
     # convert interview pydantic object into a dictionary 
-    interviewData = interview.model_dump()
+    interviewData = interview.model_dump(mode="json")
     try:
         # check if user exists
         userRef = db.collection("users").document(userId)
@@ -88,6 +92,37 @@ async def getTranscriptById(user_id: str, interview_id: str) -> str:
     except Exception as e:
         raise AttributeError(f"Error getting transcript for interview={interview_id}. Reason: {e}")
 
+async def getTurnIndex(user_id: str, interview_id: str) -> TurnIndex:
+    """
+    Returns the speaker-turn index of the interview's transcript. Interviews created before the index existed (or indexed by an older parser) are parsed and their index is stored.
+
+    Args:
+        user_id (str): Id of the user that owns the interview
+        interview_id (str): Id of the interview whose transcript is indexed
+    """
+
+    try:
+        db = get_firestore_client()
+        interviewRef = db.collection("users").document(user_id).collection("interviews").document(interview_id)
+
+        # only read the fields we need instead of the whole interview
+        interviewDoc = await interviewRef.get(field_paths=["turn_index", "transcript"])
+        if not interviewDoc.exists:
+            logger.error(f"Can't find interview={interview_id}")
+            raise AttributeError(f"Can't find interview={interview_id}")
+
+        interviewData = interviewDoc.to_dict()
+        turnIndex = interviewData.get("turn_index")
+        if turnIndex and turnIndex.get("version") == TURN_INDEX_VERSION:
+            return TurnIndex.model_validate(turnIndex)
+
+        logger.info(f"Indexing transcript of interview={interview_id}...")
+        turnIndex = parseTranscript(interviewData.get("transcript"))
+        await interviewRef.update({"turn_index": turnIndex.model_dump(mode="json")})
+        return turnIndex
+    except Exception as e:
+        raise AttributeError(f"Error getting turn index for interview={interview_id}. Reason: {e}")
+
 async def getUserInterviews(user_id: str) -> list[Interview]:
     """
     Returns a list of all the user's interviews that are analyzed.
@@ -244,3 +279,26 @@ async def setIsAnalyzed(user_id: str, interview_id: str):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error occurred when getting interview."
         )
+
+async def setStageResults(user_id: str, interview_id: str, stage: str, fields: dict, outcome: AnalysisOutcome = AnalysisOutcome.FULL):
+    """
+    Write an analysis stage's results to the interview, along with how the stage ran when it didn't run fully because it started past
+    its deadline, in a single update.
+
+    Args:
+        user_id (str): Id of the user who owns the interview.
+        interview_id (str): Id of the interview being analyzed.
+        stage (str): Name of the analysis stage, e.g. "star".
+        fields (dict): Fields of the interview to update, e.g. {"metrics.filler_count": 3}, empty if the stage was shed.
+        outcome (AnalysisOutcome): Whether the stage ran fully, was degraded, or was shed.
+    """
+    db = get_firestore_client()
+
+    # get reference to interview
+    interviewRef = db.collection("users").document(user_id).collection("interviews").document(interview_id)
+    if outcome != AnalysisOutcome.FULL:
+        fields = {**fields, f"analysis_outcome.{stage}": outcome.value}
+    if fields:
+        await interviewRef.update(fields)
+    if outcome != AnalysisOutcome.FULL:
+        logger.info(f"Recorded outcome={outcome.value} of stage={stage} on interview={interview_id}")
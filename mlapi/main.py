@@ -1,8 +1,13 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, status
 from fastapi.middleware.cors import CORSMiddleware
-from services.firebase_init import initialize_firebase # initialize Firebase connection when backend starts
-from rq_dashboard_fast import RedisQueueDashboard
-from tasks.seed import start_seed
+from fastapi.responses import JSONResponse
+from services.readiness import Readiness
+from redisStore.myconnection import get_redis_url, close_async_pool
+from services.http_client import close_http_client
+from services.heygen import session_tokens
+from services.assemblyai import streaming_tokens
+from services.events import stage_events
 
 from routes import (
     user,
@@ -12,6 +17,7 @@ from routes import (
     assemblyai,
     llm,
     interview,
+    jobs,
 )
 
 
@@ -23,10 +29,30 @@ AssemblyAI provides the simple transcription service.
 Provided feedback is Star Scores, competency scores, and statistical feedback.  
 """
 
+readiness = Readiness()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Handles any setup that needs to occur when the FastAPI server starts, e.g. setting up Firebase Admin SDK.
+    Setup runs in the background so the server starts accepting requests right away, see /readyz for when it's done.
+    """
+    readiness.start()
+    session_tokens.start() # pre-mint HeyGen session tokens
+    streaming_tokens.start() # pre-mint AssemblyAI temporary tokens
+    yield
+    await streaming_tokens.stop()
+    await session_tokens.stop()
+    await readiness.stop()
+    await stage_events.stop()
+    await close_async_pool()
+    await close_http_client()
+
 app = FastAPI(
     title="MLAPI",
     description=api_description,
     version="0.1.0",
+    lifespan=lifespan,
 )
 app.add_middleware(
     CORSMiddleware,
@@ -37,25 +63,34 @@ app.add_middleware(
 )
 
 
-@app.on_event("startup")
-async def startup_event():
-    """
-    Handles any setup that needs to occur when the FastAPI server starts, e.g. setting up Firebase Admin SDK.
-    """
-    
-    # Initializes Firebase Admin SDK
-    print("Initializing Firebase Admin SDK...")
-    initialize_firebase()
-    print("Firebase Admin SDK initialized")
-
 @app.get("/")
 def root():
     return {
         "message": "Welcome to the Digital Coach API, please see '/docs' for information on the server's endpoints as well as being able to test them. If you want to access the Redis Queue (RQ) Dashboard to monitor your jobs, please see '/rq'. If you want to seed your database, please see '/seed'."
     }
 
+@app.get("/healthz")
+def healthz():
+    """
+    Liveness check, the process is up and serving requests (its subsystems may still be starting).
+    """
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """
+    Readiness check, responds with 503 until Firebase is initialized and Redis is reachable.
+    """
+    subsystems = await readiness.check()
+    ready = all(subsystems.values())
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"status": "ready" if ready else "starting", "subsystems": subsystems},
+    )
+
 @app.get("/seed")
 async def seed():
+    from tasks.seed import start_seed # only needed when seeding, don't load the seed data on startup
     try:
         print("Seeding Firebase...")
         await start_seed()
@@ -69,10 +104,27 @@ async def seed():
         }
 
 
+class LazyDashboard:
+    """
+    ASGI app that creates the Redis Queue (RQ) Dashboard on its first request instead of when the API starts.
+
+    Args:
+        prefix (str): Path the dashboard is mounted at
+    """
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.dashboard = None
+
+    async def __call__(self, scope, receive, send):
+        if self.dashboard is None:
+            from rq_dashboard_fast import RedisQueueDashboard
+            self.dashboard = RedisQueueDashboard(get_redis_url(), self.prefix)
+        await self.dashboard(scope, receive, send)
+
 # Create Redis Queue (RQ) Dashboard to monitor RQ
-dashboard = RedisQueueDashboard("redis://redis:6379/", "/rq")
 # Access dashboard at localhost:8000/rq
-app.mount("/rq", dashboard)
+app.mount("/rq", LazyDashboard("/rq"))
 
 # Add routes here
 app.include_router(user.router)
@@ -81,4 +133,5 @@ app.include_router(audio_analysis.router)
 app.include_router(heygen.router)
 app.include_router(assemblyai.router)
 app.include_router(llm.router)
-app.include_router(interview.router)
\ No newline at end of file
+app.include_router(interview.router)
+app.include_router(jobs.router)
\ No newline at end of file
@@ -0,0 +1,204 @@
+"""
+Circuit breaker around the LLM runners and a global retry budget for analysis jobs, both shared by every worker through Redis.
+
+Each runner endpoint has a circuit. While it's closed, requests go through and consecutive failures are counted, only the ones that
+say the runner itself is unhealthy (it's unreachable, timed out, or failed, see services.llm_client.CIRCUIT_ERRORS). After
+CIRCUIT_FAILURE_THRESHOLD failures in a row the circuit opens and requests fail fast with CircuitOpenError for CIRCUIT_OPEN_SECONDS,
+instead of every stage of every interview hammering a runner that's down. Then the circuit is half-open: a single request (the probe)
+is let through, closing the circuit if it succeeds or opening it again if it fails. A probe that fails for any other reason (e.g. the
+runner rejected the request) is released so the next request probes the runner instead. Jobs whose requests hit an open circuit are
+parked by the worker (see redisStore.worker.AnalysisJob) until the circuit may let requests through again, without using up their
+retries.
+
+Failed jobs are retried with jittered exponential backoff through RQ's scheduler (see redisStore.queue.get_retry). Each retry spends a
+token of the retry budget and each successful job earns RETRY_BUDGET_RATIO of a token, so retries can't exceed that share of the work
+that's succeeding. When the budget is spent, failed jobs fail right away instead of retrying.
+"""
+import os
+import time
+from redis import Redis
+from dotenv import load_dotenv
+from utils.logger_config import get_logger
+
+load_dotenv() # load environment variables
+logger = get_logger(__name__)
+
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 5)) # consecutive failed requests that open a circuit
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", 30)) # seconds an open circuit rejects requests before letting a probe through
+CIRCUIT_PROBE_TIMEOUT = int(os.getenv("CIRCUIT_PROBE_TIMEOUT", 120)) # seconds a probe may take before another one is let through
+CIRCUIT_MAX_PARKS = int(os.getenv("CIRCUIT_MAX_PARKS", 120)) # times a job may be parked while circuits are open before it fails
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", 0.2)) # retry tokens earned per successful job
+RETRY_BUDGET_MAX = float(os.getenv("RETRY_BUDGET_MAX", 20)) # most retry tokens saved up, the budget starts full
+
+CIRCUIT_KEY = "circuit:{name}" # Redis hash of the circuit's state, consecutive failures, and when it was opened
+CIRCUIT_PROBE_KEY = "circuit:{name}:probe" # set while the half-open circuit's probe is in flight
+RETRY_BUDGET_KEY = "retry:budget" # retry tokens left
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# Lets a request through a closed circuit, or a single probe through a circuit that has been open for long enough. Returns whether the
+# request may be sent (1, or 2 for the probe) and, if not, the unix time to try again at
+ALLOW_SCRIPT = """
+local state = redis.call('HGET', KEYS[1], 'state') or 'closed'
+if state == 'closed' then
+    return {1, '0'}
+end
+local now, open_seconds = tonumber(ARGV[1]), tonumber(ARGV[2])
+local reopens_at = tonumber(redis.call('HGET', KEYS[1], 'opened_at') or '0') + open_seconds
+if now < reopens_at then
+    return {0, tostring(reopens_at)}
+end
+if redis.call('SET', KEYS[2], '1', 'NX', 'EX', ARGV[3]) then
+    redis.call('HSET', KEYS[1], 'state', 'half_open')
+    return {2, '0'}
+end
+return {0, tostring(now + open_seconds)}
+"""
+
+# Counts a failed request, opening the circuit after enough consecutive failures or when the half-open circuit's probe failed. Returns
+# the circuit's state
+FAILURE_SCRIPT = """
+local state = redis.call('HGET', KEYS[1], 'state') or 'closed'
+local failures = redis.call('HINCRBY', KEYS[1], 'failures', 1)
+if state == 'half_open' or (state == 'closed' and failures >= tonumber(ARGV[2])) then
+    redis.call('HSET', KEYS[1], 'state', 'open', 'opened_at', ARGV[1])
+    redis.call('DEL', KEYS[2])
+    return 'open'
+end
+return state
+"""
+
+# Spends a retry token if there's one left, the budget starts full
+SPEND_SCRIPT = """
+local tokens = tonumber(redis.call('GET', KEYS[1]) or ARGV[1])
+if tokens < 1 then
+    return 0
+end
+redis.call('SET', KEYS[1], tostring(tokens - 1))
+return 1
+"""
+
+# Earns a fraction of a retry token, up to the budget's maximum
+EARN_SCRIPT = """
+local tokens = math.min(tonumber(redis.call('GET', KEYS[1]) or ARGV[2]) + tonumber(ARGV[1]), tonumber(ARGV[2]))
+redis.call('SET', KEYS[1], tostring(tokens))
+return tostring(tokens)
+"""
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of sending a request to a runner whose circuit is open.
+
+    Args:
+        name (str): Name of the circuit, e.g. the runner's base URL
+        retry_at (float): Unix time the circuit may let a request through again
+    """
+    def __init__(self, name: str, retry_at: float):
+        super().__init__(f"Circuit {name} is open until {time.strftime('%H:%M:%S', time.localtime(retry_at))}")
+        self.name = name
+        self.retry_at = retry_at
+
+
+def circuit_keys(name: str) -> list[str]:
+    """
+    Redis keys of a circuit: its state and its probe.
+    """
+    return [CIRCUIT_KEY.format(name=name), CIRCUIT_PROBE_KEY.format(name=name)]
+
+
+def allow_request(name: str, redis_conn: Redis) -> bool:
+    """
+    Check whether a request may be sent through a circuit. Requests are allowed when Redis can't be reached so the circuit breaker
+    never takes the runners down with it.
+
+    Args:
+        name (str): Name of the circuit, e.g. the runner's base URL
+        redis_conn (Redis): Redis connection object
+    Returns:
+        probe (bool): Whether the request is the half-open circuit's probe, whose outcome must be recorded or the probe released
+    Raises:
+        CircuitOpenError: If the circuit is open, or half-open with its probe in flight
+    """
+    try:
+        allowed, retry_at = redis_conn.register_script(ALLOW_SCRIPT)(keys=circuit_keys(name), args=[time.time(), CIRCUIT_OPEN_SECONDS, CIRCUIT_PROBE_TIMEOUT])
+    except Exception as e:
+        logger.warning(f"Failed to check circuit {name}, letting the request through: {e}")
+        return False
+    if not allowed:
+        raise CircuitOpenError(name, float(retry_at))
+    return allowed == 2
+
+
+def record_success(name: str, redis_conn: Redis) -> None:
+    """
+    Close a circuit after a successful request and reset its consecutive failures.
+    """
+    try:
+        keys = circuit_keys(name)
+        with redis_conn.pipeline() as pipe:
+            pipe.hset(keys[0], mapping={"state": CLOSED, "failures": 0})
+            pipe.delete(keys[1])
+            pipe.execute()
+    except Exception as e:
+        logger.warning(f"Failed to record a successful request on circuit {name}: {e}")
+
+
+def record_failure(name: str, redis_conn: Redis) -> None:
+    """
+    Count a failed request on a circuit, opening it after CIRCUIT_FAILURE_THRESHOLD consecutive failures or a failed probe.
+    """
+    try:
+        state = redis_conn.register_script(FAILURE_SCRIPT)(keys=circuit_keys(name), args=[time.time(), CIRCUIT_FAILURE_THRESHOLD])
+    except Exception as e:
+        logger.warning(f"Failed to record a failed request on circuit {name}: {e}")
+        return
+    if state.decode() == OPEN:
+        logger.error(f"Circuit {name} is open, requests are rejected for the next {CIRCUIT_OPEN_SECONDS:g}s")
+
+
+def release_probe(name: str, redis_conn: Redis) -> None:
+    """
+    Let another probe through a half-open circuit after the probe failed in a way that says nothing about the runner's health (e.g. a
+    request it rejected), instead of waiting CIRCUIT_PROBE_TIMEOUT for the probe to expire.
+    """
+    try:
+        redis_conn.delete(CIRCUIT_PROBE_KEY.format(name=name))
+    except Exception as e:
+        logger.warning(f"Failed to release the probe of circuit {name}: {e}")
+
+
+def get_circuit(name: str, redis_conn: Redis) -> dict:
+    """
+    Get a circuit's state, e.g. for monitoring.
+
+    Returns:
+        circuit (dict): The circuit's state ("closed", "open", or "half_open"), consecutive failures, and the unix time it was last opened
+    """
+    circuit = {key.decode(): value.decode() for key, value in redis_conn.hgetall(CIRCUIT_KEY.format(name=name)).items()}
+    return {
+        "state": circuit.get("state", CLOSED),
+        "failures": int(circuit.get("failures", 0)),
+        "opened_at": float(circuit["opened_at"]) if "opened_at" in circuit else None,
+    }
+
+
+def spend_retry(redis_conn: Redis) -> bool:
+    """
+    Spend a token of the global retry budget. Retries are allowed when Redis can't be reached.
+
+    Returns:
+        allowed (bool): Whether the job may be retried
+    """
+    try:
+        return bool(redis_conn.register_script(SPEND_SCRIPT)(keys=[RETRY_BUDGET_KEY], args=[RETRY_BUDGET_MAX]))
+    except Exception as e:
+        logger.warning(f"Failed to spend a retry token, allowing the retry: {e}")
+        return True
+
+
+def earn_retry(redis_conn: Redis) -> None:
+    """
+    Earn RETRY_BUDGET_RATIO of a retry token for a successful job.
+    """
+    redis_conn.register_script(EARN_SCRIPT)(keys=[RETRY_BUDGET_KEY], args=[RETRY_BUDGET_RATIO, RETRY_BUDGET_MAX])
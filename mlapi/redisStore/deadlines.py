@@ -0,0 +1,107 @@
+"""
+Deadlines for analysis jobs.
+
+Every job enqueued by the orchestrator carries the unix time its result is needed by in its meta. Jobs run in order of slack (deadline
+minus the task's estimated runtime), within each user's fair-share sub-queue and on the RQ queues themselves (see
+redisStore.queue.SlackQueue), so an interview the user is waiting on goes ahead of a background re-analysis. A job that starts past
+its deadline runs a cheaper degraded version of its task or is shed.
+
+Past their deadline, the filler/hedge count and overall analysis fall back to local computations (degraded) and the sentiment
+analysis is skipped (shed). The STAR and competency analyses always run fully since the interview page needs their results.
+"""
+import os
+import time
+from redis import Redis
+from rq import get_current_job
+from dotenv import load_dotenv
+from schemas import AnalysisOutcome
+from utils.logger_config import get_logger
+
+load_dotenv() # load environment variables
+logger = get_logger(__name__)
+
+ANALYSIS_DEADLINE = int(os.getenv("ANALYSIS_DEADLINE", 60 * 10)) # seconds an interactive analysis (user is waiting on it) may take
+ANALYSIS_BACKGROUND_DEADLINE = int(os.getenv("ANALYSIS_BACKGROUND_DEADLINE", 60 * 60)) # seconds a background re-analysis may take
+DEFAULT_RUNTIME_ESTIMATE = float(os.getenv("DEFAULT_RUNTIME_ESTIMATE", 30)) # seconds a task is expected to run before it has been measured
+
+RUNTIME_ESTIMATES_KEY = "task:runtime" # Redis hash of task name -> moving average of its runtime in seconds
+RUNTIME_SMOOTHING = 0.2 # weight of the latest runtime in the moving average
+
+
+def get_deadline(background: bool = False, deadline_seconds: int = None) -> float:
+    """
+    Get the unix time an analysis started now must be done by.
+
+    Args:
+        background (bool): Whether nobody is waiting on the analysis, e.g. a re-analysis
+        deadline_seconds (int): Seconds the analysis may take, overrides the defaults
+    Returns:
+        deadline (float): Unix time the analysis must be done by
+    """
+    if deadline_seconds is None:
+        deadline_seconds = ANALYSIS_BACKGROUND_DEADLINE if background else ANALYSIS_DEADLINE
+    return time.time() + deadline_seconds
+
+
+def estimate_runtime(task_name: str, redis_conn: Redis) -> float:
+    """
+    Get the estimated runtime of a task in seconds.
+
+    Args:
+        task_name (str): Name of the task function
+        redis_conn (Redis): Redis connection object
+    Returns:
+        runtime (float): Moving average of the task's measured runtimes, or DEFAULT_RUNTIME_ESTIMATE if it hasn't been measured yet
+    """
+    runtime = redis_conn.hget(RUNTIME_ESTIMATES_KEY, task_name)
+    return float(runtime) if runtime is not None else DEFAULT_RUNTIME_ESTIMATE
+
+
+def record_runtime(task_name: str, runtime: float, redis_conn: Redis) -> None:
+    """
+    Add a measured runtime to a task's moving average.
+
+    Args:
+        task_name (str): Name of the task function
+        runtime (float): Seconds the task ran for
+        redis_conn (Redis): Redis connection object
+    """
+    previous = redis_conn.hget(RUNTIME_ESTIMATES_KEY, task_name)
+    if previous is not None:
+        runtime = RUNTIME_SMOOTHING * runtime + (1 - RUNTIME_SMOOTHING) * float(previous)
+    redis_conn.hset(RUNTIME_ESTIMATES_KEY, task_name, runtime)
+
+
+def get_slack(task_name: str, deadline: float, redis_conn: Redis) -> float:
+    """
+    Get the latest unix time a task can start and still finish by its deadline (jobs with less slack are dispatched first).
+
+    Args:
+        task_name (str): Name of the task function
+        deadline (float): Unix time the task must be done by
+        redis_conn (Redis): Redis connection object
+    Returns:
+        slack (float): Deadline minus the task's estimated runtime
+    """
+    return deadline - estimate_runtime(task_name, redis_conn)
+
+
+def get_deadline_outcome(degradable: bool) -> AnalysisOutcome:
+    """
+    Decide how the current job should run based on its deadline. Must be called from within a task run by a worker.
+
+    Args:
+        degradable (bool): Whether the task has a cheaper version it can run past its deadline
+    Returns:
+        outcome (AnalysisOutcome): Whether to run the full task, its degraded version, or skip it
+    """
+    job = get_current_job()
+    deadline = job.meta.get("deadline") if job is not None else None
+    if deadline is None or time.time() <= deadline:
+        return AnalysisOutcome.FULL
+
+    outcome = AnalysisOutcome.DEGRADED if degradable else AnalysisOutcome.SHED
+    job.meta["outcome"] = outcome.value # lets the worker know the job's runtime isn't representative of the task
+    job.save_meta()
+    logger.warning(f"Job={job.id} ({job.func_name}) started {time.time() - deadline:.0f}s past its deadline, outcome={outcome.value}")
+    return outcome
@@ -0,0 +1,226 @@
+"""
+Fair-share scheduling across users (tenants) for each queue priority.
+
+RQ queues are plain FIFO lists, so one user who submits dozens of interviews starves everyone behind them. Instead of pushing
+jobs straight onto the RQ queue, jobs are held in per-tenant sub-queues and a dispatcher moves them onto the RQ queue using
+deficit round robin (DRR) across tenants. With the default weight of 1 every tenant gets one job per round (plain round robin);
+a tenant with weight 2 gets two jobs per round and a tenant with weight 0.5 gets one job every other round. Within a tenant, jobs
+are dispatched in order of their score, i.e. their slack (see redisStore.deadlines), or the order they were enqueued in.
+
+The RQ queue is only topped up to a small window so that the dispatch order (not the arrival order) decides which job runs next.
+Dispatching happens when a job is enqueued and whenever a worker is about to dequeue its next job. Until then, held jobs are deferred
+and in their queue's deferred job registry like jobs waiting on their dependencies.
+"""
+import os
+import time
+from rq.job import Job, JobStatus
+from rq.queue import Queue
+from rq.utils import now, utcformat
+from redis import Redis
+from dotenv import load_dotenv
+from utils.logger_config import get_logger
+
+load_dotenv() # load environment variables
+logger = get_logger(__name__)
+
+FAIR_SHARE_ENABLED = os.getenv("FAIR_SHARE_ENABLED", "true").lower() == "true" # toggle fair-share scheduling
+FAIR_SHARE_WINDOW = int(os.getenv("FAIR_SHARE_WINDOW", 2)) # max number of jobs waiting on each RQ queue, the rest wait in the tenant sub-queues
+FAIR_SHARE_DEFAULT_WEIGHT = float(os.getenv("FAIR_SHARE_DEFAULT_WEIGHT", 1)) # jobs per round for tenants without a custom weight
+MIN_WEIGHT = 0.1 # lower bound on weights so every tenant eventually gets a turn
+
+WEIGHTS_KEY = "fairshare:weights" # Redis hash of tenant -> weight (shared by every priority)
+SUBQUEUE_PREFIX = "fairshare:{priority}:tenant:" # Redis sorted set of job ids waiting for a tenant, scored by slack
+RING_KEY = "fairshare:{priority}:ring" # Redis list of tenants with waiting jobs in round robin order
+MEMBERS_KEY = "fairshare:{priority}:members" # Redis set of the tenants in the ring
+DEFICIT_KEY = "fairshare:{priority}:deficit" # Redis hash of tenant -> DRR deficit counter
+
+# Adds a job to a tenant's sub-queue and the tenant to the ring if it wasn't already waiting
+ENQUEUE_SCRIPT = """
+redis.call('ZADD', KEYS[1], ARGV[3], ARGV[1])
+if redis.call('SADD', KEYS[3], ARGV[2]) == 1 then
+    redis.call('RPUSH', KEYS[2], ARGV[2])
+end
+return redis.call('ZCARD', KEYS[1])
+"""
+
+# Moves jobs from the tenant sub-queues onto the RQ queue using deficit round robin until the RQ queue is full. Every key is passed in
+# KEYS: the ring, members, deficits, RQ queue, and deferred job registry, then the sub-queue of each of the ARGV[3] tenants, then the
+# job of each candidate job id (the first jobs of every sub-queue). ARGV[4..] are each tenant and its weight, then the candidate job ids.
+# Tenants and jobs that were added after the keys were read are dispatched by the next call. Returns the number of expired jobs that were
+# dropped and the ids of the dispatched jobs
+DISPATCH_SCRIPT = """
+local ring, members, deficits, queue, deferred = KEYS[1], KEYS[2], KEYS[3], KEYS[4], KEYS[5]
+local slots = tonumber(ARGV[1]) - redis.call('LLEN', queue)
+local enqueued_at, count = ARGV[2], tonumber(ARGV[3])
+local subqueues, weights, job_keys = {}, {}, {}
+for i = 1, count do
+    subqueues[ARGV[2 + 2 * i]] = KEYS[5 + i]
+    weights[ARGV[2 + 2 * i]] = tonumber(ARGV[3 + 2 * i])
+end
+for i = 6 + count, #KEYS do
+    job_keys[ARGV[i - 2 + count]] = KEYS[i]
+end
+local dispatched, dropped = {}, 0
+
+while slots > 0 do
+    local tenant = redis.call('LINDEX', ring, 0)
+    if not tenant or not subqueues[tenant] then
+        break
+    end
+
+    local subqueue = subqueues[tenant]
+    local deficit = tonumber(redis.call('HGET', deficits, tenant) or '0')
+    if deficit < 1 then
+        -- new round for this tenant
+        deficit = deficit + weights[tenant]
+    end
+
+    if deficit >= 1 then
+        local job_id = redis.call('ZRANGE', subqueue, 0, 0)[1]
+        if job_id then
+            local job_key = job_keys[job_id]
+            if not job_key then
+                break
+            end
+            redis.call('ZREM', subqueue, job_id)
+            redis.call('ZREM', deferred, job_id)
+            -- jobs that expired while they were waiting are dropped
+            if redis.call('EXISTS', job_key) == 1 then
+                redis.call('HSET', job_key, 'status', 'queued', 'enqueued_at', enqueued_at)
+                redis.call('RPUSH', queue, job_id)
+                table.insert(dispatched, job_id)
+                slots = slots - 1
+                deficit = deficit - 1
+            else
+                dropped = dropped + 1
+            end
+        end
+    end
+
+    if redis.call('ZCARD', subqueue) == 0 then
+        -- tenant has nothing left to run, it starts from scratch next time
+        redis.call('LPOP', ring)
+        redis.call('SREM', members, tenant)
+        redis.call('HDEL', deficits, tenant)
+    elseif deficit < 1 then
+        -- tenant used up its share of this round, move it to the back of the ring
+        redis.call('LMOVE', ring, ring, 'LEFT', 'RIGHT')
+        redis.call('HSET', deficits, tenant, deficit)
+    else
+        redis.call('HSET', deficits, tenant, deficit)
+    end
+end
+
+return {dropped, dispatched}
+"""
+
+
+def enqueue(queue: Queue, tenant: str, task, *args, score: float = None, **options) -> Job:
+    """
+    Create a job and hold it in the tenant's sub-queue until the dispatcher moves it onto the RQ queue.
+
+    Args:
+        queue (Queue): RQ queue the job will eventually run on
+        tenant (str): Who the job is run for, e.g. the user id
+        task: The task function to be executed, or its import path
+        args: Arguments to pass to the task
+        score: Jobs of the same tenant with lower scores are dispatched first, defaults to the current time (first come first served)
+        options: Job options accepted by Queue.create_job, e.g. meta, retry, result_ttl
+    Returns:
+        Job: The created job (its status is deferred, and it's in the queue's deferred job registry, until it's dispatched)
+    """
+    conn = queue.connection
+    job = queue.create_job(task, args=args, status=JobStatus.DEFERRED, **options)
+    job.origin = queue.name
+
+    with conn.pipeline() as pipe:
+        job.save(pipeline=pipe)
+        queue.deferred_job_registry.add(job, pipeline=pipe) # so RQ's tooling sees the held jobs like any other deferred job
+        pipe.sadd(Queue.redis_queues_keys, queue.key) # register the queue the same way Queue.enqueue would
+        pipe.execute()
+
+    conn.register_script(ENQUEUE_SCRIPT)(
+        keys=[SUBQUEUE_PREFIX.format(priority=queue.name) + tenant, RING_KEY.format(priority=queue.name), MEMBERS_KEY.format(priority=queue.name)],
+        args=[job.id, tenant, score if score is not None else time.time()],
+    )
+    dispatch(queue)
+    return job
+
+
+def dispatch(queue: Queue) -> list[str]:
+    """
+    Move waiting jobs from the tenant sub-queues onto the RQ queue until it holds FAIR_SHARE_WINDOW jobs.
+
+    Args:
+        queue (Queue): RQ queue to top up
+    Returns:
+        job_ids (list[str]): Ids of the jobs that were moved onto the RQ queue
+    """
+    conn = queue.connection
+    priority = queue.name
+    with conn.pipeline() as pipe:
+        pipe.smembers(MEMBERS_KEY.format(priority=priority))
+        pipe.llen(queue.key)
+        tenants, waiting = pipe.execute()
+    if not tenants or waiting >= FAIR_SHARE_WINDOW:
+        return []
+
+    # the script only touches the keys it's given, so the weights, sub-queues, and the jobs that may be dispatched are read first
+    tenants = sorted(tenant.decode() for tenant in tenants)
+    subqueues = [SUBQUEUE_PREFIX.format(priority=priority) + tenant for tenant in tenants]
+    with conn.pipeline() as pipe:
+        pipe.hmget(WEIGHTS_KEY, tenants)
+        for subqueue in subqueues:
+            pipe.zrange(subqueue, 0, FAIR_SHARE_WINDOW - 1) # no tenant gets more than the whole window in one call
+        weights, *heads = pipe.execute()
+    weights = [max(float(weight) if weight is not None else FAIR_SHARE_DEFAULT_WEIGHT, MIN_WEIGHT) for weight in weights]
+    candidates = [job_id.decode() for head in heads for job_id in head]
+
+    dropped, dispatched = conn.register_script(DISPATCH_SCRIPT)(
+        keys=[
+            RING_KEY.format(priority=priority), MEMBERS_KEY.format(priority=priority), DEFICIT_KEY.format(priority=priority), queue.key,
+            queue.deferred_job_registry.key, *subqueues, *(queue.job_class.key_for(job_id) for job_id in candidates),
+        ],
+        args=[FAIR_SHARE_WINDOW, utcformat(now()), len(tenants), *(value for pair in zip(tenants, weights) for value in pair), *candidates],
+    )
+    job_ids = [job_id.decode() for job_id in dispatched]
+    if job_ids:
+        logger.info(f"Dispatched {len(job_ids)} job(s) onto queue={priority}: {', '.join(job_ids)}")
+    # the expired jobs took the place of candidates that weren't read, dispatch those too instead of leaving the queue short
+    if dropped and len(job_ids) < FAIR_SHARE_WINDOW - waiting:
+        job_ids += dispatch(queue)
+    return job_ids
+
+
+def pending_count(priority: str, redis_conn: Redis) -> int:
+    """
+    Count the jobs waiting in the tenant sub-queues of a priority.
+
+    Args:
+        priority (str): Queue priority
+        redis_conn (Redis): Redis connection object
+    Returns:
+        count (int): Number of jobs waiting to be dispatched
+    """
+    tenants = redis_conn.smembers(MEMBERS_KEY.format(priority=priority))
+    if not tenants:
+        return 0
+    with redis_conn.pipeline() as pipe:
+        for tenant in tenants:
+            pipe.zcard(SUBQUEUE_PREFIX.format(priority=priority) + tenant.decode())
+        return sum(pipe.execute())
+
+
+def set_tenant_weight(tenant: str, weight: float, redis_conn: Redis) -> None:
+    """
+    Set how many jobs a tenant gets per round relative to the others (e.g. 2 for twice the default share).
+
+    Args:
+        tenant (str): Who the jobs are run for, e.g. the user id
+        weight (float): Jobs per round, None resets the tenant to FAIR_SHARE_DEFAULT_WEIGHT
+        redis_conn (Redis): Redis connection object
+    """
+    if weight is None:
+        redis_conn.hdel(WEIGHTS_KEY, tenant)
+    else:
+        redis_conn.hset(WEIGHTS_KEY, tenant, max(float(weight), MIN_WEIGHT))
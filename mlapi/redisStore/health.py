@@ -0,0 +1,238 @@
+"""
+Reports the health of every queue (backlog, waiting time, worker utilization, throughput, and recovery from dead workers) so worker
+replicas can be scaled on real data.
+
+Everything is read in a single Lua script call so an external autoscaler can poll it every few seconds.
+Run with `python -m redisStore.health` or through GET /api/jobs/queues/health.
+"""
+import os
+import json
+import time
+from redis import Redis
+from rq.job import Job
+from rq.queue import Queue
+from rq.registry import DeferredJobRegistry, ScheduledJobRegistry, StartedJobRegistry
+from rq.utils import utcparse
+from rq.worker_registration import WORKERS_BY_QUEUE_KEY
+from redisStore.myconnection import get_redis_con
+from redisStore.queue import QUEUE_PRIORITIES
+from redisStore.fair_share import SUBQUEUE_PREFIX, MEMBERS_KEY
+from utils.logger_config import get_logger
+from dotenv import load_dotenv
+
+load_dotenv() # load environment variables
+logger = get_logger(__name__)
+
+THROUGHPUT_WINDOW = int(os.getenv("QUEUE_THROUGHPUT_WINDOW", 5)) # minutes of completions used to estimate throughput
+COMPLETED_KEY = "queue:{queue}:completed:{minute}" # Redis counter of jobs completed on a queue during a minute (unix time // 60)
+REQUEUED_KEY = "queue:{queue}:requeued:{minute}" # Redis counter of jobs of dead workers requeued during a minute (see redisStore.reaper)
+RECOVERY_KEY = "queue:{queue}:recovery_ms:{minute}" # Redis counter of the milliseconds those jobs waited between their worker's last heartbeat and being requeued
+
+# Reads the health of each queue. ARGV[1] is the number of queues, ARGV[2] the throughput window, ARGV[3] the prefix of RQ's job keys,
+# and the prefix of each queue's fair-share sub-queues follows. KEYS holds each queue's keys in turn: 6 plus 3 per minute of the
+# window (see queue_keys).
+# Returns a flat list of QUEUE_FIELDS per queue (timestamps are empty strings when there is no waiting job).
+HEALTH_SCRIPT = """
+local count, window, job_prefix = tonumber(ARGV[1]), tonumber(ARGV[2]), ARGV[3]
+local per_queue = 6 + 3 * window
+local report = {}
+
+for i = 1, count do
+    local base = (i - 1) * per_queue
+    local queue, deferred, scheduled, started, workers_key, members = KEYS[base + 1], KEYS[base + 2], KEYS[base + 3], KEYS[base + 4], KEYS[base + 5], KEYS[base + 6]
+    local subqueue_prefix = ARGV[3 + i]
+
+    local depth = redis.call('LLEN', queue)
+    local oldest_enqueued_at = ''
+    local head = redis.call('LINDEX', queue, 0)
+    if head then
+        oldest_enqueued_at = redis.call('HGET', job_prefix .. head, 'enqueued_at') or ''
+    end
+
+    -- jobs held back by the fair-share scheduler are waiting too, only the next job of each tenant is checked to keep this cheap
+    local pending, oldest_created_at = 0, ''
+    for _, tenant in ipairs(redis.call('SMEMBERS', members)) do
+        local subqueue = subqueue_prefix .. tenant
+        pending = pending + redis.call('ZCARD', subqueue)
+        local job_id = redis.call('ZRANGE', subqueue, 0, 0)[1]
+        if job_id then
+            local created_at = redis.call('HGET', job_prefix .. job_id, 'created_at') or ''
+            if created_at ~= '' and (oldest_created_at == '' or created_at < oldest_created_at) then
+                oldest_created_at = created_at
+            end
+        end
+    end
+
+    -- workers whose key expired are dead even if they are still registered
+    local workers, busy = 0, 0
+    for _, worker in ipairs(redis.call('SMEMBERS', workers_key)) do
+        local state = redis.call('HGET', worker, 'state')
+        if state then
+            workers = workers + 1
+            if state == 'busy' then
+                busy = busy + 1
+            end
+        end
+    end
+
+    -- the completed, requeued, and recovery counters of each minute of the window
+    local completed, requeued, recovery_ms = 0, 0, 0
+    for m = 0, window - 1 do
+        local counters = base + 7 + 3 * m
+        completed = completed + tonumber(redis.call('GET', KEYS[counters]) or '0')
+        requeued = requeued + tonumber(redis.call('GET', KEYS[counters + 1]) or '0')
+        recovery_ms = recovery_ms + tonumber(redis.call('GET', KEYS[counters + 2]) or '0')
+    end
+
+    table.insert(report, depth)
+    table.insert(report, oldest_enqueued_at)
+    table.insert(report, pending)
+    table.insert(report, oldest_created_at)
+    table.insert(report, redis.call('ZCARD', deferred) - pending) -- jobs held by the fair-share scheduler are deferred too
+    table.insert(report, redis.call('ZCARD', scheduled))
+    table.insert(report, redis.call('ZCARD', started))
+    table.insert(report, workers)
+    table.insert(report, busy)
+    table.insert(report, completed)
+    table.insert(report, requeued)
+    table.insert(report, recovery_ms)
+end
+
+return report
+"""
+QUEUE_FIELDS = 12 # number of values HEALTH_SCRIPT returns per queue
+
+# Counts the live workers listening on any of the queues in KEYS, once each even when they listen on several of them
+WORKERS_SCRIPT = """
+local workers = 0
+for _, worker in ipairs(redis.call('SUNION', unpack(KEYS))) do
+    if redis.call('HEXISTS', worker, 'state') == 1 then
+        workers = workers + 1
+    end
+end
+return workers
+"""
+
+
+def record_completion(queue_name: str, redis_conn: Redis) -> None:
+    """
+    Count a completed job towards its queue's throughput.
+
+    Args:
+        queue_name (str): Name of the queue the job ran on
+        redis_conn (Redis): Redis connection object
+    """
+    key = COMPLETED_KEY.format(queue=queue_name, minute=int(time.time() // 60))
+    with redis_conn.pipeline() as pipe:
+        pipe.incr(key)
+        pipe.expire(key, (THROUGHPUT_WINDOW + 1) * 60) # counters are only needed for the throughput window
+        pipe.execute()
+
+
+def record_recovery(queue_name: str, seconds: float, redis_conn: Redis) -> None:
+    """
+    Count a job of a dead worker requeued on its queue and how long it took to recover.
+
+    Args:
+        queue_name (str): Name of the queue the job was requeued on
+        seconds (float): Seconds between the dead worker's last heartbeat and the job being requeued
+        redis_conn (Redis): Redis connection object
+    """
+    minute = int(time.time() // 60)
+    requeued_key = REQUEUED_KEY.format(queue=queue_name, minute=minute)
+    recovery_key = RECOVERY_KEY.format(queue=queue_name, minute=minute)
+    with redis_conn.pipeline() as pipe:
+        pipe.incr(requeued_key)
+        pipe.incrby(recovery_key, int(seconds * 1000))
+        pipe.expire(requeued_key, (THROUGHPUT_WINDOW + 1) * 60) # counters are only needed for the throughput window
+        pipe.expire(recovery_key, (THROUGHPUT_WINDOW + 1) * 60)
+        pipe.execute()
+
+
+def queue_keys(name: str, minute: int) -> list[str]:
+    """
+    Keys HEALTH_SCRIPT reads for a queue, built from RQ's key templates: the queue, its deferred, scheduled, and started job registries,
+    its workers, and its fair-share tenants, then the completed, requeued, and recovery counters of each minute of the throughput window.
+    """
+    keys = [
+        Queue.redis_queue_namespace_prefix + name,
+        DeferredJobRegistry.key_template.format(name),
+        ScheduledJobRegistry.key_template.format(name),
+        StartedJobRegistry.key_template.format(name),
+        WORKERS_BY_QUEUE_KEY % name,
+        MEMBERS_KEY.format(priority=name),
+    ]
+    for m in range(minute - THROUGHPUT_WINDOW + 1, minute + 1):
+        keys += [template.format(queue=name, minute=m) for template in (COMPLETED_KEY, REQUEUED_KEY, RECOVERY_KEY)]
+    return keys
+
+
+def count_workers(redis_conn: Redis, queues: list[str] = None) -> int:
+    """
+    Count the live workers of the queues. Unlike adding up each queue's workers, a worker listening on several queues is counted once.
+
+    Args:
+        redis_conn (Redis): Redis connection object
+        queues (list[str]): Names of the queues, defaults to every queue priority
+    Returns:
+        workers (int): Number of live workers
+    """
+    return redis_conn.register_script(WORKERS_SCRIPT)(keys=[WORKERS_BY_QUEUE_KEY % name for name in queues or QUEUE_PRIORITIES])
+
+
+def _age(timestamp: bytes, now: float) -> float | None:
+    """
+    Seconds since an RQ timestamp, or None if there's no timestamp.
+    """
+    if not timestamp:
+        return None
+    return max(now - utcparse(timestamp.decode()).timestamp(), 0.0)
+
+
+def queue_health(redis_conn: Redis, queues: list[str] = None) -> dict:
+    """
+    Report the health of each queue.
+
+    Args:
+        redis_conn (Redis): Redis connection object
+        queues (list[str]): Names of the queues to report on, defaults to every queue priority
+    Returns:
+        report (dict): Health of each queue, see schemas.QueueHealthReport
+    """
+    queues = queues or QUEUE_PRIORITIES
+    now = time.time()
+    minute = int(now // 60)
+
+    values = redis_conn.register_script(HEALTH_SCRIPT)(
+        keys=[key for name in queues for key in queue_keys(name, minute)],
+        args=[len(queues), THROUGHPUT_WINDOW, Job.redis_job_namespace_prefix, *(SUBQUEUE_PREFIX.format(priority=name) for name in queues)],
+    )
+
+    # the current minute isn't over yet so only count the time that has passed
+    elapsed_minutes = THROUGHPUT_WINDOW - 1 + (now % 60) / 60
+
+    report = []
+    for i, name in enumerate(queues):
+        depth, enqueued_at, pending, created_at, deferred, scheduled, started, workers, busy, completed, requeued, recovery_ms = values[i * QUEUE_FIELDS:(i + 1) * QUEUE_FIELDS]
+        ages = [age for age in (_age(enqueued_at, now), _age(created_at, now)) if age is not None]
+        report.append({
+            "queue": name,
+            "depth": depth,
+            "fair_share_pending": pending,
+            "oldest_job_age": max(ages) if ages else None,
+            "deferred": deferred,
+            "scheduled": scheduled,
+            "started": started,
+            "workers": workers,
+            "busy_workers": busy,
+            "utilization": busy / workers if workers else 0.0,
+            "throughput_per_minute": completed / elapsed_minutes if elapsed_minutes > 0 else 0.0,
+            "requeued": requeued,
+            "mean_recovery_seconds": recovery_ms / requeued / 1000 if requeued else None,
+        })
+
+    return {"timestamp": now, "queues": report}
+
+
+if __name__ == "__main__":
+    print(json.dumps(queue_health(get_redis_con()), indent=2))
@@ -0,0 +1,142 @@
+"""
+Leases on the slots of the LLM runners, shared by every worker through Redis so the requests in flight never exceed what a runner can
+serve at once.
+
+A runner serves LLM_MAX_CONCURRENCY requests at a time (the slots of llama.cpp's --parallel). Every request leases one of its runner's
+slots for as long as it's in flight, waiting for one to free up when they're all taken, however many workers and STAR jobs send
+requests concurrently. A request is leased the slot its cache key is pinned to when it's free (so it reuses the slot's cached prompt
+prefix) and any other free slot otherwise, so two requests are never sent to the same slot at once. A request that can't lease a slot
+within LLM_SLOT_WAIT_TIMEOUT seconds fails instead of waiting forever. Leases expire after LLM_SLOT_LEASE_SECONDS in case the process
+holding them died, and are refreshed while their request is in flight so long generations keep their slot.
+"""
+import os
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+from redis import Redis
+from dotenv import load_dotenv
+from utils.logger_config import get_logger
+
+load_dotenv() # load environment variables
+logger = get_logger(__name__)
+
+LLM_SLOT_LEASE_SECONDS = int(os.getenv("LLM_SLOT_LEASE_SECONDS", 60)) # seconds a slot stays leased after its process stops refreshing it
+LLM_SLOT_WAIT_TIMEOUT = float(os.getenv("LLM_SLOT_WAIT_TIMEOUT", 300)) # seconds a request waits for a free slot before failing
+LLM_SLOT_POLL_INTERVAL = 0.05 # seconds between attempts to lease a slot while they're all taken
+
+SLOT_KEY = "llm:slot:{name}:{slot}" # set while the slot of the runner is leased, holds the lease's token
+
+# Leases the first free slot, starting at the preferred one. Returns the slot's index, or -1 if they're all taken
+LEASE_SCRIPT = """
+local capacity, preferred = tonumber(ARGV[1]), tonumber(ARGV[2])
+for i = 0, capacity - 1 do
+    local slot = (preferred + i) % capacity
+    if redis.call('SET', KEYS[1] .. slot, ARGV[3], 'NX', 'EX', ARGV[4]) then
+        return slot
+    end
+end
+return -1
+"""
+
+# Extends the lease on a slot if it's still held by it. Returns 1 if it was extended, 0 if the lease was lost
+REFRESH_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Releases a slot if it's still held by the lease
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class SlotWaitTimeoutError(Exception):
+    """
+    Raised when every slot of a runner stayed leased for LLM_SLOT_WAIT_TIMEOUT seconds.
+
+    Args:
+        name (str): Name of the runner, e.g. its base URL
+        waited (float): Seconds the request waited for a slot
+    """
+    def __init__(self, name: str, waited: float):
+        super().__init__(f"No slot of {name} was free after waiting {waited:.0f}s")
+        self.name = name
+        self.waited = waited
+
+
+def keep_leased(key: str, token: str, stop: threading.Event, redis_conn: Redis) -> None:
+    """
+    Refresh a lease every third of LLM_SLOT_LEASE_SECONDS until stopped, so it doesn't expire while its request is in flight.
+
+    Args:
+        key (str): Key of the leased slot
+        token (str): Token of the lease
+        stop (threading.Event): Set once the request is done
+        redis_conn (Redis): Redis connection object
+    """
+    refresh = redis_conn.register_script(REFRESH_SCRIPT)
+    while not stop.wait(LLM_SLOT_LEASE_SECONDS / 3):
+        try:
+            if not refresh(keys=[key], args=[token, LLM_SLOT_LEASE_SECONDS]):
+                logger.warning(f"Lease on {key} expired while its request was in flight, another request may be sent to the slot")
+                return
+        except Exception as e:
+            logger.warning(f"Failed to refresh the lease on {key}, trying again: {e}")
+
+
+@contextmanager
+def lease_slot(name: str, capacity: int, preferred: int, redis_conn: Redis):
+    """
+    Lease a slot of a runner for the duration of a request, waiting until one is free. Requests aren't held back when Redis can't be
+    reached, they're sent to their preferred slot like before slots were leased.
+
+    Args:
+        name (str): Name of the runner, e.g. its base URL
+        capacity (int): Number of slots of the runner
+        preferred (int): Slot to lease when it's free, e.g. the one the request's cache key is pinned to
+        redis_conn (Redis): Redis connection object
+    Yields:
+        slot (int): Index of the leased slot
+    Raises:
+        SlotWaitTimeoutError: If no slot was free within LLM_SLOT_WAIT_TIMEOUT seconds
+    """
+    token = uuid.uuid4().hex
+    prefix = SLOT_KEY.format(name=name, slot="")
+    lease = redis_conn.register_script(LEASE_SCRIPT)
+    started = time.monotonic()
+    try:
+        while (slot := int(lease(keys=[prefix], args=[capacity, preferred, token, LLM_SLOT_LEASE_SECONDS]))) < 0:
+            if time.monotonic() - started >= LLM_SLOT_WAIT_TIMEOUT:
+                break
+            time.sleep(LLM_SLOT_POLL_INTERVAL)
+    except Exception as e:
+        logger.warning(f"Failed to lease a slot of {name}, sending the request to slot {preferred}: {e}")
+        slot = None
+    if slot is None:
+        yield preferred
+        return
+
+    waited = time.monotonic() - started
+    if slot < 0:
+        raise SlotWaitTimeoutError(name, waited)
+    if waited >= 1:
+        logger.info(f"Waited {waited:.1f}s for a free slot of {name}")
+
+    stop = threading.Event()
+    refresher = threading.Thread(target=keep_leased, args=(prefix + str(slot), token, stop, redis_conn), daemon=True)
+    refresher.start()
+    try:
+        yield slot
+    finally:
+        stop.set()
+        refresher.join()
+        try:
+            redis_conn.register_script(RELEASE_SCRIPT)(keys=[prefix + str(slot)], args=[token])
+        except Exception as e:
+            logger.warning(f"Failed to release slot {slot} of {name}, it's released when its lease expires: {e}")
@@ -0,0 +1,76 @@
+"""
+Reports how much Redis memory is used by each class of keys (job hashes, results, registries, etc.) to see what grows with traffic.
+
+Run with `python -m redisStore.memory` or through GET /api/jobs/memory.
+"""
+import json
+from redis import Redis
+from redisStore.myconnection import get_redis_con
+from utils.logger_config import get_logger
+
+logger = get_logger(__name__)
+
+SCAN_BATCH_SIZE = 1000 # number of keys to scan (and measure) per round-trip
+
+
+def get_key_class(key: str) -> str:
+    """
+    Group a Redis key into its key class, e.g. "rq:job:<id>" -> "rq:job" and "interview:<id>:jobs" -> "interview:*:jobs".
+
+    Args:
+        key (str): The Redis key
+    Returns:
+        key_class (str): Name of the key class
+    """
+    parts = key.split(":")
+    if parts[0] == "rq" and len(parts) > 1:
+        return f"rq:{parts[1]}"
+    if len(parts) > 2:
+        return f"{parts[0]}:*:{parts[-1]}"
+    if len(parts) == 2:
+        return f"{parts[0]}:*"
+    return "other"
+
+
+def memory_report(redis_conn: Redis) -> dict:
+    """
+    Measure the memory used by every key class by scanning the keyspace and pipelining MEMORY USAGE for each batch of keys.
+
+    Args:
+        redis_conn (Redis): Redis connection object
+    Returns:
+        report (dict): Total keys and bytes, plus the number of keys and bytes of each key class sorted by bytes
+    """
+    classes = {}
+    total_keys = total_bytes = 0
+
+    cursor = 0
+    while True:
+        cursor, keys = redis_conn.scan(cursor=cursor, count=SCAN_BATCH_SIZE)
+        if keys:
+            with redis_conn.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.memory_usage(key, samples=0)
+                usages = pipe.execute()
+
+            for key, usage in zip(keys, usages):
+                if usage is None:
+                    continue # key expired between SCAN and MEMORY USAGE
+                key_class = classes.setdefault(get_key_class(key.decode(errors="replace")), {"keys": 0, "bytes": 0})
+                key_class["keys"] += 1
+                key_class["bytes"] += usage
+                total_keys += 1
+                total_bytes += usage
+        if cursor == 0:
+            break
+
+    return {
+        "total_keys": total_keys,
+        "total_bytes": total_bytes,
+        "classes": dict(sorted(classes.items(), key=lambda item: item[1]["bytes"], reverse=True)),
+    }
+
+
+if __name__ == "__main__":
+    report = memory_report(get_redis_con())
+    print(json.dumps(report, indent=2))
@@ -1,35 +1,55 @@
 import os
 from redis import Redis, ConnectionPool
+from redis.asyncio import Redis as AsyncRedis, BlockingConnectionPool as AsyncBlockingConnectionPool
 from utils.logger_config import get_logger
 from dotenv import load_dotenv
 logger = get_logger(__name__)
 
 
 load_dotenv() # load environment variables
-# Create the connection pool, i.e. a way to manage and reuse the same Redis connection instead of establishing a new one everytime
 redis_url = os.getenv("REDIS_URL") # check if we have a redis URL (this is for cases where we'd use a cloud provider)
 
-try:
+# Connection pool, i.e. a way to manage and reuse the same Redis connection instead of establishing a new one everytime.
+# It's created on first use so importing this module doesn't require Redis to be up, see /readyz for checking the connection.
+POOL = None
+
+def get_pool() -> ConnectionPool:
+    """
+    Get the connection pool to the Redis server, creating it on first use.
+
+    Returns:
+        ConnectionPool: Connection pool shared by every Redis connection of the process
+    """
+    global POOL
+    if POOL is None:
+        try:
+            if (redis_url):
+                POOL = ConnectionPool.from_url(redis_url, decode_responses=False)
+            else:
+                logger.info("Creating connection pool using individual parameters...")
+                # create connection pool using our own parameters
+                POOL = ConnectionPool(
+                    host=os.getenv("REDIS_HOST", "redis"),
+                    port=int(os.getenv("REDIS_PORT", 6379)),
+                    password=os.getenv("REDIS_PASSWRORD", ""),
+                    decode_responses=False,
+                    socket_timeout=5, # time to wait for Redis to respond before throwing an error instead of infinitely hanging 
+                    health_check_interval=30,
+                )
+        except Exception as e:
+            logger.error(f"Failed to create connection pool to Redis server: {e}")
+            raise e
+    return POOL
+
+def get_redis_url() -> str:
+    """
+    Get the URL of the Redis server for clients that create their own connections, e.g. the RQ dashboard.
+    """
     if (redis_url):
-        POOL = ConnectionPool.from_url(redis_url, decode_responses=False)
-    else:
-        print(f"Creating connection pool using individual parameters...")
-        # create connection pool using our own parameters
-        POOL = ConnectionPool(
-            host=os.getenv("REDIS_HOST", "redis"),
-            port=int(os.getenv("REDIS_PORT", 6379)),
-            password=os.getenv("REDIS_PASSWRORD", ""),
-            decode_responses=False,
-            socket_timeout=5, # time to wait for Redis to respond before throwing an error instead of infinitely hanging 
-            health_check_interval=30,
-        )
-    # test connection to redis server after initialization
-    test = Redis(connection_pool=POOL)
-    print(f"Redis Connection Pool creation successful: {test.ping()}")
-
-except Exception as e:
-    logger.error(f"Failed to create connection pool to Redis server: {e}")
-    raise e
+        return redis_url
+    password = os.getenv("REDIS_PASSWRORD", "")
+    credentials = f":{password}@" if password else ""
+    return f"redis://{credentials}{os.getenv('REDIS_HOST', 'redis')}:{int(os.getenv('REDIS_PORT', 6379))}/"
 
 def get_redis_con() -> Redis:
     """
@@ -39,7 +59,66 @@ def get_redis_con() -> Redis:
         Redis: Authenticated Redis connection
     """
     try: 
-        return Redis(connection_pool=POOL) # return Redis client that uses the already established connection to our Redis server
+        return Redis(connection_pool=get_pool()) # return Redis client that uses the already established connection to our Redis server
     except Exception as e:
         logger.error(f"Failed to create Redis connection: {e}")
-        raise e
\ No newline at end of file
+        raise e
+
+ASYNC_POOL = None # asyncio connection pool for the API process, created on first use since it must be bound to the running event loop
+ASYNC_MAX_CONNECTIONS = int(os.getenv("REDIS_ASYNC_MAX_CONNECTIONS", 64)) # connections the API process may open, requests wait for a free one past that
+ASYNC_POOL_TIMEOUT = float(os.getenv("REDIS_ASYNC_POOL_TIMEOUT", 5)) # seconds a request waits for a free connection before failing
+
+def get_async_redis_con() -> AsyncRedis:
+    """
+    Create an asyncio Redis connection for use inside async route handlers.
+
+    The connections are shared by every request the API process serves, so a Redis round-trip only suspends the request making it
+    instead of blocking the event loop (and every other request) like the synchronous client does.
+
+    Returns:
+        AsyncRedis: Asyncio Redis connection
+    """
+    global ASYNC_POOL
+    if ASYNC_POOL is None:
+        if (redis_url):
+            ASYNC_POOL = AsyncBlockingConnectionPool.from_url(redis_url, decode_responses=False, max_connections=ASYNC_MAX_CONNECTIONS, timeout=ASYNC_POOL_TIMEOUT)
+        else:
+            ASYNC_POOL = AsyncBlockingConnectionPool(
+                host=os.getenv("REDIS_HOST", "redis"),
+                port=int(os.getenv("REDIS_PORT", 6379)),
+                password=os.getenv("REDIS_PASSWRORD", ""),
+                decode_responses=False,
+                socket_timeout=5,
+                health_check_interval=30,
+                max_connections=ASYNC_MAX_CONNECTIONS,
+                timeout=ASYNC_POOL_TIMEOUT,
+            )
+    return AsyncRedis(connection_pool=ASYNC_POOL)
+
+def get_async_pubsub_con() -> AsyncRedis:
+    """
+    Create an asyncio Redis connection for a pub/sub subscription, with its own connection pool.
+
+    A subscription holds its connection for as long as it's open, so it must not take one from the pool that serves requests.
+
+    Returns:
+        AsyncRedis: Asyncio Redis connection
+    """
+    if (redis_url):
+        return AsyncRedis.from_url(redis_url, decode_responses=False, health_check_interval=30)
+    return AsyncRedis(
+        host=os.getenv("REDIS_HOST", "redis"),
+        port=int(os.getenv("REDIS_PORT", 6379)),
+        password=os.getenv("REDIS_PASSWRORD", ""),
+        decode_responses=False,
+        health_check_interval=30,
+    )
+
+async def close_async_pool() -> None:
+    """
+    Close the asyncio connection pool's connections, e.g. when the API shuts down.
+    """
+    global ASYNC_POOL
+    if ASYNC_POOL is not None:
+        await ASYNC_POOL.disconnect()
+        ASYNC_POOL = None
@@ -0,0 +1,48 @@
+"""
+Warms everything analysis jobs need in the worker's parent process so that the process RQ forks for every job inherits it copy-on-write
+instead of importing and initializing it again.
+
+Only state that is safe to share across fork() is created here. The Firestore client opens gRPC channels, which must not be created
+before forking, so only the Firebase app is initialized and the client itself is still created by each job.
+"""
+import gc
+import time
+from utils.logger_config import get_logger
+
+logger = get_logger(__name__)
+
+
+def preload() -> float:
+    """
+    Import the analysis tasks and warm their shared state: the LLM client, the response format JSON schemas, and the Firebase app.
+
+    Returns:
+        elapsed (float): Seconds spent preloading
+    """
+    start = time.perf_counter()
+
+    # importing the tasks imports the schemas, prompts, data layer, openai, and firebase_admin
+    import tasks.ml_tasks # noqa: F401 (imports services.llm_client, which builds every response model's JSON schema)
+    import tasks.answer_tasks # noqa: F401
+    import tasks.metrics_tasks # noqa: F401 (imports NumPy)
+    from services.firebase_init import initialize_firebase
+    from services.llm_client import RESPONSE_MODELS, get_llm_client, get_routes
+    from tasks.prompts import PROMPT_VERSION
+
+    # create the client of every runner the stages are routed to, openai loads its resources on first access so touch the one jobs use
+    for stage in RESPONSE_MODELS:
+        for _, base_url in get_routes(stage):
+            get_llm_client(base_url).chat.completions
+
+    initialize_firebase()
+    # import the Firestore client's modules without opening any channels
+    from google.cloud.firestore_v1 import async_client # noqa: F401
+
+    # move everything created so far out of the garbage collector's reach so collections in the job processes don't write to
+    # (and copy) the shared memory pages
+    gc.collect()
+    gc.freeze()
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"Preloaded analysis tasks (prompt version {PROMPT_VERSION}) in {elapsed:.2f}s")
+    return elapsed
@@ -1,12 +1,108 @@
+import os
+import random
 from rq.job import Job
 from rq import Retry
 from rq.queue import Queue
 from redisStore.myconnection import get_redis_con
+from redisStore.serializers import get_serializer
+from redisStore import fair_share
+from redisStore.deadlines import get_slack
 from utils.logger_config import get_logger
 
 logger = get_logger(__name__)
 QUEUE_PRIORITIES = ["high", "default", "low"] # list of queue priorities
 
+# How long (in seconds) job results and failures are kept in Redis. Redis persists everything to its append-only file so results must not be kept forever.
+# Can be overridden per task, e.g. RQ_RESULT_TTL_OVERALL_ANALYSIS=86400
+DEFAULT_RESULT_TTL = int(os.getenv("RQ_RESULT_TTL", 60 * 60)) # 1 hour, long enough for the client to poll the results
+DEFAULT_FAILURE_TTL = int(os.getenv("RQ_FAILURE_TTL", 60 * 60 * 24)) # 1 day, long enough to debug failed jobs
+
+# Failed jobs are retried after an exponentially growing, jittered delay so retries of jobs that failed together (e.g. when the LLM runner
+# went down) don't all hit the backend at the same time. Retries are also capped by the global retry budget (see redisStore.circuit_breaker)
+MAX_RETRIES = int(os.getenv("RQ_MAX_RETRIES", 3)) # retries of a failed job
+RETRY_BACKOFF_BASE = float(os.getenv("RQ_RETRY_BACKOFF_BASE", 5)) # seconds before the first retry, doubled for every retry after it
+RETRY_BACKOFF_MAX = float(os.getenv("RQ_RETRY_BACKOFF_MAX", 120)) # longest delay between retries, in seconds
+
+SLACK_KEY = "slack:{priority}" # Redis sorted set of the queued jobs that have a deadline, scored by slack (see redisStore.deadlines)
+
+# Pushes a job onto its queue in front of the first queued job with more slack, or at the back if the job has no deadline or no queued
+# job has more slack. Jobs with the same slack, and jobs without a deadline, stay first come first served
+PUSH_SCRIPT = """
+local slack = redis.call('ZSCORE', KEYS[2], ARGV[1])
+if slack then
+    for _, pivot in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], '(' .. slack, '+inf')) do
+        if redis.call('LINSERT', KEYS[1], 'BEFORE', pivot, ARGV[1]) > 0 then
+            return 1
+        end
+        redis.call('ZREM', KEYS[2], pivot) -- no longer on the queue
+    end
+end
+return redis.call('RPUSH', KEYS[1], ARGV[1])
+"""
+
+def get_task_name(task) -> str:
+    """
+    Get the name of a task, e.g. "star_analysis".
+
+    Args:
+        task: The task function, or its import path (e.g. "tasks.ml_tasks.star_analysis") so the caller doesn't have to import it
+    Returns:
+        name (str): Name of the task function
+    """
+    return task.rsplit(".", 1)[-1] if isinstance(task, str) else task.__name__
+
+def get_task_ttls(task) -> tuple[int, int]:
+    """
+    Get the result and failure TTLs of a task, falling back to the defaults when the task has no override.
+
+    Args:
+        task: The task function or its import path
+    Returns:
+        ttls (tuple[int, int]): Result TTL and failure TTL in seconds
+    """
+    name = get_task_name(task).upper()
+    result_ttl = int(os.getenv(f"RQ_RESULT_TTL_{name}", DEFAULT_RESULT_TTL))
+    failure_ttl = int(os.getenv(f"RQ_FAILURE_TTL_{name}", DEFAULT_FAILURE_TTL))
+    return result_ttl, failure_ttl
+
+def get_retry(max_retries: int = MAX_RETRIES) -> Retry:
+    """
+    Get the retry policy of a job: exponential backoff with equal jitter, i.e. each delay is half its exponential step plus a random
+    share of the other half. The delays are drawn once per job and scheduled by the workers' RQ scheduler.
+
+    Args:
+        max_retries (int): How many times the job is retried
+    Returns:
+        retry (Retry): RQ retry policy with the job's delays in seconds
+    """
+    intervals = []
+    for attempt in range(max_retries):
+        step = min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** attempt)
+        intervals.append(max(1, round(step / 2 + random.uniform(0, step / 2))))
+    return Retry(max=max_retries, interval=intervals)
+
+class SlackQueue(Queue):
+    """
+    RQ queue that keeps the jobs with a deadline in order of slack, however they're enqueued: by the API, by RQ once their dependencies
+    finished (e.g. overall_analysis), or by the reaper. Workers remove each job from the slack set when they dequeue it. Jobs moved onto
+    the queue by the fair-share dispatcher are already in order of slack within their tenant and are pushed at the back.
+    """
+
+    def _enqueue_job(self, job: Job, pipeline=None, at_front: bool = False) -> Job:
+        deadline = (job.meta or {}).get("deadline")
+        if deadline is not None and not at_front:
+            # queued in the same transaction as the push so the job is ordered by it
+            slack = get_slack(get_task_name(job.func_name), deadline, self.connection)
+            (pipeline if pipeline is not None else self.connection).zadd(SLACK_KEY.format(priority=self.name), {job.id: slack})
+        return super()._enqueue_job(job, pipeline=pipeline, at_front=at_front)
+
+    def push_job_id(self, job_id: str, pipeline=None, at_front: bool = False):
+        if at_front:
+            return super().push_job_id(job_id, pipeline=pipeline, at_front=at_front)
+        connection = pipeline if pipeline is not None else self.connection
+        self.connection.register_script(PUSH_SCRIPT)(keys=[self.key, SLACK_KEY.format(priority=self.name)], args=[job_id], client=connection)
+
+
 def get_queue(priority="default") -> Queue:
     """
     Get a RQ instance with the specified priority ('default', 'high', or 'low')
@@ -18,17 +114,22 @@ def get_queue(priority="default") -> Queue:
         Queue: RQ instance
     """
     conn = get_redis_con() # get connection redis client
-    return Queue(name=priority, connection=conn)
+    return SlackQueue(name=priority, connection=conn, serializer=get_serializer())
 
 
-def add_task_to_queue(priority, task, *args, depends_on=None) -> Job:
+def add_task_to_queue(priority, task, *args, depends_on=None, meta=None, on_success=None, on_failure=None, tenant=None) -> Job:
     """
     Add a task to the Redis queue with proper error handling and logging.
 
     Args:
         priority: Priority of the queue you want to submit your task to ('default', 'high', or 'low')
-        task: The task function to be executed
+        task: The task function to be executed, or its import path so the API doesn't have to import the tasks (and their dependencies)
         args: List of arguments to pass to the task
+        depends_on: Job(s) that must finish before this task can start
+        meta: Extra metadata to store on the job, e.g. the interview and analysis stage it belongs to and its deadline
+        on_success: RQ Callback executed by the worker when the task succeeds
+        on_failure: RQ Callback executed by the worker when the task fails
+        tenant: Who the task is run for (e.g. the user id), tasks with a tenant are scheduled fairly across tenants instead of first come first served
 
     Returns:
         Job: The enqueued job object
@@ -40,14 +141,26 @@ def add_task_to_queue(priority, task, *args, depends_on=None) -> Job:
             raise ValueError(f"Invalid queue name '{priority}'. Must be one of: {', '.join(QUEUE_PRIORITIES)}.")
 
         queue = get_queue(priority)
+        result_ttl, failure_ttl = get_task_ttls(task)
+
+        options = {
+            "meta": meta,
+            "on_success": on_success,
+            "on_failure": on_failure,
+            "result_ttl": result_ttl,
+            "failure_ttl": failure_ttl,
+            "retry": get_retry(), # retry failed job up to MAX_RETRIES times, with jittered exponential backoff
+        }
 
-        job = queue.enqueue(
-            task,
-            *args,
-            depends_on=depends_on,
-            retry=Retry(max=3) # retry failed job up to 3 times
-        )
-        logger.info(f"Task {task.__name__} enqueued with job ID: {job.get_id()}")
+        # dependent tasks already waited on their dependencies so they skip the tenant sub-queues and go straight to the queue once released,
+        # where they're ordered by slack like every job with a deadline (see SlackQueue)
+        if tenant is not None and depends_on is None and fair_share.FAIR_SHARE_ENABLED:
+            # the tenant's most urgent job (least slack) is dispatched first
+            score = get_slack(get_task_name(task), meta["deadline"], queue.connection) if meta and meta.get("deadline") else None
+            job = fair_share.enqueue(queue, tenant, task, *args, score=score, **options)
+        else:
+            job = queue.enqueue(task, *args, depends_on=depends_on, **options)
+        logger.info(f"Task {get_task_name(task)} enqueued with job ID: {job.get_id()}")
         return job
     except Exception as e:
         logger.error(f"Failed to enqueue task: {str(e)}")
@@ -0,0 +1,168 @@
+"""
+Reaps the jobs of dead workers so they don't sit in the started registry until RQ notices they were abandoned.
+
+Busy workers heartbeat every WORKER_HEARTBEAT_INTERVAL seconds from their parent process, which stamps the job's last_heartbeat. When a
+worker is OOM-killed or its container restarts in the middle of a job, nothing fails the job: RQ only moves it out of the started
+registry once its heartbeat has expired and a worker happens to run its maintenance tasks (every 10 minutes), and the interview's
+overall_analysis stays deferred behind it all along. A job whose last heartbeat is older than REAPER_DEAD_AFTER is reaped instead:
+it's put back at the front of its queue with its retries intact, since it didn't fail. Jobs that keep taking their workers down
+(e.g. running out of memory every time) are only requeued REAPER_MAX_REQUEUES times before being handed to RQ's abandoned-job
+handling, which retries them with a retry used up or fails them. Deferred jobs whose dependencies are all finished are released too, in
+case a crash stranded them. The time from a dead worker's last heartbeat to its job being requeued is reported per queue by
+redisStore.health.
+
+A job's work horse being killed while its worker survives is already failed (and retried) right away by the worker itself.
+
+Reaping runs at most once every REAPER_INTERVAL seconds across all processes: in busy workers between heartbeats, in the supervisor,
+or standalone with `python -m redisStore.reaper`.
+"""
+import os
+import time
+from redis import Redis
+from redis.exceptions import WatchError
+from rq.job import Job, JobStatus
+from rq.queue import Queue
+from rq.executions import Execution
+from redisStore.myconnection import get_redis_con
+from redisStore.queue import QUEUE_PRIORITIES, get_queue
+from redisStore.health import record_recovery
+from utils.logger_config import get_logger
+from dotenv import load_dotenv
+
+load_dotenv() # load environment variables
+logger = get_logger(__name__)
+
+WORKER_HEARTBEAT_INTERVAL = int(os.getenv("WORKER_HEARTBEAT_INTERVAL", 5)) # seconds between the heartbeats of a busy worker
+REAPER_DEAD_AFTER = float(os.getenv("REAPER_DEAD_AFTER", 30)) # seconds without a heartbeat before a job's worker is considered dead
+REAPER_INTERVAL = float(os.getenv("REAPER_INTERVAL", 10)) # seconds between reaping passes
+REAPER_MAX_REQUEUES = int(os.getenv("REAPER_MAX_REQUEUES", 2)) # times a job is requeued with its retries intact
+
+REAPER_LOCK_KEY = "reaper:lock" # set while a reaping pass is due, so a single process reaps every REAPER_INTERVAL
+
+
+def reap_queue(queue: Queue, now: float) -> list[float]:
+    """
+    Requeue the started jobs of a queue whose workers stopped heartbeating.
+
+    Args:
+        queue (Queue): The queue
+        now (float): Unix time of the reaping pass
+    Returns:
+        recoveries (list[float]): Seconds from each requeued job's last heartbeat to it being requeued
+    """
+    conn = queue.connection
+    registry = queue.started_job_registry
+    recoveries = []
+    for job_id, execution_id in registry.get_job_and_execution_ids(cleanup=False):
+        job = queue.fetch_job(job_id)
+        if job is None or job.get_status(refresh=False) != JobStatus.STARTED:
+            continue # finished in the meantime, or expired
+        last_heartbeat = job.last_heartbeat or job.started_at
+        if last_heartbeat is None or now - last_heartbeat.timestamp() < REAPER_DEAD_AFTER:
+            continue
+
+        execution = Execution(id=execution_id, job_id=job_id, connection=conn)
+        requeues = job.meta.get("requeues", 0)
+        if requeues >= REAPER_MAX_REQUEUES:
+            # expire the entry so RQ retries or fails the job like any abandoned job, running its failure callback
+            if conn.zadd(registry.key, {execution.composite_key: 0}, xx=True, ch=True):
+                logger.warning(f"Job={job_id} on queue={queue.name} lost its worker {requeues + 1} times, handing it to RQ's abandoned job handling")
+                registry.cleanup(now)
+            continue
+
+        # removing the entry claims the job, another reaper that got there first has already requeued it
+        if not conn.zrem(registry.key, execution.composite_key):
+            continue
+        job.meta["requeues"] = requeues + 1
+        with conn.pipeline() as pipe:
+            execution.delete(job, pipe)
+            queue._enqueue_job(job, pipeline=pipe, at_front=True) # skips the dependency checks, the job already passed them
+            pipe.execute()
+
+        recovery = now - last_heartbeat.timestamp()
+        recoveries.append(recovery)
+        logger.warning(f"Requeued job={job_id} on queue={queue.name} with {job.retries_left} retries left, its worker was last seen {recovery:.1f}s ago")
+    return recoveries
+
+
+def release_deferred(queue: Queue) -> int:
+    """
+    Enqueue the deferred jobs of a queue whose dependencies are all finished, e.g. when a crash happened before they were released.
+
+    Args:
+        queue (Queue): The queue
+    Returns:
+        released (int): Number of jobs released
+    """
+    registry = queue.deferred_job_registry
+    released = 0
+    for job_id in registry.get_job_ids(cleanup=False):
+        job = queue.fetch_job(job_id)
+        # jobs held back by the fair-share scheduler are deferred too but don't have dependencies
+        if job is None or not job.dependency_ids:
+            continue
+
+        # RQ's enqueue_dependents releases the job too when its last dependency finishes. It watches the dependencies' dependents sets
+        # and changes the job's status, so watching both and removing the job from the sets makes whichever of the two commits second
+        # start over and see the job is already released
+        dependents_keys = [Job.dependents_key_for(dependency_id) for dependency_id in job._dependency_ids]
+        with queue.connection.pipeline() as pipe:
+            try:
+                pipe.watch(job.key, *dependents_keys)
+                if pipe.hget(job.key, "status") != JobStatus.DEFERRED.value.encode() or not job.dependencies_are_met(pipeline=pipe):
+                    continue
+                pipe.multi()
+                registry.remove(job, pipeline=pipe)
+                for key in dependents_keys:
+                    pipe.srem(key, job.id)
+                queue._enqueue_job(job, pipeline=pipe)
+                pipe.execute()
+            except WatchError:
+                continue # released by RQ in the meantime, or checked again on the next pass
+        released += 1
+        logger.warning(f"Released deferred job={job_id} on queue={queue.name}, its dependencies had finished")
+    return released
+
+
+def reap(redis_conn: Redis, queues: list[str] = None) -> int:
+    """
+    Requeue the jobs of dead workers and release stranded deferred jobs on every queue, recording each queue's recovery times.
+
+    Args:
+        redis_conn (Redis): Redis connection object
+        queues (list[str]): Names of the queues to reap, defaults to every queue priority
+    Returns:
+        requeued (int): Number of jobs requeued
+    """
+    now = time.time()
+    requeued = 0
+    for name in queues or QUEUE_PRIORITIES:
+        queue = get_queue(name)
+        recoveries = reap_queue(queue, now)
+        for recovery in recoveries:
+            record_recovery(name, recovery, redis_conn)
+        requeued += len(recoveries)
+        release_deferred(queue)
+    return requeued
+
+
+def maybe_reap(redis_conn: Redis) -> None:
+    """
+    Reap if no other process has in the last REAPER_INTERVAL seconds. Never raises so it can be called from workers.
+
+    Args:
+        redis_conn (Redis): Redis connection object
+    """
+    try:
+        if redis_conn.set(REAPER_LOCK_KEY, 1, nx=True, px=int(REAPER_INTERVAL * 1000)):
+            reap(redis_conn)
+    except Exception as e:
+        logger.error(f"Failed to reap the jobs of dead workers: {str(e)}")
+
+
+if __name__ == "__main__":
+    conn = get_redis_con()
+    logger.info(f"Starting reaper, jobs are requeued after {REAPER_DEAD_AFTER:g}s without a heartbeat")
+    while True:
+        maybe_reap(conn)
+        time.sleep(REAPER_INTERVAL)
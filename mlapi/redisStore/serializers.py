@@ -0,0 +1,143 @@
+"""
+Compact serializers for RQ job data, metadata, and results.
+
+RQ pickles everything by default, including the full pydantic results returned by our tasks. The compact serializer stores
+pydantic models as their validated field values (JSON or msgpack) and can optionally compress them with zstd.
+"""
+import os
+import json
+import pickle
+from functools import lru_cache
+from pydantic import BaseModel
+from dotenv import load_dotenv
+
+load_dotenv() # load environment variables
+
+SERIALIZERS = ["pickle", "json", "msgpack"] # supported values of the RQ_SERIALIZER environment variable
+
+# every compact payload starts with a one byte header so payloads written by the default pickle serializer (before switching) can still be read
+JSON_HEADER = b"J"
+MSGPACK_HEADER = b"M"
+ZSTD_HEADER = b"Z"
+
+MODEL_KEY = "__model__" # marks an encoded pydantic model
+DATA_KEY = "__data__"
+
+
+def _encode(obj):
+    """
+    Convert values JSON/msgpack can't represent natively into plain data.
+    """
+    if isinstance(obj, BaseModel):
+        model = type(obj)
+        if "<locals>" in model.__qualname__:
+            return obj.model_dump(mode="json") # models defined inside functions can't be imported again, store their fields only
+        return {MODEL_KEY: f"{model.__module__}.{model.__qualname__}", DATA_KEY: obj.model_dump(mode="json")}
+    if isinstance(obj, (tuple, set)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} can't be serialized by the compact serializer")
+
+
+@lru_cache(maxsize=1)
+def _allowed_models() -> dict[str, type[BaseModel]]:
+    """
+    Pydantic models payloads may be decoded into, by the name _encode stores: the schema classes the tasks' results are made of.
+    """
+    import schemas
+    return {
+        f"{obj.__module__}.{obj.__qualname__}": obj
+        for obj in vars(schemas).values()
+        if isinstance(obj, type) and issubclass(obj, BaseModel) and obj.__module__.startswith("schemas.")
+    }
+
+
+def _decode(obj: dict):
+    """
+    Rebuild pydantic models that were encoded by _encode. Only schema classes are rebuilt, a payload never chooses which module is imported.
+    """
+    if MODEL_KEY not in obj:
+        return obj
+
+    model = _allowed_models().get(obj[MODEL_KEY])
+    if model is None:
+        raise TypeError(f"{obj[MODEL_KEY]} is not a schema model the compact serializer can decode")
+    return model.model_validate(obj[DATA_KEY])
+
+
+class CompactSerializer:
+    """
+    RQ serializer that stores job data, metadata, and results as JSON or msgpack (optionally zstd-compressed) instead of pickles.
+
+    Args:
+        format (str): "json" or "msgpack"
+        compress (bool): Whether to zstd-compress payloads (requires the zstandard package)
+    """
+
+    def __init__(self, format: str = "json", compress: bool = False):
+        if format not in ("json", "msgpack"):
+            raise ValueError(f"Invalid compact serializer format '{format}'. Must be one of: json, msgpack.")
+
+        self.format = format
+        if format == "msgpack":
+            import msgpack
+            self._msgpack = msgpack
+
+        self._compressor = self._decompressor = None
+        if compress:
+            try:
+                import zstandard
+            except ImportError as e:
+                raise ImportError("zstd compression requires the zstandard package, install it with `uv sync --extra compact`.") from e
+            self._compressor = zstandard.ZstdCompressor(level=3)
+            self._decompressor = zstandard.ZstdDecompressor()
+
+    def dumps(self, obj) -> bytes:
+        if self.format == "msgpack":
+            payload = MSGPACK_HEADER + self._msgpack.packb(obj, default=_encode, use_bin_type=True)
+        else:
+            payload = JSON_HEADER + json.dumps(obj, default=_encode, separators=(",", ":")).encode()
+
+        if self._compressor is not None:
+            payload = ZSTD_HEADER + self._compressor.compress(payload)
+        return payload
+
+    def loads(self, data: bytes):
+        header = data[:1]
+        if header == ZSTD_HEADER:
+            if self._decompressor is None:
+                import zstandard
+                self._decompressor = zstandard.ZstdDecompressor()
+            data = self._decompressor.decompress(data[1:])
+            header = data[:1]
+
+        if header == JSON_HEADER:
+            return json.loads(data[1:], object_hook=_decode)
+        if header == MSGPACK_HEADER:
+            import msgpack
+            return msgpack.unpackb(data[1:], object_hook=_decode, raw=False, strict_map_key=False)
+
+        # payload was written by RQ's default serializer before switching to the compact one
+        return pickle.loads(data)
+
+
+@lru_cache(maxsize=1)
+def get_serializer():
+    """
+    Get the serializer configured by the RQ_SERIALIZER ("pickle", "json", or "msgpack") and RQ_COMPRESSION ("zstd" or empty) environment variables.
+
+    Every process that enqueues, works on, or fetches jobs must use the same serializer.
+
+    Returns:
+        serializer: Object implementing dumps/loads that can be passed to RQ queues, workers, and jobs (None means RQ's default pickle serializer)
+    """
+    name = os.getenv("RQ_SERIALIZER", "pickle").strip().lower()
+    compression = os.getenv("RQ_COMPRESSION", "").strip().lower()
+
+    if name not in SERIALIZERS:
+        raise ValueError(f"Invalid RQ_SERIALIZER '{name}'. Must be one of: {', '.join(SERIALIZERS)}.")
+    if compression not in ("", "zstd"):
+        raise ValueError(f"Invalid RQ_COMPRESSION '{compression}'. Must be 'zstd' or empty.")
+
+    if name == "pickle":
+        return None # RQ's default serializer
+    return CompactSerializer(format=name, compress=compression == "zstd")
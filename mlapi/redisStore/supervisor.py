@@ -0,0 +1,222 @@
+"""
+Supervisor that scales the number of local worker processes of each queue with its load instead of running a fixed number of replicas.
+
+Every few seconds it reads the queue health (see redisStore.health) and decides how many workers each queue needs from its backlog
+and the age of its oldest waiting job, within the configured min/max bounds. Every worker can have one request in flight to the LLM
+runner, so the total number of workers is also capped by how many concurrent requests the runner can serve (LLM_MAX_CONCURRENCY).
+
+Only the supervisor's own workers are counted toward a queue's needs, workers started elsewhere (e.g. other containers) scale
+themselves. Workers are started right away when a queue needs more of them, but only stopped once a queue has needed fewer workers for
+SUPERVISOR_SCALE_DOWN_DELAY seconds (hysteresis), one at a time and idle ones first. Stopped workers are sent SIGTERM so they finish
+their current job before exiting (RQ's warm shutdown). The jobs of workers that die mid-job are requeued by the reaper (see redisStore.reaper).
+
+Run with `python -m redisStore.supervisor high default` (queues default to SUPERVISOR_QUEUES).
+"""
+import os
+import sys
+import math
+import time
+import signal
+import socket
+import subprocess
+from rq.worker import WorkerStatus
+from rq.worker_registration import WORKERS_BY_QUEUE_KEY
+from redisStore.myconnection import get_redis_con
+from redisStore.health import count_workers, queue_health
+from redisStore.reaper import maybe_reap
+from utils.logger_config import get_logger
+from dotenv import load_dotenv
+
+load_dotenv() # load environment variables
+logger = get_logger(__name__)
+
+SUPERVISOR_QUEUES = os.getenv("SUPERVISOR_QUEUES", "high,default").split(",") # queues to manage workers for, in priority order
+SUPERVISOR_INTERVAL = float(os.getenv("SUPERVISOR_INTERVAL", 5)) # seconds between scaling decisions
+SUPERVISOR_JOBS_PER_WORKER = int(os.getenv("SUPERVISOR_JOBS_PER_WORKER", 2)) # waiting jobs one extra worker is expected to absorb
+SUPERVISOR_TARGET_WAIT = float(os.getenv("SUPERVISOR_TARGET_WAIT", 30)) # seconds a job may wait before the queue gets another worker
+SUPERVISOR_SCALE_DOWN_DELAY = float(os.getenv("SUPERVISOR_SCALE_DOWN_DELAY", 120)) # seconds a queue must need fewer workers before one is stopped
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 4)) # concurrent requests the LLM runner can serve (e.g. llama.cpp's --parallel)
+
+# the worker module is run from the backend's root directory so its imports resolve the same way as in docker-compose
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def get_bounds(queue: str) -> tuple[int, int]:
+    """
+    Get the min and max number of workers of a queue, e.g. SUPERVISOR_MAX_WORKERS_HIGH overrides SUPERVISOR_MAX_WORKERS for the high queue.
+
+    Args:
+        queue (str): Queue name
+    Returns:
+        bounds (tuple[int, int]): Min and max number of workers
+    """
+    min_workers = int(os.getenv(f"SUPERVISOR_MIN_WORKERS_{queue.upper()}", os.getenv("SUPERVISOR_MIN_WORKERS", 1)))
+    max_workers = int(os.getenv(f"SUPERVISOR_MAX_WORKERS_{queue.upper()}", os.getenv("SUPERVISOR_MAX_WORKERS", 4)))
+    return min_workers, max(min_workers, max_workers)
+
+
+class WorkerPool:
+    """
+    Worker processes the supervisor started for one queue.
+
+    Args:
+        queue (str): Queue name
+        min_workers (int): Workers to keep running even when the queue is empty
+        max_workers (int): Most workers the queue may have
+    """
+
+    def __init__(self, queue: str, min_workers: int, max_workers: int):
+        self.queue = queue
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.processes = [] # running workers
+        self.draining = [] # workers finishing their current job before exiting
+        self.scale_down_since = None # when the queue started needing fewer workers
+        self.busy = set() # pids of the running workers that are working on a job
+
+
+class Supervisor:
+    """
+    Spawns, scales, and reaps worker processes for each queue.
+
+    Args:
+        queues (list[str]): Queues to manage workers for, in priority order (earlier queues get LLM capacity first)
+    """
+
+    def __init__(self, queues: list[str]):
+        self.pools = [WorkerPool(queue, *get_bounds(queue)) for queue in queues]
+        self.conn = get_redis_con()
+        self.stopping = False
+
+    def spawn(self, pool: WorkerPool) -> None:
+        # in its own session so a Ctrl-C in the terminal only reaches the supervisor, which drains the worker with a single SIGTERM (a
+        # SIGINT followed by SIGTERM would make RQ cold shut down and abandon its job)
+        process = subprocess.Popen([sys.executable, "-m", "redisStore.worker", pool.queue], cwd=BACKEND_DIR, start_new_session=True)
+        pool.processes.append(process)
+        logger.info(f"Started worker pid={process.pid} for queue={pool.queue} ({len(pool.processes)} running)")
+
+    def drain(self, pool: WorkerPool) -> None:
+        # stop the newest idle worker (the newest one if all are busy), RQ workers finish their current job when they receive SIGTERM
+        idle = [p for p in pool.processes if p.pid not in pool.busy]
+        process = (idle or pool.processes)[-1]
+        pool.processes.remove(process)
+        process.send_signal(signal.SIGTERM)
+        pool.draining.append(process)
+        logger.info(f"Draining worker pid={process.pid} of queue={pool.queue} ({len(pool.processes)} running)")
+
+    def reap(self, pool: WorkerPool) -> None:
+        for process in [p for p in pool.processes if p.poll() is not None]:
+            pool.processes.remove(process)
+            logger.warning(f"Worker pid={process.pid} of queue={pool.queue} exited unexpectedly with code={process.returncode}")
+        for process in [p for p in pool.draining if p.poll() is not None]:
+            pool.draining.remove(process)
+            logger.info(f"Worker pid={process.pid} of queue={pool.queue} drained")
+
+    def update_busy(self) -> None:
+        """
+        Record which of the supervisor's running workers are working on a job, from the state RQ keeps in each worker's hash.
+        """
+        with self.conn.pipeline() as pipe:
+            for pool in self.pools:
+                pipe.smembers(WORKERS_BY_QUEUE_KEY % pool.queue)
+            keys = sorted(set().union(*pipe.execute()))
+        with self.conn.pipeline() as pipe:
+            for key in keys:
+                pipe.hmget(key, "pid", "hostname", "state")
+            workers = pipe.execute()
+
+        # pids are only unique on one host, and the worker hashes of other containers are in the same sets
+        hostname, busy_state = socket.gethostname().encode(), WorkerStatus.BUSY.value.encode()
+        busy = {int(pid) for pid, host, state in workers if pid and host == hostname and state == busy_state}
+        for pool in self.pools:
+            pool.busy = {process.pid for process in pool.processes if process.pid in busy}
+
+    def desired_workers(self, pool: WorkerPool, health: dict) -> int:
+        """
+        Number of workers a queue needs right now, within its min/max bounds.
+        """
+        # jobs started by workers elsewhere don't need one of the supervisor's workers, so only its own busy workers are counted
+        backlog = health["depth"] + health["fair_share_pending"]
+        desired = len(pool.busy) + math.ceil(backlog / SUPERVISOR_JOBS_PER_WORKER)
+
+        # jobs are waiting too long, add a worker even if the backlog looks small
+        if health["oldest_job_age"] is not None and health["oldest_job_age"] > SUPERVISOR_TARGET_WAIT:
+            desired = max(desired, len(pool.processes) + 1)
+
+        return min(max(desired, pool.min_workers), pool.max_workers)
+
+    def scale(self) -> None:
+        """
+        Reap exited workers and scale every queue's workers to its current load.
+        """
+        for pool in self.pools:
+            self.reap(pool)
+        maybe_reap(self.conn) # requeue the jobs of workers that died mid-job, here or in other containers
+        self.update_busy()
+
+        queues = [pool.queue for pool in self.pools]
+        report = {health["queue"]: health for health in queue_health(self.conn, queues)["queues"]}
+
+        # workers started elsewhere (e.g. other containers) also send requests to the LLM runner, counted once even if they listen on
+        # several of the queues
+        local_workers = sum(len(pool.processes) + len(pool.draining) for pool in self.pools)
+        external_workers = max(count_workers(self.conn, queues) - local_workers, 0)
+        headroom = max(LLM_MAX_CONCURRENCY - external_workers, 0)
+
+        now = time.monotonic()
+        for pool in self.pools:
+            # queues earlier in the list get the LLM capacity first, draining workers still hold theirs until they exit
+            target = min(self.desired_workers(pool, report[pool.queue]), max(headroom - len(pool.draining), pool.min_workers))
+            headroom = max(headroom - target - len(pool.draining), 0)
+            current = len(pool.processes)
+
+            if target > current:
+                pool.scale_down_since = None
+                for _ in range(target - current):
+                    self.spawn(pool)
+            elif target < current:
+                if pool.scale_down_since is None:
+                    pool.scale_down_since = now
+                elif now - pool.scale_down_since >= SUPERVISOR_SCALE_DOWN_DELAY:
+                    self.drain(pool)
+                    pool.scale_down_since = now # wait again before stopping the next one
+            else:
+                pool.scale_down_since = None
+
+    def stop(self, signum, frame) -> None:
+        logger.info(f"Supervisor received signal={signum}, draining all workers")
+        self.stopping = True
+
+    def run(self) -> None:
+        """
+        Scale the workers until the supervisor receives SIGTERM or SIGINT, then drain every worker and wait for them to exit.
+        """
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        for pool in self.pools:
+            for _ in range(pool.min_workers):
+                self.spawn(pool)
+
+        while not self.stopping:
+            try:
+                self.scale()
+            except Exception as e:
+                # keep the current workers running if Redis is briefly unavailable
+                logger.error(f"Failed to scale workers: {str(e)}")
+            time.sleep(SUPERVISOR_INTERVAL)
+
+        for pool in self.pools:
+            while pool.processes:
+                self.drain(pool)
+        for pool in self.pools:
+            for process in pool.draining:
+                process.wait()
+        logger.info("All workers drained, supervisor exiting")
+
+
+if __name__ == "__main__":
+    # Accept queue priorities as command-line arguments
+    queues = sys.argv[1:] or SUPERVISOR_QUEUES
+    logger.info(f"Starting worker supervisor for queues: {', '.join(queues)}")
+    Supervisor(queues).run()
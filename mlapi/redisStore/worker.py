@@ -1,6 +1,20 @@
 import sys
-from rq import Worker
+import math
+import time
+import random
+from rq import Retry, Worker
+from rq.job import Job
 from redisStore.myconnection import get_redis_con
+from redisStore.serializers import get_serializer
+from redisStore import fair_share
+from redisStore.health import record_completion
+from redisStore.deadlines import record_runtime
+from redisStore.reaper import WORKER_HEARTBEAT_INTERVAL, maybe_reap
+from redisStore.circuit_breaker import CIRCUIT_MAX_PARKS, CIRCUIT_OPEN_SECONDS, CircuitOpenError, earn_retry, spend_retry
+from redisStore.queue import SLACK_KEY, SlackQueue, get_task_name
+from redisStore.preload import preload
+from schemas import AnalysisOutcome
+from utils.tokens import PromptTooLongError, ResponseTruncatedError
 from utils.logger_config import get_logger
 import uuid
 logger = get_logger(__name__)
@@ -8,6 +22,103 @@ logger = get_logger(__name__)
 # Default list of queues to listen for jobs on
 DEFAULT_QUEUES = ["default", "high", "low"]
 
+# errors that fail a job the same way every time, so the job isn't retried
+NON_RETRYABLE_ERRORS = (PromptTooLongError, ResponseTruncatedError)
+
+
+class AnalysisJob(Job):
+    """
+    Job that is parked instead of failed when the LLM runners' circuits are open (see redisStore.circuit_breaker): it's rescheduled for
+    when a circuit may let requests through again, without running its failure callback, using up its retries, or releasing the jobs
+    that depend on it. Jobs parked more than CIRCUIT_MAX_PARKS times fail like any other job.
+
+    Whether a failed job may be retried is decided by the global retry budget before its failure callback runs, so the callback sees
+    the job's final retries_left and publishes the stage's failure when the budget denies the retry. Jobs that failed with one of the
+    NON_RETRYABLE_ERRORS aren't retried at all.
+    """
+    retry_budget_checked = False # whether the current failure already went through check_retry_budget
+
+    def check_retry_budget(self) -> None:
+        """
+        Spend a token of the global retry budget for the failed job's retry, or take its retries away if the budget is spent.
+        """
+        if self.retry_budget_checked:
+            return
+        self.retry_budget_checked = True
+        if self.should_retry and not spend_retry(self.connection):
+            logger.warning(f"Retry budget is spent, failing job={self.id} instead of retrying it ({self.retries_left} retries left)")
+            self.retries_left = 0
+
+    def execute_failure_callback(self, death_penalty_class, *exc_info):
+        if self.should_retry and isinstance(exc_info[1], NON_RETRYABLE_ERRORS):
+            logger.warning(f"Failing job={self.id} without retrying it, it would fail the same way again: {exc_info[1]}")
+            self.retries_left = 0
+        self.check_retry_budget()
+        super().execute_failure_callback(death_penalty_class, *exc_info)
+
+    def _execute(self):
+        try:
+            return super()._execute()
+        except CircuitOpenError as e:
+            parks = self.meta.get("parks", 0) + 1
+            if parks > CIRCUIT_MAX_PARKS:
+                raise
+            self.meta["parks"] = parks
+            self.save_meta()
+            # jittered so parked jobs don't all come back at once, only one of them gets to probe the runner anyway
+            delay = max(1, math.ceil(e.retry_at - time.time() + random.uniform(0, CIRCUIT_OPEN_SECONDS / 4)))
+            logger.warning(f"Parking job={self.id} for {delay}s ({parks}/{CIRCUIT_MAX_PARKS}): {e}")
+            # RQ doesn't count scheduled Retry results towards Retry.max, parks are counted in the job's meta instead
+            return Retry(max=CIRCUIT_MAX_PARKS, interval=delay)
+
+
+class AnalysisWorker(Worker):
+    """
+    Worker that moves jobs from the per-tenant sub-queues onto its queues right before it dequeues its next job,
+    counts completed jobs towards the queue throughput reported by redisStore.health, measures task runtimes for deadline scheduling,
+    caps the retries of failed jobs with the global retry budget, reaps the jobs of dead workers while it's busy (see redisStore.reaper),
+    and removes the jobs it dequeues from their queue's slack order (see redisStore.queue.SlackQueue).
+    """
+
+    def dequeue_job_and_maintain_ttl(self, timeout, max_idle_time=None):
+        if fair_share.FAIR_SHARE_ENABLED:
+            for queue in self.queues:
+                try:
+                    fair_share.dispatch(queue)
+                except Exception as e:
+                    # jobs are still dispatched by the next enqueue or by another worker, don't stop working over it
+                    logger.error(f"Failed to dispatch fair-share jobs onto queue={queue.name}: {str(e)}")
+        result = super().dequeue_job_and_maintain_ttl(timeout, max_idle_time)
+        if result is not None:
+            job, queue = result
+            try:
+                self.connection.zrem(SLACK_KEY.format(priority=queue.name), job.id) # the job is no longer on the queue
+            except Exception as e:
+                logger.error(f"Failed to remove job={job.id} from the slack order of queue={queue.name}: {str(e)}")
+        return result
+
+    def maintain_heartbeats(self, job):
+        super().maintain_heartbeats(job)
+        maybe_reap(self.connection)
+
+    def handle_job_success(self, job, queue, started_job_registry):
+        super().handle_job_success(job, queue, started_job_registry)
+        try:
+            earn_retry(self.connection)
+            record_completion(queue.name, self.connection)
+            # degraded and shed jobs return early, their runtimes would make the task look cheaper than it is
+            if job.get_meta(refresh=True).get("outcome", AnalysisOutcome.FULL.value) == AnalysisOutcome.FULL.value:
+                record_runtime(get_task_name(job.func_name), (job.ended_at - job.started_at).total_seconds(), self.connection)
+        except Exception as e:
+            logger.error(f"Failed to record completion of job={job.id} on queue={queue.name}: {str(e)}")
+
+    def handle_job_failure(self, job, queue, started_job_registry=None, exc_string=""):
+        # failures that don't run the failure callback (e.g. a killed work horse) haven't been through the retry budget yet
+        if isinstance(job, AnalysisJob) and self._stopped_job_id != job.id:
+            job.check_retry_budget()
+        super().handle_job_failure(job, queue, started_job_registry, exc_string)
+
+
 def get_worker(priorities=None):
     """
     Create and return a worker instance
@@ -24,10 +135,13 @@ def get_worker(priorities=None):
     
     conn = get_redis_con()
 
-    return Worker(priorities, connection=conn, name=f"Emma_Frost {uuid.uuid4().hex[:8]}") # create a worker instance that watches the given queue priorities, with in the given Redis server, and give them a custom name
+    return AnalysisWorker(priorities, connection=conn, serializer=get_serializer(), job_class=AnalysisJob, queue_class=SlackQueue, job_monitoring_interval=WORKER_HEARTBEAT_INTERVAL, name=f"Emma_Frost {uuid.uuid4().hex[:8]}") # create a worker instance that watches the given queue priorities, with in the given Redis server, and give them a custom name
 
 
 if __name__ == "__main__":
+    # import and warm everything jobs need once so every job's forked process inherits it
+    preload()
+
     # Accept queue priorities as command-line arguments
     if len(sys.argv) > 1:
         priorities = sys.argv[1:]
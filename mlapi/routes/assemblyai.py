@@ -2,15 +2,11 @@
 Routes for AssemblyAI related services like starting transcriptions.
 """
 from fastapi import APIRouter, HTTPException
-from assemblyai.streaming.v3 import (
-    StreamingClient,
-    StreamingClientOptions
-)
+from services.assemblyai import streaming_tokens
 from utils.logger_config import get_logger
-from dotenv import load_dotenv
-import os
 from schemas import (
     AAI_Token,
+    TokenPoolMetrics,
 )
 
 logger = get_logger(__name__) # create logger instance to log messages
@@ -33,18 +29,23 @@ async def request_token():
     """
     logger.info("Requesting temporary AssemblyAI authentication token...")
 
-    load_dotenv()
-    api_key = os.getenv("AAPI_KEY")
-    if not api_key:
-        raise KeyError("AAPI_KEY key not found in .env file.")
-    
-    client = StreamingClient(
-        StreamingClientOptions(
-            api_key=api_key,
-            api_host="streaming.assemblyai.com",
-        )
-    )
-
-    token = client.create_temporary_token(expires_in_seconds=60) # authentication token expires after 1 minute
+    # tokens are minted ahead of need, this only waits on AssemblyAI when the pool is empty
+    token = await streaming_tokens.get()
     logger.info("AssemblyAI authentication token request successful!")
-    return AAI_Token(token=token)
\ No newline at end of file
+    return AAI_Token(token=token)
+
+# GET /api/assemblyai/token/metrics
+@router.get(
+    "/token/metrics",
+    response_model=TokenPoolMetrics,
+    summary="Reports the state of the AssemblyAI token broker.",
+    description="Returns how many temporary tokens are ready, how long minting them takes, and how often requests found the pool empty."
+)
+def get_token_metrics() -> TokenPoolMetrics:
+    """
+    Report the AssemblyAI token broker's pool state, mint latency, and pool exhaustion.
+
+    Returns:
+        TokenPoolMetrics: The broker's metrics
+    """
+    return TokenPoolMetrics(**streaming_tokens.metrics())
@@ -1,8 +1,8 @@
 from fastapi import APIRouter, HTTPException, Depends
 from schemas import JobId, SentimentAnalysisRequest, SentimentAnalysisJobResponse
-from redisStore.myconnection import get_redis_con
+from redisStore.myconnection import get_async_redis_con
 from utils.logger_config import get_logger
-from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
 from services import jobs, orchestrator
 from pydantic import ValidationError
 
@@ -14,7 +14,7 @@ def get_redis():
     """
     Returns a Redis connnection instance.
     """
-    return get_redis_con()
+    return get_async_redis_con()
 
 # POST /api/audio_analysis
 @router.post(
@@ -65,7 +65,7 @@ async def start_audio_analysis_job(request: SentimentAnalysisRequest) -> JobId:
     summary="Get the status of an audio analysis job",
     description="Check the status of a previously started audio analysis job"
 )
-async def get_audio_analysis_job(job_id: str, redis: Redis = Depends(get_redis)) -> SentimentAnalysisJobResponse:
+async def get_audio_analysis_job(job_id: str, redis: AsyncRedis = Depends(get_redis)) -> SentimentAnalysisJobResponse:
     """
     Get the status of an audio analysis job.
 
@@ -83,7 +83,7 @@ async def get_audio_analysis_job(job_id: str, redis: Redis = Depends(get_redis))
             raise HTTPException(status_code=400, detail="job_id cannot be whitespace")
 
         logger.info(f"Fetching audio analysis job status for job_id: {job_id}")        
-        job_status_data = jobs.get_job_status(job_id, redis)
+        job_status_data = await jobs.get_job_status(job_id, redis)
         
         # Handle if job doesn't exist
         if job_status_data is None:
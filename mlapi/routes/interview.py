@@ -5,7 +5,9 @@ from schemas import (
     CreateInterviewRequest,
     AnalyzeInterviewRequest, 
     GetInterviewResponse,
-    Interview
+    Interview,
+    LiveTurnsRequest,
+    LiveTurnsResponse,
 )
 from data.interviews import (
     getUserInterviews,
@@ -13,7 +15,11 @@ from data.interviews import (
     createInterview,
 )
 
-from services.orchestrator import start_interview_analysis 
+from redisStore.myconnection import get_async_redis_con
+from services.orchestrator import start_interview_analysis, start_answer_analysis
+from services.live import ingest_turns, LiveSessionOwnerError
+from services.http_client import run_blocking
+from utils.transcript import questionText, answerText
 
 logger = get_logger(__name__) # create a logger instance to log messages
 
@@ -37,7 +43,8 @@ async def create_interview(request: CreateInterviewRequest):
         # Start analysis jobs on interview
         analysisRequest = AnalyzeInterviewRequest(
             user_id=request.userId, 
-            interview_id=request.interview.id
+            interview_id=request.interview.id,
+            speech=request.speech,
         )
 
         response = start_interview_analysis(analysisRequest) # start interview analysis and get the analysis job ids
@@ -48,6 +55,7 @@ async def create_interview(request: CreateInterviewRequest):
                                        star_job_id=response.star_job_id, competency_job_id=response.competency_job_id,
                                        overall_job_id=response.overall_job_id,
                                        filler_hedge_job_id=response.filler_hedge_job_id,
+                                       speech_metrics_job_id=response.speech_metrics_job_id,
                                        success=True)
     except Exception as e:
         logger.error(f"Unexpected internal server error occurred during interview analysis id={request.interview.id}: {e}")
@@ -56,6 +64,32 @@ async def create_interview(request: CreateInterviewRequest):
             detail="Interview has been saved in the database. But an unexpected internal server error occurred during interview analysis."
         )
 
+# POST /api/interview/live/{interview_id}/turns
+@router.post(
+    "/live/{interview_id}/turns",
+    response_model=LiveTurnsResponse,
+    summary="Send the new turns of an interview in progress.",
+    description="Buffers the final turns of the live transcript of an interview in progress and starts analyzing every answer as soon as the candidate finishes it, so only the per-answer results are left to combine once the interview is created.",
+)
+async def ingest_live_turns(interview_id: str, request: LiveTurnsRequest) -> LiveTurnsResponse:
+    try:
+        index, completed = await ingest_turns(request.user_id, interview_id, request.turns, get_async_redis_con())
+
+        job_ids = []
+        for question in completed:
+            # enqueueing uses the synchronous Redis client, keep it off the event loop since this is called for every turn
+            job_ids += await run_blocking(start_answer_analysis, request.user_id, interview_id, question, questionText(index, question), answerText(index, question))
+
+        return LiveTurnsResponse(turns=len(index.speakers), answers=sum(end < len(index.speakers) for end in index.answer_ends), job_ids=job_ids)
+    except LiveSessionOwnerError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+    except Exception as e:
+        logger.error(f"Unexpected internal server error occurred while receiving the turns of interview={interview_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected internal server error occurred while receiving the interview's turns."
+        )
+
 # GET /api/interview/{user_id}/{interview_id}
 @router.get(
     "/{user_id}/{interview_id}/",
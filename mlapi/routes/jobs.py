@@ -0,0 +1,243 @@
+"""
+Routes for polling the status of analysis jobs in bulk and for streaming their completion events.
+"""
+import json
+import time
+import asyncio
+from contextlib import AsyncExitStack
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+from redisStore.myconnection import get_redis_con, get_async_redis_con
+from redisStore.memory import memory_report
+from redisStore.health import queue_health
+from utils.logger_config import get_logger
+from schemas import JobStatusBatchRequest, JobStatusBatchResponse, JobStatus, MemoryReport, QueueHealthReport
+from services import jobs, events
+
+logger = get_logger(__name__)
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+MAX_BATCH_SIZE = 50 # maximum number of jobs that can be polled in a single request
+KEEPALIVE_INTERVAL = 15 # seconds between SSE keep-alive comments so proxies don't close idle streams
+SNAPSHOT_INTERVAL = 60 # seconds without events after which a stream re-reads its stages' statuses, in case it missed an event
+
+def get_redis():
+    """
+    Returns a Redis connection instance.
+    """
+    return get_redis_con()
+
+def get_async_redis():
+    """
+    Returns an asyncio Redis connection instance for async route handlers.
+    """
+    return get_async_redis_con()
+
+# POST /api/jobs/status
+@router.post(
+    "/status",
+    response_model=JobStatusBatchResponse,
+    summary="Poll the status of several jobs at once",
+    description="Returns the status of every given job (or of every analysis job started on the given interview) in a single response. Results are only included if include_results is set.",
+)
+async def get_job_statuses(request: JobStatusBatchRequest, redis: AsyncRedis = Depends(get_async_redis)) -> JobStatusBatchResponse:
+    """
+    Poll several jobs with one pipelined Redis read instead of polling each job's endpoint separately.
+
+    Args:
+        request (JobStatusBatchRequest): The job ids and/or interview id to poll.
+        redis (AsyncRedis): Asyncio Redis connection injected by FastAPI's Depends.
+    Returns:
+        JobStatusBatchResponse: The status of every job that was found and the ids of the jobs that weren't.
+    Raises:
+        HTTPException: If no jobs were requested, too many were requested, or an internal error occurs.
+    """
+    try:
+        job_ids = [job_id.strip() for job_id in request.job_ids if job_id.strip()]
+
+        # add the analysis jobs started on the interview
+        stages = {}
+        if request.interview_id:
+            stages = await jobs.get_interview_jobs(request.interview_id.strip(), redis)
+            if not stages and not job_ids:
+                logger.warning(f"No analysis jobs found for interview={request.interview_id}")
+                raise HTTPException(status_code=404, detail=f"No analysis jobs found for interview: {request.interview_id}")
+            job_ids += [job_id for job_id in stages.values() if job_id not in job_ids]
+
+        if not job_ids:
+            raise HTTPException(status_code=400, detail="Either job_ids or interview_id must be provided")
+        if len(job_ids) > MAX_BATCH_SIZE:
+            raise HTTPException(status_code=400, detail=f"Can't poll more than {MAX_BATCH_SIZE} jobs at once")
+
+        logger.info(f"Fetching status of {len(job_ids)} jobs")
+        statuses, missing = await jobs.get_job_statuses(job_ids, redis, include_results=request.include_results)
+
+        return JobStatusBatchResponse(jobs=statuses, stages=stages, missing=missing)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Internal server error fetching job statuses: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Internal server error fetching job statuses: {str(e)}")
+
+
+def format_sse(event: dict) -> str:
+    """
+    Format a stage event as a Server-Sent Event message.
+    """
+    return f"event: stage\ndata: {json.dumps(event)}\n\n"
+
+def final_status(event: dict) -> str | None:
+    """
+    Get the status the interview's analysis ended with if a stage event ends it, None otherwise.
+
+    Every stage is a dependency of the overall analysis, so once any stage has failed for good the overall analysis will never run.
+    """
+    if event["status"] == JobStatus.FAILED.value:
+        return JobStatus.FAILED.value
+    if event["stage"] == "overall" and event["status"] == JobStatus.COMPLETED.value:
+        return JobStatus.COMPLETED.value
+    return None
+
+def format_sse_end(interview_id: str, status: str) -> str:
+    """
+    Format the Server-Sent Event message sent right before the stream closes.
+    """
+    return f"event: end\ndata: {json.dumps({'interview_id': interview_id, 'status': status})}\n\n"
+
+# GET /api/jobs/events/{interview_id}
+@router.get(
+    "/events/{interview_id}",
+    summary="Stream the analysis stage events of an interview",
+    description="Server-Sent Events stream that pushes an event as soon as each analysis stage of the interview completes or fails. The stream sends an end event and closes once the overall analysis completes or any stage fails (the overall analysis can't run without it). The polling endpoints remain available as a fallback.",
+)
+async def stream_interview_events(interview_id: str, request: Request, redis: AsyncRedis = Depends(get_async_redis)):
+    """
+    Stream an interview's stage completion events to the client.
+
+    The current status of every stage is sent first so that stages finishing before the client subscribed aren't missed. The statuses
+    are read again whenever events may have been missed (the event subscription reconnected or no event arrived for SNAPSHOT_INTERVAL
+    seconds), and the stages whose status changed are sent.
+
+    Args:
+        interview_id (str): Id of the interview whose analysis to follow.
+        request (Request): Incoming request, used to stop streaming when the client disconnects.
+        redis (AsyncRedis): Asyncio Redis connection injected by FastAPI's Depends.
+    Returns:
+        StreamingResponse: text/event-stream of stage events.
+    Raises:
+        HTTPException: If the interview has no analysis jobs, or the event subscription isn't available.
+    """
+    interview_id = interview_id.strip()
+    stages = await jobs.get_interview_jobs(interview_id, redis)
+    if not stages:
+        logger.warning(f"No analysis jobs found for interview={interview_id}")
+        raise HTTPException(status_code=404, detail=f"No analysis jobs found for interview: {interview_id}")
+
+    # subscribe before the response starts so the client gets an error status instead of a stream that ends right away, and before
+    # taking the snapshot so no event can slip in between the two
+    subscriptions = AsyncExitStack()
+    try:
+        subscription = await subscriptions.enter_async_context(events.subscribe_stage_events(interview_id))
+    except asyncio.TimeoutError:
+        logger.error(f"Stage events subscription isn't active, can't stream the events of interview={interview_id}")
+        raise HTTPException(status_code=503, detail="Stage events are unavailable right now, poll /api/jobs/status instead")
+
+    job_stages = {job_id: stage for stage, job_id in stages.items()}
+    sent = {} # job id -> status last sent to the client
+
+    async def snapshot():
+        """
+        Stage events for the stages whose status changed since it was last sent.
+        """
+        statuses, _ = await jobs.get_job_statuses(list(job_stages), redis)
+        for status in statuses:
+            if sent.get(status.job_id) != status.status.value:
+                sent[status.job_id] = status.status.value
+                yield {"interview_id": interview_id, "stage": job_stages[status.job_id], "job_id": status.job_id, "status": status.status.value}
+
+    async def event_stream():
+        async with subscriptions:
+            ended = None
+            async for event in snapshot():
+                yield format_sse(event)
+                ended = ended or final_status(event)
+            if ended:
+                yield format_sse_end(interview_id, ended)
+                return
+
+            last_sent = last_event = time.monotonic()
+            while not await request.is_disconnected():
+                event = await events.next_stage_event(subscription)
+                if event is None and time.monotonic() - last_event < SNAPSHOT_INTERVAL:
+                    if time.monotonic() - last_sent >= KEEPALIVE_INTERVAL:
+                        last_sent = time.monotonic()
+                        yield ": keepalive\n\n"
+                    continue
+
+                last_event = time.monotonic()
+                if event is None or event is events.RESYNC:
+                    pending = [event async for event in snapshot()]
+                elif sent.get(event["job_id"]) == event["status"]:
+                    pending = [] # already sent by a snapshot
+                else:
+                    sent[event["job_id"]] = event["status"]
+                    pending = [event]
+                for event in pending:
+                    last_sent = time.monotonic()
+                    yield format_sse(event)
+                    if final_status(event):
+                        yield format_sse_end(interview_id, final_status(event))
+                        return
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+# GET /api/jobs/memory
+@router.get(
+    "/memory",
+    response_model=MemoryReport,
+    summary="Report Redis memory usage by key class",
+    description="Scans the Redis keyspace and reports the number of keys and memory used by each key class, e.g. job hashes, job results, and registries.",
+)
+def get_memory_report(redis: Redis = Depends(get_redis)) -> MemoryReport:
+    """
+    Report how much Redis memory each class of keys uses.
+
+    Args:
+        redis (Redis): Redis connection injected by FastAPI's Depends.
+    Returns:
+        MemoryReport: Total and per key class memory usage.
+    Raises:
+        HTTPException: If an internal error occurs.
+    """
+    try:
+        return MemoryReport(**memory_report(redis))
+    except Exception as e:
+        logger.error(f"Internal server error creating memory report: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Internal server error creating memory report: {str(e)}")
+
+# GET /api/jobs/queues/health
+@router.get(
+    "/queues/health",
+    response_model=QueueHealthReport,
+    summary="Report the health of every queue",
+    description="Reports the depth, oldest waiting job age, deferred/scheduled/started job counts, worker utilization, throughput, and recovery time from dead workers of each queue in a single Redis round-trip. Meant to be polled by autoscalers.",
+)
+def get_queue_health(redis: Redis = Depends(get_redis)) -> QueueHealthReport:
+    """
+    Report the health of every queue.
+
+    Args:
+        redis (Redis): Redis connection injected by FastAPI's Depends.
+    Returns:
+        QueueHealthReport: Health of each queue.
+    Raises:
+        HTTPException: If an internal error occurs.
+    """
+    try:
+        return QueueHealthReport(**queue_health(redis))
+    except Exception as e:
+        logger.error(f"Internal server error creating queue health report: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Internal server error creating queue health report: {str(e)}")
@@ -10,8 +10,8 @@ from schemas import (
 )
 from services.orchestrator import start_sentiment_analysis
 from utils.logger_config import get_logger
-from redisStore.myconnection import get_redis_con
-from rq.job import Job
+from services import jobs
+from redisStore.myconnection import get_async_redis_con
 
 logger = get_logger(__name__)
 router = APIRouter(prefix="/api/llm", tags=["LLM"])
@@ -40,25 +40,26 @@ async def sentiment_analysis(request: SentimentAnalysisRequest) -> JobId:
 async def poll_sentiment_job(job_id: str):
     # poll job
     try:
-        redis_conn = get_redis_con()
-        job = Job.fetch(job_id, connection=redis_conn)
+        job_status_data = await jobs.get_job_status(job_id, get_async_redis_con())
     except Exception as e:
         raise HTTPException(status_code=404, detail=f"Error polling job: {e}")
-    
-    if job.is_finished:
-        print(f"Sentiment job={job_id} compeleted: {job.result.model_dump()}")
-        # job result will SentimentAnalysisResult object
+    if job_status_data is None:
+        raise HTTPException(status_code=404, detail=f"Error polling job: no job with id {job_id}")
+
+    if job_status_data.status == JobStatus.COMPLETED:
+        logger.info(f"Sentiment job={job_id} completed: {job_status_data.result}")
+        # job result is the SentimentAnalysisResult's fields
         return SentimentAnalysisJobResponse(
             status=JobStatus.COMPLETED,
-            result=job.result,
+            result=job_status_data.result,
         )
-    elif job.is_failed:
+    elif job_status_data.status == JobStatus.FAILED:
         return SentimentAnalysisJobResponse(
             status=JobStatus.FAILED,
-            error=str(job.exc_info)
+            error=job_status_data.error
         )
     else:
         # job is still processing
         return SentimentAnalysisJobResponse(
             status=JobStatus.PROCESSING,
-        )
\ No newline at end of file
+        )
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, HTTPException, Depends
-from redisStore.myconnection import get_redis_con
+from redisStore.myconnection import get_async_redis_con
 from utils.logger_config import get_logger
 from schemas import StarFeedbackRequest, StarFeedbackResponse, JobId
 from services import orchestrator, jobs
-from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
 
 logger = get_logger(__name__)
 
@@ -13,7 +13,7 @@ def get_redis():
     """
     Get Redis connection
     """
-    return get_redis_con()
+    return get_async_redis_con()
 
 # POST /api/star_feedback/analyze
 @router.post(
@@ -61,13 +61,13 @@ async def analyze_star_method(request: StarFeedbackRequest):
         summary="Poll the status a STAR feedback analysis job",
         description="Get the STAR feedback analysis job status using the job ID",
         )
-async def get_star_feedback_result(job_id: str, redis : Redis=Depends(get_redis)):
+async def get_star_feedback_result(job_id: str, redis: AsyncRedis = Depends(get_redis)):
     """
     Get the STAR feedback analysis job status using the job ID
 
     Args:
         job_id (str): The ID of the STAR feedback analysis job.
-        redis (Redis): Redis connection injected by FastAPI's Depends.
+        redis (AsyncRedis): Asyncio Redis connection injected by FastAPI's Depends.
     Returns: 
         StarFeedbackResponse: The job status and result in the form of StarFeedbackResponse schema.
     Raises:
@@ -77,7 +77,7 @@ async def get_star_feedback_result(job_id: str, redis : Redis=Depends(get_redis)
 
     # Attempt to get job status
     try:
-        job_status_data = jobs.get_job_status(job_id, redis)
+        job_status_data = await jobs.get_job_status(job_id, redis)
         if job_status_data is None:
             logger.warning(f"Job not found: {job_id}")
             raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
@@ -2,7 +2,6 @@ from fastapi import APIRouter, HTTPException, status
 from utils.logger_config import get_logger
 from schemas import CreateUserResponse, CreateUserRequest, GetUserRequest, GetUserResponse
 from services.firebase_init import get_firestore_client
-import cloudinary
 from dotenv import load_dotenv
 import os
 import time
@@ -72,6 +71,9 @@ async def get_signature():
                 detail="Missing API Secret"
             )
         
+        # imported on first use so the SDK isn't loaded when the API starts
+        import cloudinary.utils
+
         # generate signature and timestamp required by Cloudinary for signed uploads
         timestamp = int(time.time()) # timestamp in seconds
         signature = cloudinary.utils.api_sign_request(
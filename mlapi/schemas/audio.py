@@ -10,6 +10,24 @@ class AAI_Token(BaseModel):
     """
     token: str
 
+class TokenPoolMetrics(BaseModel):
+    """
+    Response model for the state and mint statistics of a pool of pre-minted tokens
+    """
+
+    name: str
+    size: int # tokens the pool keeps ready
+    available: int # tokens ready to be handed out right now
+    mints: int # tokens minted since the API started
+    mint_failures: int # mints that failed
+    rate_limited: int # mints delayed by the mint rate cap
+    served: int # requests served straight from the pool
+    exhausted: int # requests that found the pool empty and waited on an on-demand mint
+    expired: int # tokens dropped before being handed out
+    mint_latency_ms_avg: float | None = None # average latency of the recent mints (None before the first mint)
+    mint_latency_ms_p95: float | None = None
+    mint_latency_ms_max: float | None = None
+
 class Sentiments(str, Enum):
     """
     Audio sentiments detected by AssemblyAI
@@ -52,9 +70,11 @@ class SentimentAnalysisRequest(BaseModel):
     Args:
         user_id: The id of the user whose interview we're analyzing
         interview_id: The id of the interview who owns the transcript to analyze
+        deadline: Unix time the result is needed by, jobs that start past it are degraded or shed (defaults to ANALYSIS_DEADLINE seconds from now)
     """
     user_id: str
     interview_id: str
+    deadline: float | None = None
 
 class FillerHedgeRequest(BaseModel):
     """
@@ -63,9 +83,11 @@ class FillerHedgeRequest(BaseModel):
     Args:
         user_id: The id of the user whose interview we're analyzing
         interview_id: The id of the interview who owns the transcript to analyze
+        deadline: Unix time the result is needed by, jobs that start past it are degraded or shed (defaults to ANALYSIS_DEADLINE seconds from now)
     """
     user_id: str
     interview_id: str
+    deadline: float | None = None
 
 class FillerHedgeResponse(BaseModel):
     """
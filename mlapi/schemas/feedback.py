@@ -26,6 +26,15 @@ class OverallCompetencyFeedback(BaseModel):
     # overall_score: float # Overall score
     # summary: str # Summary of overall performance including evaluations for individual competencies
 
+class CompetencyAnalysisResult(BaseModel):
+    """
+    Response schema to define the shape of the expected LLM response for competency analysis.
+    """
+
+    clarity: CompetencyFeedback  # Evaluation on communication clarity
+    confidence: CompetencyFeedback # Evaluation on confidence
+    engagement: CompetencyFeedback # Evaluation on engagement
+
 class CompetencyFeedbackRequest(BaseModel):
     """
     Request model for competency feedback.
@@ -33,9 +42,11 @@ class CompetencyFeedbackRequest(BaseModel):
     Args:
         user_id: The id of the user whose interview we're analyzing
         interview_id: The id of the interview who owns the transcript to analyze
+        deadline: Unix time the result is needed by, jobs that start past it are degraded or shed (defaults to ANALYSIS_DEADLINE seconds from now)
     """
     user_id: str
     interview_id: str
+    deadline: float | None = None
 
 class StarFeedbackRequest(BaseModel):
     """
@@ -44,9 +55,11 @@ class StarFeedbackRequest(BaseModel):
     Args:
         user_id: The id of the user whose interview we're analyzing
         interview_id: The id of the interview who owns the transcript to analyze
+        deadline: Unix time the result is needed by, jobs that start past it are degraded or shed (defaults to ANALYSIS_DEADLINE seconds from now)
     """
     user_id: str
     interview_id: str
+    deadline: float | None = None
     
 class StarBreakdown(BaseModel):
     """
@@ -78,6 +91,14 @@ class StarAnalysisResult(BaseModel):
     star_percentages: StarPercentages
 
 
+class StarAnswerEvaluation(StarAnalysisResult):
+    """
+    Result of STAR analysis for a single question-answer pair analyzed on its own, i.e. with its own score and feedback
+    """
+    score: int # Adherence of the answer to the STAR framework out of 10
+    feedback: str # Actionable feedback on the answer
+
+
 class StarFeedbackEvaluation(BaseModel):
     """
     Results after performing STAR feedback analysis
@@ -106,6 +127,8 @@ class OverallAnalysisRequest(BaseModel):
         star_job_id: The id of the related STAR analysis job.
         competency_job_id: The id of the related competencies analysis job. 
         filler_hedge_job_id: The id of the related filler words and hedge phrases extraction job which must be completed before final analysis can begin.
+        speech_metrics_job_id: The id of the related speech metrics job, None when no word timestamps were sent.
+        deadline: Unix time the result is needed by, jobs that start past it are degraded or shed (defaults to ANALYSIS_DEADLINE seconds from now)
     """
     user_id: str
     interview_id: str
@@ -113,6 +136,8 @@ class OverallAnalysisRequest(BaseModel):
     star_job_id: str
     competency_job_id: str
     filler_hedge_job_id: str
+    speech_metrics_job_id: str | None = None
+    deadline: float | None = None
 
 
 class OverallAnalysisResponse(BaseModel):
@@ -2,7 +2,8 @@
 Interview-related schemas
 """
 
-from pydantic import BaseModel
+from enum import Enum
+from pydantic import BaseModel, model_validator
 from schemas.feedback import (
     OverallCompetencyFeedback,
 )
@@ -24,6 +25,47 @@ class Metrics(BaseModel):
     overall_score: int | None # overall interview performance score
     wpm: int | None # user's words per minute (pacing)
 
+class SpeechTimings(BaseModel):
+    """
+    Word-level timestamps of the candidate's speech from the live AssemblyAI transcript, as parallel arrays (one entry per word).
+    """
+    starts: list[int] # when each word started, in milliseconds since the transcription started
+    ends: list[int] # when each word ended, in milliseconds since the transcription started
+    answers: list[int] # index of the answer each word belongs to (i.e. the number of questions asked before it)
+
+    @model_validator(mode="after")
+    def check_timings(self) -> "SpeechTimings":
+        # the metrics are computed with grouped array operations that assume one entry per word, in the order the words were spoken
+        if not len(self.starts) == len(self.ends) == len(self.answers):
+            raise ValueError("starts, ends, and answers must have one entry per word")
+        if any(value < 0 for values in (self.starts, self.ends, self.answers) for value in values):
+            raise ValueError("starts, ends, and answers can't be negative")
+        if any(end < start for start, end in zip(self.starts, self.ends)):
+            raise ValueError("every word must end at or after its start")
+        if any(later < earlier for earlier, later in zip(self.starts, self.starts[1:])):
+            raise ValueError("words must be sorted by their start")
+        return self
+
+class SpeechMetrics(BaseModel):
+    """
+    Speech-rate and pacing metrics computed from the candidate's word timestamps (see utils.speech_metrics)
+    """
+    wpm: int # words per minute while the candidate was answering
+    speaking_seconds: float # time spent answering
+    rate_timeline: list[int] # words per minute in each timeline_bucket_seconds window of the interview
+    timeline_bucket_seconds: int
+    pause_count: int # silences between words of an answer at least MIN_PAUSE_MS long
+    long_pause_count: int # pauses at least LONG_PAUSE_MS long
+    pause_median_ms: int | None = None # None when the candidate never paused
+    pause_p90_ms: int | None = None
+    pause_histogram: list[int] # number of pauses in each PAUSE_HISTOGRAM_EDGES_MS bin
+    answer_count: int
+    answer_words_mean: float
+    answer_words_median: float
+    answer_words_max: int
+    answer_seconds_mean: float
+    answer_seconds_max: float
+
 class SentimentPercents(BaseModel):
     """
     Model representing the shape of the overall sentiment analysis percentages.
@@ -32,6 +74,39 @@ class SentimentPercents(BaseModel):
     negative: int # percentage of the responses that were negative sentiment
     neutral: int  # percentage of the responses that were neutral sentiment
 
+class AnalysisOutcome(str, Enum):
+    """
+    How an analysis stage ran with respect to its deadline
+    """
+    FULL = "full" # the full analysis ran
+    DEGRADED = "degraded" # the job started past its deadline so a cheaper version of the analysis ran
+    SHED = "shed" # the job started past its deadline and was skipped
+
+class Speaker(int, Enum):
+    """
+    Who spoke a transcript turn
+    """
+    INTERVIEWER = 0 # the avatar asking the questions
+    CANDIDATE = 1 # the user being interviewed
+
+class TurnIndex(BaseModel):
+    """
+    Speaker-turn index of an interview transcript, parsed once (see utils.transcript.parseTranscript) and stored with the interview so tasks slice it instead of re-parsing the transcript.
+
+    Turns are stored as parallel arrays (turn i spans text[starts[i]:ends[i]]) and questions as parallel arrays of turn ranges
+    (question k is turns question_starts[k] to answer_starts[k] and its answer is turns answer_starts[k] to answer_ends[k]).
+    Consecutive turns of the same speaker are contiguous in text so a whole question or answer is a single slice.
+    """
+    version: int # parser version, indexes from older parsers are rebuilt
+    text: str # every turn's text without speaker labels, separated by newlines
+    speakers: list[Speaker] # who spoke each turn
+    starts: list[int] # offset of each turn in text
+    ends: list[int] # offset of the end of each turn in text (exclusive)
+    words: list[int] # number of words in each turn
+    question_starts: list[int] # first turn of each question (equal to its answer_start when the candidate spoke before any question)
+    answer_starts: list[int] # first turn of each answer
+    answer_ends: list[int] # turn after the last turn of each answer (exclusive)
+
 class Interview(BaseModel): 
     """
     Model representing an interview 
@@ -49,6 +124,9 @@ class Interview(BaseModel):
     sentiment: str | SentimentPercents | None = None
     url: str | None = None # download for user's side of the interview
     is_analyzed: bool = False # flag representing when an interview has completed their analysis
+    analysis_outcome: dict[str, AnalysisOutcome] | None = None # analysis stage -> how it ran, only stages that didn't run fully are recorded
+    turn_index: TurnIndex | None = None # speaker turns of the transcript, built when the interview is created
+    speech_metrics: SpeechMetrics | None = None # computed from the word timestamps when the client sends them
 
 class CreateInterviewRequest(BaseModel):
     """
@@ -56,6 +134,7 @@ class CreateInterviewRequest(BaseModel):
     """
     userId: str # user's id from Firebase Authentication
     interview: Interview # partially filled interview to insert
+    speech: SpeechTimings | None = None # candidate's word timestamps, the speech metrics stage only runs when they're sent
 
 class CreateInterviewResponse(BaseModel): 
     """
@@ -67,6 +146,7 @@ class CreateInterviewResponse(BaseModel):
     competency_job_id: str = ""
     overall_job_id: str = ""
     filler_hedge_job_id: str = ""
+    speech_metrics_job_id: str = ""
 
     success: bool
 
@@ -76,6 +156,9 @@ class AnalyzeInterviewRequest(BaseModel):
     """
     user_id: str
     interview_id: str
+    background: bool = False # whether nobody is waiting on the analysis (e.g. a re-analysis), background analyses get a longer deadline
+    deadline_seconds: int | None = None # seconds the analysis may take before its jobs are degraded or shed, overrides the default deadline
+    speech: SpeechTimings | None = None # candidate's word timestamps for the speech metrics stage
 
 class AnalyzeInterviewResponse(BaseModel):
     """
@@ -86,6 +169,44 @@ class AnalyzeInterviewResponse(BaseModel):
     competency_job_id: str
     filler_hedge_job_id: str
     overall_job_id: str
+    speech_metrics_job_id: str = "" # empty when no word timestamps were sent
+
+class LiveTurn(BaseModel):
+    """
+    Model representing a final turn of the live transcript of an interview in progress.
+    """
+    seq: int # position of the turn in the transcript, starting at 0
+    text: str # the turn as it's written to the transcript, i.e. "<speaker>: <text>"
+
+class LiveTurnsRequest(BaseModel):
+    """
+    Model representing the shape of the request made from the client to send the new turns of an interview in progress.
+    """
+    user_id: str # user's id from Firebase Authentication
+    turns: list[LiveTurn]
+
+class LiveTurnsResponse(BaseModel):
+    """
+    Model representing the response made after receiving the new turns of an interview in progress.
+    """
+    turns: int # number of turns received so far without gaps
+    answers: int # number of answers completed so far
+    job_ids: list[str] = [] # ids of the per-answer analysis jobs started by this request
+
+class SpeechMetricsRequest(BaseModel):
+    """
+    Request model to start a speech metrics job
+
+    Args:
+        user_id: The id of the user whose interview we're analyzing
+        interview_id: The id of the interview the word timestamps belong to
+        speech: The candidate's word timestamps
+        deadline: Unix time the result is needed by (defaults to ANALYSIS_DEADLINE seconds from now)
+    """
+    user_id: str
+    interview_id: str
+    speech: SpeechTimings
+    deadline: float | None = None
 
 class GetInterviewRequest(BaseModel):
     """
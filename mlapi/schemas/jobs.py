@@ -30,4 +30,77 @@ class JobResponse(BaseModel):
     job_id: str
     status: JobStatus
     result: Optional[Dict[str, Any]] = None
-    error: Optional[str] = None
\ No newline at end of file
+    error: Optional[str] = None
+
+
+class JobStatusBatchRequest(BaseModel):
+    """
+    Request model for polling several jobs at once.
+
+    Args:
+        job_ids: The ids of the jobs to poll
+        interview_id: Poll every analysis job started on this interview (used together with or instead of job_ids)
+        include_results: Whether to include job results and errors, by default only the statuses are returned
+    """
+
+    job_ids: List[str] = []
+    interview_id: Optional[str] = None
+    include_results: bool = False
+
+
+class JobStatusBatchResponse(BaseModel):
+    """
+    Response model for polling several jobs at once.
+    """
+
+    jobs: List[JobResponse] # status of every job that was found
+    stages: Dict[str, str] = {} # analysis stage -> job id (only populated when polling by interview id)
+    missing: List[str] = [] # ids of jobs that don't exist (or have expired)
+
+
+class KeyClassUsage(BaseModel):
+    """
+    Memory used by one class of Redis keys
+    """
+
+    keys: int # number of keys in the class
+    bytes: int # total memory used by the keys in bytes
+
+
+class MemoryReport(BaseModel):
+    """
+    Redis memory usage broken down by key class
+    """
+
+    total_keys: int
+    total_bytes: int
+    classes: Dict[str, KeyClassUsage] # key class, e.g. "rq:job" or "rq:results" -> usage
+
+
+class QueueHealth(BaseModel):
+    """
+    Backlog, waiting time, worker utilization, throughput, and recovery from dead workers of one queue
+    """
+
+    queue: str
+    depth: int # jobs waiting on the RQ queue
+    fair_share_pending: int # jobs held back in the per-user sub-queues by the fair-share scheduler
+    oldest_job_age: Optional[float] = None # seconds the oldest waiting job has been waiting (None if nothing is waiting)
+    deferred: int # jobs waiting on their dependencies, e.g. overall_analysis
+    scheduled: int # jobs scheduled to run later, e.g. retries
+    started: int # jobs currently running
+    workers: int # live workers listening on the queue
+    busy_workers: int # workers currently running a job
+    utilization: float # busy_workers / workers
+    throughput_per_minute: float # jobs completed per minute over the throughput window
+    requeued: int = 0 # jobs of dead workers requeued over the throughput window (see redisStore.reaper)
+    mean_recovery_seconds: Optional[float] = None # mean seconds from a dead worker's last heartbeat to its job being requeued (None if none were)
+
+
+class QueueHealthReport(BaseModel):
+    """
+    Health of every queue
+    """
+
+    timestamp: float # unix time the report was made at
+    queues: List[QueueHealth]
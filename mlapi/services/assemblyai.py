@@ -0,0 +1,74 @@
+"""
+Handles minting AssemblyAI temporary streaming tokens and brokering them from memory so a burst of users starting interviews doesn't
+become a burst of outbound calls in the critical path.
+
+Tokens are minted ahead of need (up to the recent demand), replaced before they expire, and minted at most AAI_TOKEN_MAX_MINT_RATE times
+per second.
+"""
+import os
+from dotenv import load_dotenv
+from services.http_client import run_blocking
+from services.token_pool import TokenPool
+from utils.logger_config import get_logger
+
+load_dotenv() # load environment variables
+logger = get_logger(__name__) # create logger instance to log messages
+
+AAI_TOKEN_POOL_SIZE = int(os.getenv("AAI_TOKEN_POOL_SIZE", 3)) # most temporary tokens kept ready, 0 mints every token on demand
+AAI_TOKEN_TTL = int(os.getenv("AAI_TOKEN_TTL", 60)) # seconds a token can be used to start a session after it's minted (at most 600)
+AAI_TOKEN_MARGIN = float(os.getenv("AAI_TOKEN_MARGIN", 15)) # tokens with less than this many seconds left aren't handed out
+AAI_TOKEN_REFRESH = float(os.getenv("AAI_TOKEN_REFRESH", 10)) # seconds before a token is dropped that its replacement is minted
+AAI_TOKEN_MAX_MINT_RATE = float(os.getenv("AAI_TOKEN_MAX_MINT_RATE", 5)) # most tokens minted per second, requests past it wait
+
+
+def create_temporary_token(api_key: str) -> str:
+    """
+    Mint a temporary AssemblyAI authentication token. Blocks until AssemblyAI responds.
+
+    Args:
+        api_key (str): AssemblyAI API key
+    Returns:
+        token (str): Temporary authentication token that expires after AAI_TOKEN_TTL seconds
+    """
+    # imported on first use so the SDK isn't loaded when the API starts
+    from assemblyai.streaming.v3 import (
+        StreamingClient,
+        StreamingClientOptions
+    )
+
+    client = StreamingClient(
+        StreamingClientOptions(
+            api_key=api_key,
+            api_host="streaming.assemblyai.com",
+        )
+    )
+    return client.create_temporary_token(expires_in_seconds=AAI_TOKEN_TTL)
+
+
+async def mint_streaming_token() -> str:
+    """
+    Mint a temporary AssemblyAI authentication token without blocking the event loop.
+
+    Returns:
+        token (str): Temporary authentication token
+    Raises:
+        KeyError: If the AssemblyAI API key is missing.
+    """
+    api_key = os.getenv("AAPI_KEY")
+    if not api_key:
+        raise KeyError("AAPI_KEY key not found in .env file.")
+
+    # the SDK is blocking, run it on the thread pool so other requests aren't held up
+    return await run_blocking(create_temporary_token, api_key)
+
+
+# temporary streaming tokens, started with the API (see main.lifespan)
+streaming_tokens = TokenPool(
+    "assemblyai",
+    mint_streaming_token,
+    size=AAI_TOKEN_POOL_SIZE,
+    ttl=AAI_TOKEN_TTL,
+    margin=AAI_TOKEN_MARGIN,
+    refresh=AAI_TOKEN_REFRESH,
+    max_mint_rate=AAI_TOKEN_MAX_MINT_RATE,
+)
@@ -0,0 +1,191 @@
+"""
+Publishes analysis stage completion events so clients can be notified as soon as a stage finishes instead of polling.
+
+Workers publish to a per-interview Redis pub/sub channel through RQ job callbacks, and the API fans the events out to subscribed clients.
+Each API process has a single subscription to every interview's channel, on its own connection, and hands the events to the streams
+following the interview in memory. Open streams don't hold Redis connections, so they can't starve the pool serving the other routes.
+Events published while the subscription is reconnecting are lost, so the streams are told to re-read their stages' statuses (RESYNC)
+once it's active again.
+"""
+import json
+import asyncio
+from contextlib import asynccontextmanager
+from redis import Redis
+from redisStore.myconnection import get_async_pubsub_con
+from schemas import JobStatus
+from utils.logger_config import get_logger
+
+logger = get_logger(__name__)
+
+INTERVIEW_EVENTS_CHANNEL = "interview:{interview_id}:events" # Redis pub/sub channel for an interview's stage events
+INTERVIEW_EVENTS_PATTERN = INTERVIEW_EVENTS_CHANNEL.format(interview_id="*") # pattern matching every interview's channel
+RECONNECT_DELAY = 1 # seconds the subscriber waits before reconnecting after losing its connection
+SUBSCRIBE_TIMEOUT = 5 # seconds a stream waits for the subscription to be active before giving up
+RESYNC = object() # handed to the streams after a reconnect, events may have been missed so they should re-read their stages' statuses
+
+
+def publish_stage_event(interview_id: str, stage: str, job_id: str, status: JobStatus, redis_conn: Redis) -> None:
+    """
+    Publish an analysis stage event for an interview.
+
+    Args:
+        interview_id (str): Id of the interview being analyzed
+        stage (str): Name of the analysis stage, e.g. "star"
+        job_id (str): Id of the stage's job
+        status (JobStatus): New status of the stage
+        redis_conn (Redis): Redis connection object
+    """
+    event = {
+        "interview_id": interview_id,
+        "stage": stage,
+        "job_id": job_id,
+        "status": status.value,
+    }
+    redis_conn.publish(INTERVIEW_EVENTS_CHANNEL.format(interview_id=interview_id), json.dumps(event))
+
+
+def on_stage_success(job, connection: Redis, result, *args, **kwargs):
+    """
+    RQ success callback that publishes a completed event for the job's analysis stage.
+    """
+    interview_id = job.meta.get("interview_id")
+    stage = job.meta.get("stage")
+    if not interview_id or not stage:
+        return
+
+    try:
+        publish_stage_event(interview_id, stage, job.id, JobStatus.COMPLETED, connection)
+    except Exception as e:
+        # never fail a job because its notification couldn't be sent, clients can still poll for the result
+        logger.error(f"Failed to publish completion of stage={stage} for interview={interview_id}: {e}")
+
+
+def on_stage_failure(job, connection: Redis, exc_type, exc_value, traceback):
+    """
+    RQ failure callback that publishes a failed event for the job's analysis stage once it has no retries left.
+    """
+    interview_id = job.meta.get("interview_id")
+    stage = job.meta.get("stage")
+    if not interview_id or not stage:
+        return
+
+    # the job is going to be retried so the stage hasn't failed yet
+    if job.retries_left:
+        return
+
+    try:
+        publish_stage_event(interview_id, stage, job.id, JobStatus.FAILED, connection)
+    except Exception as e:
+        logger.error(f"Failed to publish failure of stage={stage} for interview={interview_id}: {e}")
+
+
+class StageEventHub:
+    """
+    Single subscription to every interview's stage events, fanned out to the streams of the interviews they belong to.
+    """
+
+    def __init__(self):
+        self.listeners = {} # interview id -> queues of the streams following it
+        self.ready = None # set once the subscription is active
+        self.task = None # background reader
+
+    async def start(self) -> None:
+        """
+        Start the subscription if it isn't running, and wait until it's active so no event published afterwards is missed. Must be
+        called from the running event loop.
+        """
+        if self.task is None:
+            self.ready = asyncio.Event()
+            self.task = asyncio.create_task(self.read())
+        await asyncio.wait_for(self.ready.wait(), timeout=SUBSCRIBE_TIMEOUT)
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        self.listeners.clear()
+
+    async def read(self) -> None:
+        """
+        Hand every stage event to the streams following its interview until the task is cancelled, reconnecting when the connection
+        is lost.
+        """
+        reconnecting = False
+        while True:
+            redis_conn = get_async_pubsub_con()
+            pubsub = redis_conn.pubsub()
+            try:
+                await pubsub.psubscribe(INTERVIEW_EVENTS_PATTERN)
+                self.ready.set()
+                if reconnecting:
+                    reconnecting = False
+                    for queues in self.listeners.values():
+                        for queue in queues:
+                            queue.put_nowait(RESYNC)
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is None:
+                        continue
+                    event = json.loads(message["data"])
+                    for queue in self.listeners.get(event.get("interview_id"), ()):
+                        queue.put_nowait(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # new streams wait for the subscription instead of missing events, open ones keep their keepalives going meanwhile
+                self.ready.clear()
+                reconnecting = True
+                logger.error(f"Lost the stage events subscription, reconnecting in {RECONNECT_DELAY}s: {e}")
+                await asyncio.sleep(RECONNECT_DELAY)
+            finally:
+                await pubsub.aclose()
+                await redis_conn.aclose()
+
+    @asynccontextmanager
+    async def subscribe(self, interview_id: str):
+        """
+        Follow an interview's stage events for the duration of the context. Raises asyncio.TimeoutError if the subscription isn't active
+        within SUBSCRIBE_TIMEOUT seconds.
+
+        Args:
+            interview_id (str): Id of the interview being analyzed
+        Yields:
+            subscription (asyncio.Queue): Queue of the interview's events, to pass to next_stage_event
+        """
+        await self.start()
+        queue = asyncio.Queue()
+        self.listeners.setdefault(interview_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self.listeners.get(interview_id, set())
+            queues.discard(queue)
+            if not queues:
+                self.listeners.pop(interview_id, None)
+
+
+# stage event subscription of the API process, stopped with the API (see main.lifespan)
+stage_events = StageEventHub()
+
+
+def subscribe_stage_events(interview_id: str):
+    """
+    Subscribe to an interview's stage events for the duration of the context, see StageEventHub.subscribe.
+    """
+    return stage_events.subscribe(interview_id)
+
+
+async def next_stage_event(subscription: asyncio.Queue, timeout: float = 1.0) -> dict | object | None:
+    """
+    Wait for the next stage event of a subscription.
+
+    Args:
+        subscription (asyncio.Queue): Subscription created by subscribe_stage_events
+        timeout (float): How long to wait for an event in seconds
+    Returns:
+        event (dict | object | None): The next stage event, RESYNC if events may have been missed, or None if no event arrived in time
+    """
+    try:
+        return await asyncio.wait_for(subscription.get(), timeout=timeout)
+    except asyncio.TimeoutError:
+        return None
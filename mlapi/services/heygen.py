@@ -0,0 +1,80 @@
+"""
+Handles minting HeyGen LiveAvatar session tokens and keeping a pool of them ready so starting an interview doesn't wait on HeyGen.
+"""
+import os
+from dotenv import load_dotenv
+from services.http_client import get_http_client
+from services.token_pool import TokenPool
+from utils.logger_config import get_logger
+
+load_dotenv() # load environment variables
+logger = get_logger(__name__) # create a logger instance to log messages
+
+HEYGEN_TOKEN_POOL_SIZE = int(os.getenv("HEYGEN_TOKEN_POOL_SIZE", 2)) # session tokens kept ready, 0 mints every token on demand
+HEYGEN_TOKEN_TTL = float(os.getenv("HEYGEN_TOKEN_TTL", 60 * 10)) # seconds a session token is valid for after it's minted
+HEYGEN_TOKEN_MARGIN = float(os.getenv("HEYGEN_TOKEN_MARGIN", 60)) # tokens with less than this many seconds left aren't handed out
+
+# URL to send to request to get session token from HeyGen LiveAvatar
+SESSION_TOKEN_URL = "https://api.liveavatar.com/v1/sessions/token"
+
+# default session configuration
+interviewConfig = {
+  "avatar_id": "dd73ea75-1218-4ef3-92ce-606d5f7fbc0a", # ID for one of HeyGen LiveAvatar's avatars to choose what it looks like.
+  # sandbox avatar: dd73ea75-1218-4ef3-92ce-606d5f7fbc0a
+  # production avatar: 65f9e3c9-d48b-4118-b73a-4ae2e3cbb8f0
+  "voice_id": "c2527536-6d1f-4412-a643-53a3497dada9", # ID for one of HeyGen LiveAvatar's voices to choose how it sounds like.
+  # sandbox voice: c2527536-6d1f-4412-a643-53a3497dada9
+  # production voice: b2bd6569-a537-4342-aeca-a1f15d2a2c97
+  "context_id": "e6a7bbca-1ac1-4a2f-b0f0-f6cfce199b97", # ID for Context created in HeyGen LiveAvatar to choose how the avatar behaves and what it knows.
+  # current context: "e6a7bbca-1ac1-4a2f-b0f0-f6cfce199b97"
+  "is_sandbox": True # HeyGen LiveAvatar has a sandbox mode so the developer can test without using credits under strict session configurations. (Only one avatar is available in sandbox mode)
+}
+
+
+async def mint_session_token() -> str:
+    """
+    Creates session token for end user based on predefined session configurations for how the avatar looks, how it sounds, and what's its knowledge base. You can create new context within HeyGen's LiveAvatar API website: https://app.liveavatar.com/home
+
+    Returns:
+        session_token (str): String containing the session token for a HeyGen LiveAvatar session.
+
+    Raises:
+        KeyError: If the HeyGen LiveAvatar API key is missing.
+        ValueError: If the session configuration settings are invalid.
+        httpx.HTTPError: If HeyGen LiveAvatar can't be reached in time.
+    """
+    # Session configuration
+    payload = {
+        "mode": "FULL", # LiveAvatar has two modes FULL or CUSTOM
+        "avatar_id": interviewConfig["avatar_id"],
+        "is_sandbox": interviewConfig["is_sandbox"],
+        "avatar_persona": {
+            "voice_id": interviewConfig["voice_id"],
+            "context_id": interviewConfig["context_id"],
+            "language": "en" # LiveAvatar supports other language but we assume that the interaction will be in English
+        }
+    }
+
+    # get LiveAvatar API key
+    api_key = os.getenv("HEYGEN_LIVEAVATAR_API")
+    if not api_key:
+        raise KeyError("HEYGEN_LIVEAVATAR_API key not found in .env file.")
+
+    headers = {
+        "accept": "application/json",
+        "content-type": "application/json",
+        "X-API-KEY": api_key,
+    }
+
+    # Send request to HeyGen LiveAvatar
+    logger.info("Minting HeyGen session token...")
+    response = await get_http_client().post(SESSION_TOKEN_URL, json=payload, headers=headers)
+
+    if response.status_code != 200:
+        raise ValueError(f"Failed to create session token: {response.json()['message']}")
+
+    return response.json()["data"]["session_token"]
+
+
+# session tokens for the configured avatar, voice, and context, started with the API (see main.lifespan)
+session_tokens = TokenPool("heygen", mint_session_token, size=HEYGEN_TOKEN_POOL_SIZE, ttl=HEYGEN_TOKEN_TTL, margin=HEYGEN_TOKEN_MARGIN)
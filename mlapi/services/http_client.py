@@ -0,0 +1,72 @@
+"""
+Shared outbound HTTP client and thread pool for the API process.
+
+Route handlers call third-party APIs (e.g. HeyGen LiveAvatar) through a single httpx.AsyncClient so connections are kept alive and
+reused, every request has a timeout, and the number of concurrent outbound requests is bounded by the connection pool. SDKs that only
+offer blocking calls (e.g. AssemblyAI) are run on a bounded thread pool so they don't stall the event loop for every other request.
+"""
+import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+from dotenv import load_dotenv
+from utils.logger_config import get_logger
+
+load_dotenv() # load environment variables
+logger = get_logger(__name__)
+
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 10)) # seconds an outbound request may take to read/write before failing
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5)) # seconds to establish a connection (and to wait for a free one)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 20)) # concurrent outbound requests, the rest wait for a free connection
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", 10)) # idle connections kept open for reuse
+BLOCKING_MAX_WORKERS = int(os.getenv("BLOCKING_MAX_WORKERS", 8)) # threads running blocking SDK calls, the rest wait in line
+
+HTTP_CLIENT = None # created on first use since it must be bound to the running event loop
+BLOCKING_EXECUTOR = None # thread pool for blocking SDK calls
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get the API process's shared async HTTP client.
+
+    Returns:
+        client (httpx.AsyncClient): Client with keep-alive, timeouts, and a bounded connection pool
+    """
+    global HTTP_CLIENT
+    if HTTP_CLIENT is None:
+        HTTP_CLIENT = httpx.AsyncClient(
+            timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT, pool=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE),
+        )
+    return HTTP_CLIENT
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run a blocking call (e.g. a synchronous SDK method) on the bounded thread pool without blocking the event loop.
+
+    Args:
+        func: The blocking function to call
+        args: Arguments to pass to the function
+        kwargs: Keyword arguments to pass to the function
+    Returns:
+        The function's return value
+    """
+    global BLOCKING_EXECUTOR
+    if BLOCKING_EXECUTOR is None:
+        BLOCKING_EXECUTOR = ThreadPoolExecutor(max_workers=BLOCKING_MAX_WORKERS, thread_name_prefix="blocking")
+    return await asyncio.get_running_loop().run_in_executor(BLOCKING_EXECUTOR, functools.partial(func, *args, **kwargs))
+
+
+async def close_http_client() -> None:
+    """
+    Close the shared HTTP client's connections and the thread pool, e.g. when the API shuts down.
+    """
+    global HTTP_CLIENT, BLOCKING_EXECUTOR
+    if HTTP_CLIENT is not None:
+        await HTTP_CLIENT.aclose()
+        HTTP_CLIENT = None
+    if BLOCKING_EXECUTOR is not None:
+        BLOCKING_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+        BLOCKING_EXECUTOR = None
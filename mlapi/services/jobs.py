@@ -1,62 +1,139 @@
-from rq.job import Job
-from rq.exceptions import NoSuchJobError
+from rq.job import Job, JobStatus as RQJobStatus
+from rq.results import Result
 from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+from pydantic import BaseModel
+from redisStore.serializers import get_serializer
 from schemas import JobResponse, JobStatus
 from utils.logger_config import get_logger
 
 logger = get_logger(__name__) 
 
-def get_job_status(job_id: str, redis_conn: Redis) -> JobResponse:
+INTERVIEW_JOBS_KEY = "interview:{interview_id}:jobs" # Redis hash mapping each analysis stage of an interview to its job id
+INTERVIEW_JOBS_TTL = 60 * 60 * 24 # keep the stage -> job id mapping around for a day (in seconds)
+
+def save_interview_jobs(interview_id: str, stage_job_ids: dict[str, str], redis_conn: Redis) -> None:
     """
-    Get the status of a job with the given job ID in the format of the JobResponse schema.
-    
+    Remember which jobs were started for an interview so they can be polled using only the interview id.
+
     Args:
-        job_id (str): ID of the job to check
+        interview_id (str): Id of the interview being analyzed
+        stage_job_ids (dict[str, str]): Analysis stage name (e.g. "star") -> job id
         redis_conn (Redis): Redis connection object
+    """
+    key = INTERVIEW_JOBS_KEY.format(interview_id=interview_id)
+    with redis_conn.pipeline() as pipe:
+        pipe.hset(key, mapping=stage_job_ids)
+        pipe.expire(key, INTERVIEW_JOBS_TTL)
+        pipe.execute()
+
+
+async def get_interview_jobs(interview_id: str, redis_conn: AsyncRedis) -> dict[str, str]:
+    """
+    Get the analysis jobs started for an interview.
+
+    Args:
+        interview_id (str): Id of the interview being analyzed
+        redis_conn (AsyncRedis): Asyncio Redis connection object
     Returns:
-        Response (JobResponse): A dictionary containing the job status and result or error information in the format of the JobResponse schema.
-    """ 
+        stage_job_ids (dict[str, str]): Analysis stage name -> job id (empty if the interview has no known jobs)
+    """
+    stage_job_ids = await redis_conn.hgetall(INTERVIEW_JOBS_KEY.format(interview_id=interview_id))
+    return {stage.decode(): job_id.decode() for stage, job_id in stage_job_ids.items()}
+
+
+def _serialize_result(result) -> dict | None:
+    """
+    Convert a job's return value into the plain dictionary expected by the JobResponse schema.
+    """
+    if result is None or isinstance(result, dict):
+        return result
+    if isinstance(result, BaseModel):
+        return result.model_dump(mode="json")
+    return {"value": result}
 
-    # Attempt to get job object with given job ID
-    try:
-        job = Job.fetch(job_id, connection=redis_conn)
-    except NoSuchJobError:
+
+async def get_job_statuses(job_ids: list[str], redis_conn: AsyncRedis, include_results: bool = False) -> tuple[list[JobResponse], list[str]]:
+    """
+    Get the status of several jobs using a single pipelined read instead of one Job.fetch per job.
+
+    Only the status field of each job is read, and results and errors are only loaded (and deserialized) when include_results is set.
+    The reads are sent on the API's asyncio connection so polling doesn't block the event loop.
+
+    Args:
+        job_ids (list[str]): IDs of the jobs to check
+        redis_conn (AsyncRedis): Asyncio Redis connection object
+        include_results (bool): Whether to load the results/errors of finished and failed jobs
+    Returns:
+        Responses (tuple[list[JobResponse], list[str]]): The statuses of the jobs that were found and the ids of the jobs that weren't.
+    """
+    # read every job's status and (if needed) latest result in one round-trip
+    async with redis_conn.pipeline(transaction=False) as pipe:
+        for job_id in job_ids:
+            pipe.hget(Job.key_for(job_id), "status")
+            if include_results:
+                pipe.xrevrange(Result.get_key(job_id), "+", "-", count=1)
+        values = await pipe.execute()
+
+    step = 2 if include_results else 1
+    responses = []
+    missing = []
+    for i, job_id in enumerate(job_ids):
+        rq_status = values[i * step]
+        if rq_status is None:
+            missing.append(job_id)
+            continue
+
+        rq_status = RQJobStatus(rq_status.decode())
+        if rq_status == RQJobStatus.FAILED:
+            status = JobStatus.FAILED
+        elif rq_status == RQJobStatus.FINISHED:
+            status = JobStatus.COMPLETED
+        elif rq_status == RQJobStatus.STARTED:
+            status = JobStatus.PROCESSING
+        else:
+            status = JobStatus.PENDING # queued, deferred, or scheduled
+
+        response = JobResponse(job_id=job_id, status=status)
+        responses.append(response)
+
+        latest = values[i * step + 1] if include_results else None
+        if status not in (JobStatus.COMPLETED, JobStatus.FAILED) or not latest:
+            continue # not done yet, or its result has expired
+
+        result_id, payload = latest[0]
+        result = Result.restore(job_id, result_id.decode(), payload, connection=redis_conn, serializer=get_serializer())
+
+        if result.type == Result.Type.SUCCESSFUL:
+            # check if job finished with exception
+            if isinstance(result.return_value, Exception):
+                response.status = JobStatus.FAILED
+                response.error = str(result.return_value)
+            else:
+                response.result = _serialize_result(result.return_value)
+        elif result.exc_string:
+            response.error = result.exc_string
+
+    return responses, missing
+
+
+async def get_job_status(job_id: str, redis_conn: AsyncRedis) -> JobResponse | None:
+    """
+    Get the status of a job with the given job ID in the format of the JobResponse schema.
+
+    Args:
+        job_id (str): ID of the job to check
+        redis_conn (AsyncRedis): Asyncio Redis connection object
+    Returns:
+        Response (JobResponse): The job status and result or error information in the format of the JobResponse schema, None if the job doesn't exist.
+    """
+    responses, _ = await get_job_statuses([job_id], redis_conn, include_results=True)
+    if not responses:
         return None
-    
-    # Initialize job status response based on JobResponse schema
-    response = JobResponse(
-        job_id = job_id,
-        status=JobStatus.PENDING, # assume job is still in the queue
-        result=None, 
-        error=None)    
-
-    # check job status
-    # job failed, return failed status and error information
-    if job.is_failed:
-        logger.error(f"Job {job_id} failed with error: {str(job.exc_info)}")
-        response.status = JobStatus.FAILED
-        response.error = str(job.exc_info)
-        return response
-    # job finished, return complete status and result
-    elif job.is_finished:
-        # check if job finished with exception
-        if isinstance(job.result, Exception):
-            logger.error(f"Job {job_id} completed with an excewption: {str(job.result)}")
-            response.status = JobStatus.FAILED
-            response.error = str(job.result)
-            return response
-
-        logger.info(f"Job {job_id} completed successfully.")
-        response.status = JobStatus.COMPLETED
-        response.result = job.result
-        return response
-        
-    # job still processing, return processing status
-    elif job.is_started:
-        logger.info(f"Job {job_id} is still processing.")
-        response.status = JobStatus.PROCESSING
-        return response
-    
-    # job is still pending in the queue
-    logger.info(f"Job {job_id} is still pending in the queue.")
+
+    response = responses[0]
+    if response.status == JobStatus.FAILED:
+        logger.error(f"Job {job_id} failed with error: {response.error}")
+    else:
+        logger.info(f"Job {job_id} is {response.status.value}.")
     return response
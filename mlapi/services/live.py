@@ -0,0 +1,175 @@
+"""
+Buffers the speaker turns of an interview while it's still in progress so every question/answer pair can be analyzed as soon as the
+candidate finishes answering it, instead of analyzing the whole transcript after the interview ends.
+
+The client sends each final AssemblyAI turn with its sequence number. Turns are kept in Redis and the contiguous prefix received so far
+is parsed into a turn index (see utils.transcript.parseTranscript). An answer is complete once the interviewer speaks again after it,
+and each complete answer is claimed exactly once (by its question index and a hash of its text) so retried or concurrent requests
+don't analyze it twice. Workers store the per-answer results under the same hash, and the final analysis stages only reduce them,
+analyzing whatever answers are missing (e.g. the last one) themselves. The ids of the per-answer jobs are kept too so the final stages
+wait for the ones still running instead of analyzing their answers again.
+"""
+import os
+import json
+import hashlib
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+from dotenv import load_dotenv
+from schemas import LiveTurn, TurnIndex
+from utils.transcript import parseTranscript, answerText
+from utils.logger_config import get_logger
+
+load_dotenv() # load environment variables
+logger = get_logger(__name__)
+
+LIVE_SESSION_TTL = int(os.getenv("LIVE_SESSION_TTL", 60 * 60 * 6)) # seconds an interview's turns and per-answer results are kept
+
+LIVE_OWNER_KEY = "live:{interview_id}:owner" # id of the user the interview belongs to
+LIVE_TURNS_KEY = "live:{interview_id}:turns" # Redis hash of turn sequence number -> "<speaker>: <text>"
+LIVE_CLAIMED_KEY = "live:{interview_id}:claimed" # Redis set of "<question index>:<answer hash>" of the answers sent for analysis
+LIVE_RESULTS_KEY = "live:{interview_id}:results" # Redis hash of "<stage>:<question index>:<answer hash>" -> JSON result
+LIVE_JOBS_KEY = "live:{interview_id}:jobs" # Redis hash of "<stage>:<question index>" -> id of the job analyzing the answer
+
+
+class LiveSessionOwnerError(Exception):
+    """
+    Raised when turns are sent for an interview that belongs to another user.
+    """
+
+
+def answer_hash(answer: str) -> str:
+    """
+    Hash of an answer's text, used to tell whether a stored per-answer result still matches the answer in the final transcript.
+    """
+    return hashlib.sha1(answer.encode()).hexdigest()[:16]
+
+
+def live_keys(interview_id: str) -> list[str]:
+    """
+    Redis keys of an interview's live session: its owner, turns, claimed answers, and per-answer results.
+    """
+    return [key.format(interview_id=interview_id) for key in (LIVE_OWNER_KEY, LIVE_TURNS_KEY, LIVE_CLAIMED_KEY, LIVE_RESULTS_KEY)]
+
+
+async def ingest_turns(user_id: str, interview_id: str, turns: list[LiveTurn], redis_conn: AsyncRedis) -> tuple[TurnIndex, list[int]]:
+    """
+    Buffer an interview's new turns and claim the answers they complete.
+
+    Args:
+        user_id (str): Id of the user being interviewed
+        interview_id (str): Id of the interview in progress
+        turns (list[LiveTurn]): New final turns, turns that were already received are ignored
+        redis_conn (AsyncRedis): Asyncio Redis connection object
+    Returns:
+        result (tuple[TurnIndex, list[int]]): Turn index of the turns received so far (up to the first missing turn) and the indexes of
+        the questions whose answers were completed by these turns
+    Raises:
+        LiveSessionOwnerError: If the interview belongs to another user
+    """
+    owner_key, turns_key, claimed_key, _ = live_keys(interview_id)
+
+    # the first request of an interview claims it for its user
+    async with redis_conn.pipeline(transaction=True) as pipe:
+        pipe.set(owner_key, user_id, nx=True, ex=LIVE_SESSION_TTL)
+        pipe.get(owner_key)
+        _, owner = await pipe.execute()
+    if owner.decode() != user_id:
+        raise LiveSessionOwnerError(f"Interview={interview_id} belongs to another user")
+
+    # store the turns and read back every turn received so far in one round-trip
+    async with redis_conn.pipeline(transaction=True) as pipe:
+        for turn in turns:
+            pipe.hsetnx(turns_key, turn.seq, turn.text)
+        pipe.hgetall(turns_key)
+        pipe.expire(turns_key, LIVE_SESSION_TTL)
+        values = await pipe.execute()
+    received = {int(seq): text.decode() for seq, text in values[-2].items()}
+
+    # only the contiguous prefix is parsed, turns after a missing one wait until it arrives
+    lines = []
+    while len(lines) in received:
+        lines.append(received[len(lines)])
+    index = parseTranscript(lines)
+
+    # an answer is complete once another turn follows it, i.e. the interviewer asked the next question
+    complete = [k for k, end in enumerate(index.answer_ends) if end < len(index.speakers)]
+    if not complete:
+        return index, []
+
+    async with redis_conn.pipeline(transaction=False) as pipe:
+        for k in complete:
+            pipe.sadd(claimed_key, f"{k}:{answer_hash(answerText(index, k))}")
+        pipe.expire(claimed_key, LIVE_SESSION_TTL) # after the first sadd has created the set
+        claimed = (await pipe.execute())[:-1]
+
+    return index, [k for k, added in zip(complete, claimed) if added]
+
+
+def has_live_session(interview_id: str, redis_conn: Redis) -> bool:
+    """
+    Check whether any turns of an interview were received while it was in progress.
+    """
+    return bool(redis_conn.exists(LIVE_TURNS_KEY.format(interview_id=interview_id)))
+
+
+def save_answer_result(interview_id: str, stage: str, question: int, answer: str, result: dict, redis_conn: Redis) -> None:
+    """
+    Store the result of analyzing a single answer for the final analysis stages to reduce.
+
+    Args:
+        interview_id (str): Id of the interview the answer belongs to
+        stage (str): Analysis stage and its prompt version, e.g. "star@<prompt version>"
+        question (int): Index of the question the answer belongs to
+        answer (str): Text of the answer that was analyzed
+        result (dict): The analysis result
+        redis_conn (Redis): Redis connection object
+    """
+    key = LIVE_RESULTS_KEY.format(interview_id=interview_id)
+    with redis_conn.pipeline() as pipe:
+        pipe.hset(key, f"{stage}:{question}:{answer_hash(answer)}", json.dumps(result))
+        pipe.expire(key, LIVE_SESSION_TTL)
+        pipe.execute()
+
+
+def get_answer_results(interview_id: str, stage: str, answers: list[str], redis_conn: Redis) -> list[dict | None]:
+    """
+    Get the stored results of analyzing each answer of an interview.
+
+    Args:
+        interview_id (str): Id of the interview the answers belong to
+        stage (str): Analysis stage and its prompt version, e.g. "star@<prompt version>"
+        answers (list[str]): Text of every answer in the final transcript, in question order
+        redis_conn (Redis): Redis connection object
+    Returns:
+        results (list[dict | None]): Result of each answer, None for answers that weren't analyzed or changed since they were
+    """
+    if not answers:
+        return []
+    fields = [f"{stage}:{k}:{answer_hash(answer)}" for k, answer in enumerate(answers)]
+    values = redis_conn.hmget(LIVE_RESULTS_KEY.format(interview_id=interview_id), fields)
+    return [json.loads(value) if value is not None else None for value in values]
+
+
+def save_answer_jobs(interview_id: str, question: int, job_ids: dict[str, str], redis_conn: Redis) -> None:
+    """
+    Store the ids of the jobs analyzing a single answer so the final analysis stages can wait for them.
+
+    Args:
+        interview_id (str): Id of the interview the answer belongs to
+        question (int): Index of the question the answer belongs to
+        job_ids (dict[str, str]): Analysis stage (e.g. "star") -> id of the job analyzing the answer
+        redis_conn (Redis): Redis connection object
+    """
+    key = LIVE_JOBS_KEY.format(interview_id=interview_id)
+    with redis_conn.pipeline() as pipe:
+        pipe.hset(key, mapping={f"{stage}:{question}": job_id for stage, job_id in job_ids.items()})
+        pipe.expire(key, LIVE_SESSION_TTL)
+        pipe.execute()
+
+
+def get_answer_jobs(interview_id: str, stage: str, redis_conn: Redis) -> list[str]:
+    """
+    Get the ids of the jobs that analyzed (or are analyzing) an interview's answers for a stage, e.g. "star".
+    """
+    jobs = redis_conn.hgetall(LIVE_JOBS_KEY.format(interview_id=interview_id))
+    return [job_id.decode() for field, job_id in jobs.items() if field.decode().rpartition(":")[0] == stage]
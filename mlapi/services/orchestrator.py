@@ -1,14 +1,14 @@
 # Handles orchestration of tasks for interview videos, e.g. starting analysis jobs. 
 # Can be called by route handlers.
 
-from tasks.ml_tasks import (
-    detect_audio_sentiment,
-    star_analysis,
-    analyze_competencies,
-    overall_analysis,
-    filler_hedge_count,
-) 
+from rq import Callback
+from rq.job import Dependency, Job, JobStatus
 from redisStore.queue import add_task_to_queue
+from redisStore.myconnection import get_redis_con
+from redisStore.deadlines import get_deadline
+from services.jobs import save_interview_jobs
+from services.live import has_live_session, save_answer_jobs, get_answer_jobs
+from services.events import on_stage_success, on_stage_failure
 from utils.logger_config import get_logger
 from schemas import (
     SentimentAnalysisRequest,
@@ -18,16 +18,103 @@ from schemas import (
     AnalyzeInterviewResponse,
     OverallAnalysisRequest,
     FillerHedgeRequest,
+    SpeechMetricsRequest,
 )
 
 logger = get_logger(__name__)
 
-def start_sentiment_analysis(req: SentimentAnalysisRequest) -> str:
+# Tasks are enqueued by their import path so the API process never imports them, along with the LLM client and everything else
+# only the workers need
+DETECT_AUDIO_SENTIMENT = "tasks.ml_tasks.detect_audio_sentiment"
+STAR_ANALYSIS = "tasks.ml_tasks.star_analysis"
+ANALYZE_COMPETENCIES = "tasks.ml_tasks.analyze_competencies"
+FILLER_HEDGE_COUNT = "tasks.ml_tasks.filler_hedge_count"
+OVERALL_ANALYSIS = "tasks.ml_tasks.overall_analysis"
+SPEECH_METRICS = "tasks.metrics_tasks.speech_metrics"
+
+# per-answer tasks run while the interview is in progress and the stages that reduce their results once it's created (the STAR
+# analysis always reduces per-answer results so it reuses them either way)
+ANSWER_TASKS = {
+    "star": "tasks.answer_tasks.star_answer",
+    "filler_hedge": "tasks.answer_tasks.filler_hedge_answer",
+    "sentiment": "tasks.answer_tasks.sentiment_answer",
+}
+LIVE_SENTIMENT_ANALYSIS = "tasks.answer_tasks.live_sentiment_analysis"
+LIVE_FILLER_HEDGE_COUNT = "tasks.answer_tasks.live_filler_hedge_count"
+DONE_STATUSES = (JobStatus.FINISHED, JobStatus.FAILED, JobStatus.STOPPED, JobStatus.CANCELED) # per-answer jobs that won't run anymore
+
+def stage_options(interview_id: str, stage: str, user_id: str = None, deadline: float = None) -> dict:
+    """
+    Job options shared by every analysis stage so workers can publish the stage's completion to clients subscribed to the interview.
+
+    Args:
+        interview_id (str): Id of the interview being analyzed.
+        stage (str): Name of the analysis stage, e.g. "star".
+        user_id (str): Id of the user who owns the interview, used to share the workers fairly between users.
+        deadline (float): Unix time the stage's result is needed by, defaults to ANALYSIS_DEADLINE seconds from now.
+    Returns:
+        options (dict): Keyword arguments for add_task_to_queue.
+    """
+    return {
+        "meta": {"interview_id": interview_id, "stage": stage, "deadline": deadline if deadline is not None else get_deadline()},
+        "on_success": Callback(on_stage_success),
+        "on_failure": Callback(on_stage_failure),
+        "tenant": user_id,
+    }
+
+def start_answer_analysis(user_id: str, interview_id: str, question: int, question_text: str, answer_text: str) -> list[str]:
+    """
+    Start the STAR, filler/hedge, and sentiment analysis jobs of a single answer of an interview in progress.
+
+    The jobs only store their results for the interview's final analysis stages so they don't publish stage events.
+
+    Args:
+        user_id (str): Id of the user being interviewed.
+        interview_id (str): Id of the interview in progress.
+        question (int): Index of the question in the interview.
+        question_text (str): The interviewer's question.
+        answer_text (str): The candidate's answer.
+    Returns:
+        job_ids (list[str]): The job IDs of the queued per-answer analysis jobs.
+    """
+    deadline = get_deadline()
+    job_ids = {}
+    for stage, task in ANSWER_TASKS.items():
+        meta = {"interview_id": interview_id, "stage": f"{stage}_answer", "deadline": deadline}
+        job = add_task_to_queue("high", task, user_id, interview_id, question, question_text, answer_text, meta=meta, tenant=user_id)
+        job_ids[stage] = job.id
+    save_answer_jobs(interview_id, question, job_ids, get_redis_con()) # the final stages wait for the jobs that are still running
+
+    logger.info(f"Analysis of question={question} of interview={interview_id} job IDs={list(job_ids.values())} enqueued!")
+    return list(job_ids.values())
+
+def answer_dependency(interview_id: str, stage: str, redis_conn) -> Dependency | None:
+    """
+    Get the per-answer jobs of an interview that a final analysis stage has to wait for, i.e. the ones that haven't run yet, so the stage
+    reduces their results instead of analyzing their answers again. Per-answer jobs that fail don't hold the stage back, it analyzes
+    their answers itself.
+
+    Args:
+        interview_id (str): Id of the interview being analyzed.
+        stage (str): Name of the per-answer stage, e.g. "star".
+        redis_conn (Redis): Redis connection object.
+    Returns:
+        dependency (Dependency | None): Dependency on the stage's pending per-answer jobs, None if there are none.
+    """
+    job_ids = get_answer_jobs(interview_id, stage, redis_conn)
+    if not job_ids:
+        return None
+    pending = [job.id for job in Job.fetch_many(job_ids, connection=redis_conn) if job is not None and job.get_status(refresh=False) not in DONE_STATUSES]
+    return Dependency(jobs=pending, allow_failure=True) if pending else None
+
+def start_sentiment_analysis(req: SentimentAnalysisRequest, live: bool = False, depends_on: Dependency | None = None) -> str:
     """
     Start the sentiment analysis job by adding it to the queue.
     
     Args:
         req (SentimentAnalysisRequest): Contains the params to perform the sentiment analysis job.
+        live (bool): Whether the interview's answers were analyzed while it was in progress, i.e. only their results are reduced.
+        depends_on (Dependency | None): Per-answer jobs to wait for, see answer_dependency.
     Returns:
         job_id (str): The Redis Job id of the queued sentiment analysis job.
     """
@@ -35,18 +122,19 @@ def start_sentiment_analysis(req: SentimentAnalysisRequest) -> str:
     
     # Enqueue sentiment analysis job
     # only pass the fields instead of the pydantic model
-    job = add_task_to_queue("high", detect_audio_sentiment, req.user_id, req.interview_id)
+    job = add_task_to_queue("high", LIVE_SENTIMENT_ANALYSIS if live else DETECT_AUDIO_SENTIMENT, req.user_id, req.interview_id, depends_on=depends_on, **stage_options(req.interview_id, "sentiment", req.user_id, req.deadline))
 
     logger.info(f"Sentiment analysis for interview={req.interview_id} job ID={job.id} enqueued!")
 
     return job.id # returns job id for polling later
 
-def start_star_analysis(req: StarFeedbackRequest) -> str:
+def start_star_analysis(req: StarFeedbackRequest, depends_on: Dependency | None = None) -> str:
     """
     Start the STAR feedback analysis job by adding it to the queue.
     
     Args:
         req (StarFeedbackRequest): Contains the params to perform the STAR analysis.
+        depends_on (Dependency | None): Per-answer jobs to wait for, see answer_dependency.
     Returns:
         str: The job ID of the queued STAR feedback analysis job.
     """
@@ -54,7 +142,7 @@ def start_star_analysis(req: StarFeedbackRequest) -> str:
     logger.info(f"Started STAR analysis job for interview={req.interview_id}.")
     
     # Enqueue STAR feedback analysis job
-    job = add_task_to_queue("high", star_analysis, req.user_id, req.interview_id)
+    job = add_task_to_queue("high", STAR_ANALYSIS, req.user_id, req.interview_id, depends_on=depends_on, **stage_options(req.interview_id, "star", req.user_id, req.deadline))
 
     logger.info(f"STAR analysis for interview={req.interview_id} job ID={job.id} enqueued!")
 
@@ -72,19 +160,20 @@ def start_competency_analysis(req: CompetencyFeedbackRequest) -> str:
     logger.info(f"Started competency analysis job for interview={req.interview_id}.")
 
     # Enqueue competency analysis job
-    job = add_task_to_queue("default", analyze_competencies, req.user_id, req.interview_id)
+    job = add_task_to_queue("default", ANALYZE_COMPETENCIES, req.user_id, req.interview_id, **stage_options(req.interview_id, "competency", req.user_id, req.deadline))
 
     logger.info(f"Competencies analysis for interview={req.interview_id} job ID={job.id} enqueued!")
 
     return job.id # return job id for polling
 
-def start_filler_hedge_count(req: FillerHedgeRequest) -> str:
+def start_filler_hedge_count(req: FillerHedgeRequest, live: bool = False, depends_on: Dependency | None = None) -> str:
     """
     Start the filler word and hedge phrase count job by adding it to the queue.
 
     Args:
-        user_id (str): Id of the user who owns the interview.
-        interview_id (str): Id of the interview to perform the count on.
+        req (FillerHedgeRequest): Contains the params to perform the filler/hedge count.
+        live (bool): Whether the interview's answers were analyzed while it was in progress, i.e. only their results are reduced.
+        depends_on (Dependency | None): Per-answer jobs to wait for, see answer_dependency.
     Returns:
         str: The job ID of the queued filler/hedge count job.
     """
@@ -92,12 +181,30 @@ def start_filler_hedge_count(req: FillerHedgeRequest) -> str:
     logger.info(f"Started filler/hedge count job for interview={req.interview_id}.")
 
     # Enqueue filler/hedge job
-    job = add_task_to_queue("default", filler_hedge_count, req.user_id, req.interview_id)
+    job = add_task_to_queue("default", LIVE_FILLER_HEDGE_COUNT if live else FILLER_HEDGE_COUNT, req.user_id, req.interview_id, depends_on=depends_on, **stage_options(req.interview_id, "filler_hedge", req.user_id, req.deadline))
 
     logger.info(f"Filler/hedge count for interview={req.interview_id} job ID={job.id} enqueued!")
 
     return job.id # return job id for polling
 
+def start_speech_metrics(req: SpeechMetricsRequest) -> str:
+    """
+    Start the speech metrics job by adding it to the queue.
+
+    Args:
+        req (SpeechMetricsRequest): Contains the params to compute the speech metrics.
+    Returns:
+        str: The job ID of the queued speech metrics job.
+    """
+    logger.info(f"Started speech metrics job for interview={req.interview_id}.")
+
+    # Enqueue speech metrics job (it takes milliseconds so it goes on the high priority queue)
+    job = add_task_to_queue("high", SPEECH_METRICS, req.user_id, req.interview_id, req.speech.model_dump(), **stage_options(req.interview_id, "speech_metrics", req.user_id, req.deadline))
+
+    logger.info(f"Speech metrics for interview={req.interview_id} job ID={job.id} enqueued!")
+
+    return job.id # return job id for polling
+
 def start_overall_analysis(req: OverallAnalysisRequest) -> str:
     """
     Start the final overall analysis by adding it to the queue.
@@ -110,7 +217,13 @@ def start_overall_analysis(req: OverallAnalysisRequest) -> str:
     logger.info(f"Started final overall analysis job for interview={req.interview_id}.")
 
     # Enqueue overall analysis job (requires all other ML-related jobs to be done first)
-    job = add_task_to_queue("default", overall_analysis, req.user_id, req.interview_id, depends_on=[req.sentiment_job_id, req.star_job_id, req.competency_job_id, req.filler_hedge_job_id])
+    depends_on = [req.sentiment_job_id, req.star_job_id, req.competency_job_id, req.filler_hedge_job_id]
+    if req.speech_metrics_job_id:
+        depends_on.append(req.speech_metrics_job_id) # the overall analysis uses the server-side WPM
+    # a stage that failed (e.g. on bad word timestamps) mustn't leave the interview unanalyzed, the overall analysis summarizes the
+    # results that are there and falls back to the client's WPM (RQ allows the failure of every dependency of a job, not just one)
+    depends_on = Dependency(jobs=depends_on, allow_failure=True)
+    job = add_task_to_queue("default", OVERALL_ANALYSIS, req.user_id, req.interview_id, depends_on=depends_on, **stage_options(req.interview_id, "overall", deadline=req.deadline))
 
     logger.info(f"Final overall analysis for interview={req.interview_id} job ID={job.id} enqueued!")
 
@@ -127,21 +240,36 @@ def start_interview_analysis(req: AnalyzeInterviewRequest) -> AnalyzeInterviewRe
     Returns:
         response (AnalyzeInterviewResponse): The job IDs of the queued interview analysis jobs.
     """
+    # every stage shares the interview's deadline, past it the stages are degraded or shed
+    deadline = get_deadline(req.background, req.deadline_seconds)
+
+    # interviews whose answers were analyzed while they were in progress only have their per-answer results reduced
+    redis_conn = get_redis_con()
+    live = has_live_session(req.interview_id, redis_conn)
+    if live:
+        logger.info(f"Reducing the per-answer analyses of interview={req.interview_id}.")
+
     # Enqueue audio analysis job
-    sentiment_analysis_request = SentimentAnalysisRequest(user_id=req.user_id, interview_id=req.interview_id)
-    sentiment_job_id = start_sentiment_analysis(sentiment_analysis_request)
+    sentiment_analysis_request = SentimentAnalysisRequest(user_id=req.user_id, interview_id=req.interview_id, deadline=deadline)
+    sentiment_job_id = start_sentiment_analysis(sentiment_analysis_request, live, answer_dependency(req.interview_id, "sentiment", redis_conn) if live else None)
 
     # Enqueue STAR analysis job
-    star_analysis_request = StarFeedbackRequest(user_id=req.user_id, interview_id=req.interview_id)
-    star_job_id = start_star_analysis(star_analysis_request)
+    star_analysis_request = StarFeedbackRequest(user_id=req.user_id, interview_id=req.interview_id, deadline=deadline)
+    star_job_id = start_star_analysis(star_analysis_request, answer_dependency(req.interview_id, "star", redis_conn) if live else None)
 
     # Enqueue competencies analysis job
-    competency_analysis_request = CompetencyFeedbackRequest(user_id=req.user_id, interview_id=req.interview_id)
+    competency_analysis_request = CompetencyFeedbackRequest(user_id=req.user_id, interview_id=req.interview_id, deadline=deadline)
     competency_job_id = start_competency_analysis(competency_analysis_request)
 
     # Enqueue filler/hedge count job 
-    filler_hedge_request = FillerHedgeRequest(user_id=req.user_id, interview_id=req.interview_id)
-    filler_hedge_job_id = start_filler_hedge_count(filler_hedge_request)
+    filler_hedge_request = FillerHedgeRequest(user_id=req.user_id, interview_id=req.interview_id, deadline=deadline)
+    filler_hedge_job_id = start_filler_hedge_count(filler_hedge_request, live, answer_dependency(req.interview_id, "filler_hedge", redis_conn) if live else None)
+
+    # Enqueue speech metrics job (only when the client sent the word timestamps)
+    speech_metrics_job_id = None
+    if req.speech is not None:
+        speech_metrics_request = SpeechMetricsRequest(user_id=req.user_id, interview_id=req.interview_id, speech=req.speech, deadline=deadline)
+        speech_metrics_job_id = start_speech_metrics(speech_metrics_request)
     
     # Enqueue final overall analysis job
     overall_analysis_request = OverallAnalysisRequest(user_id=req.user_id,
@@ -149,12 +277,27 @@ def start_interview_analysis(req: AnalyzeInterviewRequest) -> AnalyzeInterviewRe
                                                       sentiment_job_id=sentiment_job_id,
                                                       star_job_id=star_job_id,
                                                       competency_job_id=competency_job_id,
-                                                      filler_hedge_job_id=filler_hedge_job_id)
+                                                      filler_hedge_job_id=filler_hedge_job_id,
+                                                      speech_metrics_job_id=speech_metrics_job_id,
+                                                      deadline=deadline)
     overall_job_id = start_overall_analysis(overall_analysis_request)
     
     # Invoke other tasks here...
 
+    # remember the interview's jobs so the client can poll all of them at once using the interview id
+    stage_job_ids = {
+        "sentiment": sentiment_job_id,
+        "star": star_job_id,
+        "competency": competency_job_id,
+        "filler_hedge": filler_hedge_job_id,
+        "overall": overall_job_id,
+    }
+    if speech_metrics_job_id:
+        stage_job_ids["speech_metrics"] = speech_metrics_job_id
+    save_interview_jobs(req.interview_id, stage_job_ids, redis_conn)
+
     return AnalyzeInterviewResponse(sentiment_job_id=sentiment_job_id,
                                     star_job_id=star_job_id, competency_job_id=competency_job_id,
                                     filler_hedge_job_id=filler_hedge_job_id,
-                                    overall_job_id=overall_job_id)
\ No newline at end of file
+                                    overall_job_id=overall_job_id,
+                                    speech_metrics_job_id=speech_metrics_job_id or "")
\ No newline at end of file
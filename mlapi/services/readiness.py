@@ -0,0 +1,70 @@
+"""
+Startup and readiness of the subsystems the API depends on (Firebase and Redis).
+
+Importing the API doesn't connect to anything so the process starts serving right away. Firebase is initialized in the background
+once the app starts and Redis is connected to on first use. GET /healthz only reports that the process is alive while GET /readyz
+reports whether every subsystem is ready, so traffic can be held back until it is without restarting a slow-starting process.
+"""
+import os
+import asyncio
+from services.firebase_init import initialize_firebase
+from redisStore.myconnection import get_async_redis_con
+from utils.logger_config import get_logger
+from dotenv import load_dotenv
+
+load_dotenv() # load environment variables
+logger = get_logger(__name__)
+
+READINESS_TIMEOUT = float(os.getenv("READINESS_TIMEOUT", 2)) # seconds /readyz waits for Redis to respond before reporting it as not ready
+FIREBASE_INIT_RETRY_DELAY = float(os.getenv("FIREBASE_INIT_RETRY_DELAY", 5)) # seconds between attempts to initialize Firebase
+
+
+class Readiness:
+    """
+    Tracks whether the API's subsystems are ready to serve requests.
+    """
+
+    def __init__(self):
+        self.firebase = False # whether the Firebase Admin SDK is initialized
+        self.task = None # background task initializing the subsystems
+
+    def start(self) -> None:
+        """
+        Start initializing the subsystems in the background without blocking the app's startup.
+        """
+        self.task = asyncio.create_task(self.initialize_firebase())
+
+    async def stop(self) -> None:
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+
+    async def initialize_firebase(self) -> None:
+        # initializing Firebase reads the service account file, keep it off the event loop and retry until it succeeds
+        while not self.firebase:
+            try:
+                logger.info("Initializing Firebase Admin SDK...")
+                await asyncio.to_thread(initialize_firebase)
+                self.firebase = True
+                logger.info("Firebase Admin SDK initialized")
+            except Exception as e:
+                logger.error(f"Failed to initialize Firebase Admin SDK, retrying in {FIREBASE_INIT_RETRY_DELAY}s: {str(e)}")
+                await asyncio.sleep(FIREBASE_INIT_RETRY_DELAY)
+
+    async def redis(self) -> bool:
+        """
+        Whether Redis responds within READINESS_TIMEOUT seconds.
+        """
+        try:
+            return bool(await asyncio.wait_for(get_async_redis_con().ping(), timeout=READINESS_TIMEOUT))
+        except Exception as e:
+            logger.warning(f"Redis isn't ready: {str(e)}")
+            return False
+
+    async def check(self) -> dict[str, bool]:
+        """
+        Check every subsystem.
+
+        Returns:
+            subsystems (dict[str, bool]): Whether each subsystem is ready
+        """
+        return {"firebase": self.firebase, "redis": await self.redis()}
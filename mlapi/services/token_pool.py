@@ -0,0 +1,198 @@
+"""
+In-memory pool of pre-minted, short-lived third-party tokens (e.g. HeyGen LiveAvatar session tokens, AssemblyAI temporary tokens).
+
+Minting a token is an outbound round-trip that would otherwise sit in the critical path of starting an interview. A background task
+keeps the pool topped up to the current demand, i.e. as many tokens as were requested within a token's usable lifetime (at most `size`),
+so an idle pool stops minting tokens nobody uses. Tokens are handed out oldest first (each token is handed out once), and tokens that
+are about to expire are dropped instead of being handed out. Replacements for expiring tokens are minted `refresh` seconds before they're dropped so the
+pool doesn't run dry while they're being minted. When the pool is empty a token is minted on demand so requests never fail because
+of it. Every mint (background or on demand) counts towards the optional rate cap so a burst of requests can't become a burst of
+outbound calls.
+"""
+import time
+import asyncio
+import statistics
+from collections import deque
+from utils.logger_config import get_logger
+
+logger = get_logger(__name__)
+
+MAX_RETRY_DELAY = 60 # most seconds the refiller waits before retrying after failed mints
+LATENCY_SAMPLES = 100 # number of recent mint latencies the metrics are computed over
+
+
+class TokenPool:
+    """
+    Pool of pre-minted tokens refilled in the background up to the current demand.
+
+    Args:
+        name (str): Name of the pool used in logs and metrics, e.g. "heygen"
+        mint: Async function that mints a new token
+        size (int): Most tokens to keep ready, 0 disables pre-minting (every token is minted on demand)
+        ttl (float): Seconds a token is valid for after it's minted
+        margin (float): Tokens with less than this many seconds left are dropped so clients have time to use them
+        refresh (float): Seconds before a token is dropped that its replacement is minted
+        max_mint_rate (float): Most tokens minted per second, None for no cap
+    Raises:
+        ValueError: If a pre-minted token would need its replacement as soon as it's minted, i.e. ttl <= margin + refresh
+    """
+
+    def __init__(self, name: str, mint, size: int, ttl: float, margin: float, refresh: float = 0, max_mint_rate: float = None):
+        if size < 0 or margin < 0 or refresh < 0:
+            raise ValueError(f"Token pool={name} size, margin, and refresh can't be negative")
+        if size > 0 and ttl <= margin + refresh:
+            # the refiller would replace every token right after minting it, as fast as the rate cap allows
+            raise ValueError(f"Token pool={name} ttl ({ttl}s) must be longer than its margin + refresh ({margin + refresh}s)")
+
+        self.name = name
+        self.mint = mint
+        self.size = size
+        self.ttl = ttl
+        self.margin = margin
+        self.refresh = refresh
+        self.min_mint_interval = 1 / max_mint_rate if max_mint_rate else 0
+        self.next_mint_at = 0.0 # monotonic time the next mint may start at
+        self.tokens = deque() # (token, expires_at) in the order they were minted, i.e. soonest to expire first
+        self.requests = deque() # times tokens were requested within a token's usable lifetime, i.e. the current demand
+        self.wakeup = asyncio.Event() # set when a token is handed out so the refiller replaces it
+        self.task = None # background refiller
+
+        # metrics
+        self.latencies = deque(maxlen=LATENCY_SAMPLES) # seconds each recent mint took
+        self.mints = 0 # tokens minted
+        self.mint_failures = 0 # mints that raised
+        self.rate_limited = 0 # mints delayed by the rate cap
+        self.served = 0 # tokens handed out from the pool
+        self.exhausted = 0 # requests that found the pool empty and waited on an on-demand mint
+        self.expired = 0 # tokens dropped before being handed out
+
+    def start(self) -> None:
+        """
+        Start refilling the pool in the background. Must be called from the running event loop, e.g. on startup.
+        """
+        if self.size > 0 and self.task is None:
+            self.task = asyncio.create_task(self.refill())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        self.tokens.clear()
+
+    def prune(self) -> None:
+        """
+        Drop the tokens that are about to expire.
+        """
+        now = time.time()
+        while self.tokens and self.tokens[0][1] - self.margin <= now:
+            self.tokens.popleft()
+            self.expired += 1
+
+    def demand(self) -> int:
+        """
+        Number of tokens to keep ready: as many as were requested within a token's usable lifetime, up to the pool's size.
+        """
+        now = time.time()
+        while self.requests and self.requests[0] <= now - (self.ttl - self.margin):
+            self.requests.popleft()
+        return min(len(self.requests), self.size)
+
+    def fresh(self) -> int:
+        """
+        Number of tokens that don't need a replacement yet.
+        """
+        now = time.time()
+        return sum(1 for _, expires_at in self.tokens if expires_at - self.margin - self.refresh > now)
+
+    async def mint_token(self) -> str:
+        """
+        Mint a token within the rate cap and record how long it took.
+        """
+        if self.min_mint_interval:
+            now = time.monotonic()
+            slot = max(now, self.next_mint_at)
+            self.next_mint_at = slot + self.min_mint_interval # reserve the slot before waiting so concurrent mints queue up
+            if slot > now:
+                self.rate_limited += 1
+                await asyncio.sleep(slot - now)
+
+        start = time.perf_counter()
+        try:
+            token = await self.mint()
+        except Exception:
+            self.mint_failures += 1
+            raise
+        self.latencies.append(time.perf_counter() - start)
+        self.mints += 1
+        return token
+
+    async def get(self) -> str:
+        """
+        Hand out a token from the pool, or mint one on demand if the pool is empty.
+
+        Returns:
+            token (str): A token with at least `margin` seconds left before it expires
+        """
+        self.prune()
+        self.requests.append(time.time())
+        self.wakeup.set()
+        if self.tokens:
+            token, _ = self.tokens.popleft()
+            self.served += 1
+            return token
+
+        self.exhausted += 1
+        logger.warning(f"Token pool={self.name} is empty, minting a token on demand")
+        return await self.mint_token()
+
+    async def refill(self) -> None:
+        """
+        Keep the pool topped up until the task is cancelled.
+        """
+        delay = 1
+        while True:
+            self.prune()
+            try:
+                while self.fresh() < self.demand():
+                    token = await self.mint_token()
+                    self.tokens.append((token, time.time() + self.ttl))
+                delay = 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # keep serving on-demand mints, retry with exponential backoff
+                logger.error(f"Failed to mint a token for pool={self.name}, retrying in {delay}s: {repr(e)}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+                continue
+
+            # sleep until a token is requested or the oldest fresh token needs a replacement
+            self.wakeup.clear()
+            now = time.time()
+            refresh_at = [expires_at - self.margin - self.refresh for _, expires_at in self.tokens if expires_at - self.margin - self.refresh > now]
+            timeout = refresh_at[0] - now if refresh_at else None
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def metrics(self) -> dict:
+        """
+        Report the pool's state and mint statistics, see schemas.TokenPoolMetrics.
+        """
+        self.prune()
+        latencies = sorted(self.latencies)
+        return {
+            "name": self.name,
+            "size": self.size,
+            "available": len(self.tokens),
+            "mints": self.mints,
+            "mint_failures": self.mint_failures,
+            "rate_limited": self.rate_limited,
+            "served": self.served,
+            "exhausted": self.exhausted,
+            "expired": self.expired,
+            "mint_latency_ms_avg": statistics.fmean(latencies) * 1000 if latencies else None,
+            "mint_latency_ms_p95": latencies[int(0.95 * (len(latencies) - 1))] * 1000 if latencies else None,
+            "mint_latency_ms_max": latencies[-1] * 1000 if latencies else None,
+        }
@@ -0,0 +1,388 @@
+"""
+Analysis of single question/answer pairs and the reduce steps that combine them into an interview's STAR, filler/hedge, and sentiment results.
+
+While an interview is in progress, every answer is analyzed as soon as the candidate finishes it (see services.live). Once the interview
+is created, the live_* tasks replace the full-transcript tasks of ml_tasks: they wait for the per-answer jobs that are still running,
+reduce the stored per-answer results, only analyzing the answers that weren't analyzed during the interview (usually just the last one),
+and write the same fields to the interview. The STAR analysis (ml_tasks.star_analysis) always works per answer, so it reuses the stored
+results whether or not the interview was live.
+"""
+import os
+import asyncio
+from pydantic import BaseModel
+from dotenv import load_dotenv
+from schemas import (
+    StarAnswerEvaluation,
+    StarFeedbackEvaluation,
+    StarAnalysisResult,
+    FillerHedgeResponse,
+    SentimentAnalysisResult,
+    SentimentPercents,
+    AnalysisOutcome,
+)
+from data.interviews import getTurnIndex, setStageResults
+from redisStore.deadlines import get_deadline_outcome
+from redisStore.myconnection import get_redis_con
+from services.live import save_answer_result, get_answer_results
+from services.llm_client import LLM_MAX_CONCURRENCY, LLM_SLOTS, build_messages, complete
+from tasks.prompts import STAR_ANSWER_PROMPT, FILLER_HEDGE_COUNT_PROMPT, SENTIMENT_ANALYSIS_PROMPT
+from utils.prompt_schema import promptVersion
+from utils.transcript import answerText, countFillerHedges
+from utils.logger_config import get_logger
+
+load_dotenv() # load environment variables
+logger = get_logger(__name__)
+
+# questions of an interview a STAR job evaluates at the same time, every request also waits for a free slot of the runner shared by all
+# workers (see redisStore.llm_slots) so this only bounds the threads a single job ties up
+STAR_MAX_CONCURRENCY = int(os.getenv("STAR_MAX_CONCURRENCY", LLM_SLOTS or LLM_MAX_CONCURRENCY))
+IDEAL_STAR_PERCENTAGES = {"situation": 15, "task": 10, "action": 60, "result": 15} # same ideal distribution as the STAR prompts
+MAX_MOST_FREQUENT = 3 # number of filler words/hedge phrases reported as the most frequent
+
+# stages the per-answer results are stored under, versioned by their prompt so results of an older prompt aren't reused after it changes
+STAR_RESULTS = f"star@{promptVersion(STAR_ANSWER_PROMPT)}"
+FILLER_HEDGE_RESULTS = f"filler_hedge@{promptVersion(FILLER_HEDGE_COUNT_PROMPT)}"
+SENTIMENT_RESULTS = f"sentiment@{promptVersion(SENTIMENT_ANALYSIS_PROMPT)}"
+
+
+def ask_llm(system_prompt: str, content: str, response_model: type[BaseModel], cache_key: str | None = None) -> BaseModel:
+    """
+    Send a single structured output request to the local LLM and validate its response.
+
+    Args:
+        system_prompt (str): Instructions for the LLM
+        content (str): The text to analyze
+        response_model (type[BaseModel]): Schema the LLM's response must follow
+        cache_key (str | None): Requests with the same key share a slot of the runner and its cached prompt prefix
+    Returns:
+        result (BaseModel): The validated response
+    Raises:
+        ValidationError: If the LLM's response doesn't fit the schema
+        PromptTooLongError: If the answer doesn't fit in the context window
+    """
+    messages = build_messages(system_prompt, content)
+    return response_model.model_validate_json(complete(messages, response_model, content, cache_key)) # max_tokens is sized for the response model
+
+
+def answer_cache_key(interview_id: str, question: int) -> str:
+    """
+    Cache key of an answer's requests. Answers are keyed separately (instead of by interview) so an interview's answers aren't all pinned
+    to the same slot of the runner and can be evaluated concurrently.
+    """
+    return f"{interview_id}:{question}"
+
+
+def evaluate_star_answer(question: str, answer: str, cache_key: str | None = None) -> StarAnswerEvaluation:
+    """
+    Evaluate how well a single answer follows the STAR framework.
+    """
+    return ask_llm(STAR_ANSWER_PROMPT, f"QUESTION: {question}\nANSWER: {answer}", StarAnswerEvaluation, cache_key)
+
+
+def count_answer_filler_hedges(answer: str, cache_key: str | None = None) -> FillerHedgeResponse:
+    """
+    Count the filler words and hedge phrases of a single answer.
+    """
+    return ask_llm(FILLER_HEDGE_COUNT_PROMPT, answer, FillerHedgeResponse, cache_key)
+
+
+def detect_answer_sentiment(answer: str, cache_key: str | None = None) -> SentimentAnalysisResult:
+    """
+    Detect the sentiment of each sentence of a single answer.
+    """
+    return ask_llm(SENTIMENT_ANALYSIS_PROMPT, answer, SentimentAnalysisResult, cache_key)
+
+
+async def evaluate_star_answers(interview_id: str, questions: list[str], answers: list[str]) -> list[StarAnswerEvaluation]:
+    """
+    Evaluate every answer of an interview against the STAR framework, one short LLM request per answer sent concurrently so the
+    evaluation takes about as long as the longest answer instead of all of them. Answers that were already evaluated (while the
+    interview was in progress or by a previous attempt of the job) are reused.
+
+    Args:
+        interview_id (str): Id of the interview the answers belong to
+        questions (list[str]): The interviewer's questions, in order
+        answers (list[str]): The candidate's answer to each question
+    Returns:
+        evaluations (list[StarAnswerEvaluation]): STAR analysis of each answer, in question order
+    """
+    redis_conn = get_redis_con()
+    stored = get_answer_results(interview_id, STAR_RESULTS, answers, redis_conn)
+    logger.info(f"Reusing {len(stored) - stored.count(None)}/{len(stored)} STAR analyses of interview={interview_id}")
+
+    # at most STAR_MAX_CONCURRENCY requests at a time, the runner's slots are shared with every other job through their leases
+    semaphore = asyncio.Semaphore(STAR_MAX_CONCURRENCY)
+
+    async def evaluate(question: int) -> StarAnswerEvaluation:
+        if stored[question] is not None:
+            return StarAnswerEvaluation.model_validate(stored[question])
+        async with semaphore:
+            evaluation = await asyncio.to_thread(evaluate_star_answer, questions[question], answers[question], answer_cache_key(interview_id, question)) # the LLM client is blocking
+        # stored right away so a retry after another answer failed only evaluates the answers that are still missing
+        save_answer_result(interview_id, STAR_RESULTS, question, answers[question], evaluation.model_dump(mode="json"), redis_conn)
+        return evaluation
+
+    return list(await asyncio.gather(*(evaluate(question) for question in range(len(answers)))))
+
+
+# per-answer jobs enqueued while the interview is in progress (see services.orchestrator.start_answer_analysis)
+
+def star_answer(user_id: str, interview_id: str, question: int, question_text: str, answer_text: str) -> StarAnswerEvaluation:
+    """
+    Perform STAR analysis on a single answer and store the result for star_analysis. This should be a job performed by a Redis RQ Worker.
+
+    Args:
+        user_id (str): User id that owns the interview.
+        interview_id (str): Id of the interview in progress.
+        question (int): Index of the question in the interview.
+        question_text (str): The interviewer's question.
+        answer_text (str): The candidate's answer.
+    Returns:
+        result (StarAnswerEvaluation): STAR analysis of the answer
+    """
+    logger.info(f"Starting STAR analysis on question={question} of interview={interview_id}...")
+    result = evaluate_star_answer(question_text, answer_text, answer_cache_key(interview_id, question))
+    save_answer_result(interview_id, STAR_RESULTS, question, answer_text, result.model_dump(mode="json"), get_redis_con())
+    return result
+
+
+def filler_hedge_answer(user_id: str, interview_id: str, question: int, question_text: str, answer_text: str) -> FillerHedgeResponse:
+    """
+    Count the filler words and hedge phrases of a single answer and store the result for live_filler_hedge_count. This should be a job performed by a Redis RQ Worker.
+
+    Args:
+        user_id (str): User id that owns the interview.
+        interview_id (str): Id of the interview in progress.
+        question (int): Index of the question in the interview.
+        question_text (str): The interviewer's question (unused, every per-answer job takes the same arguments).
+        answer_text (str): The candidate's answer.
+    Returns:
+        result (FillerHedgeResponse): Filler word and hedge phrase counts of the answer
+    """
+    logger.info(f"Starting filler word and hedge phrase count on question={question} of interview={interview_id}...")
+    result = count_answer_filler_hedges(answer_text, answer_cache_key(interview_id, question))
+    save_answer_result(interview_id, FILLER_HEDGE_RESULTS, question, answer_text, result.model_dump(mode="json"), get_redis_con())
+    return result
+
+
+def sentiment_answer(user_id: str, interview_id: str, question: int, question_text: str, answer_text: str) -> SentimentAnalysisResult:
+    """
+    Perform sentiment analysis on a single answer and store the result for live_sentiment_analysis. This should be a job performed by a Redis RQ Worker.
+
+    Args:
+        user_id (str): User id that owns the interview.
+        interview_id (str): Id of the interview in progress.
+        question (int): Index of the question in the interview.
+        question_text (str): The interviewer's question (unused, every per-answer job takes the same arguments).
+        answer_text (str): The candidate's answer.
+    Returns:
+        result (SentimentAnalysisResult): Sentiment of each sentence of the answer
+    """
+    logger.info(f"Starting sentiment analysis on question={question} of interview={interview_id}...")
+    result = detect_answer_sentiment(answer_text, answer_cache_key(interview_id, question))
+    save_answer_result(interview_id, SENTIMENT_RESULTS, question, answer_text, result.model_dump(mode="json"), get_redis_con())
+    return result
+
+
+# reduce steps
+
+def reduce_star(evaluations: list[StarAnswerEvaluation]) -> StarFeedbackEvaluation:
+    """
+    Combine the STAR analyses of every answer into the interview's STAR score and feedback without the LLM.
+
+    The score is the average of the answers' scores. The feedback compares the average STAR distribution to the ideal one and
+    repeats the feedback on the weakest answer.
+
+    Args:
+        evaluations (list[StarAnswerEvaluation]): STAR analysis of each answer, in question order
+    Returns:
+        result (StarFeedbackEvaluation): STAR analysis of the interview
+    """
+    if not evaluations:
+        return StarFeedbackEvaluation(star_analysis=[], overall_score=0, feedback="You didn't answer any questions so your answers couldn't be evaluated against the STAR framework.")
+
+    overall_score = round(sum(evaluation.score for evaluation in evaluations) / len(evaluations))
+
+    # average share of the answers spent on each part of STAR
+    averages = {
+        part: round(sum(getattr(evaluation.star_percentages, f"{part}_percentage") for evaluation in evaluations) / len(evaluations))
+        for part in IDEAL_STAR_PERCENTAGES
+    }
+    distribution = ", ".join(f"{part} {averages[part]}% (ideal {ideal}%)" for part, ideal in IDEAL_STAR_PERCENTAGES.items())
+    feedback = f"Across your {len(evaluations)} answers you spent on average: {distribution}."
+
+    # point the user to the part that's furthest from the ideal distribution
+    part = max(IDEAL_STAR_PERCENTAGES, key=lambda part: abs(averages[part] - IDEAL_STAR_PERCENTAGES[part]))
+    if abs(averages[part] - IDEAL_STAR_PERCENTAGES[part]) >= 5:
+        feedback += f" Spend {'less' if averages[part] > IDEAL_STAR_PERCENTAGES[part] else 'more'} time on the {part} of your answers."
+
+    weakest = min(evaluations, key=lambda evaluation: evaluation.score)
+    if len(evaluations) > 1 and weakest.score < overall_score:
+        feedback += f" Your weakest answer was to \"{weakest.question}\": {weakest.feedback}"
+    else:
+        feedback += f" {weakest.feedback}"
+
+    # the evaluations were validated when they were parsed, their fields are reused as they are instead of being validated a second time
+    fields = StarAnalysisResult.model_fields
+    return StarFeedbackEvaluation(
+        star_analysis=[StarAnalysisResult.model_construct(**{field: getattr(evaluation, field) for field in fields}) for evaluation in evaluations],
+        overall_score=overall_score,
+        feedback=feedback,
+    )
+
+
+def reduce_filler_hedge(counts: list[FillerHedgeResponse]) -> FillerHedgeResponse:
+    """
+    Combine the filler word and hedge phrase counts of every answer into the interview's counts.
+
+    Args:
+        counts (list[FillerHedgeResponse]): Counts of each answer, in question order
+    Returns:
+        result (FillerHedgeResponse): Counts of the interview, the most frequent phrases are the ones most answers relied on
+    """
+    mentions = {} # phrase -> number of answers it was among the most frequent phrases of
+    for count in counts:
+        for phrase in count.most_frequent:
+            mentions[phrase.lower()] = mentions.get(phrase.lower(), 0) + 1
+
+    return FillerHedgeResponse(
+        filler_count=sum(count.filler_count for count in counts),
+        hedge_count=sum(count.hedge_count for count in counts),
+        most_frequent=sorted(mentions, key=mentions.get, reverse=True)[:MAX_MOST_FREQUENT],
+    )
+
+
+def get_overall_sentiment(result: SentimentAnalysisResult) -> str:
+    """
+    Determine the overall sentiment of the user's lines, i.e. the sentiment detected most often.
+
+    Args:
+        result (SentimentAnalysisResult): Sentiment of each of the user's sentences
+    Returns:
+        sentiment (str): "POSITIVE", "NEGATIVE", or "NEUTRAL"
+    """
+    positive = negative = neutral = 0 # initialize counters
+
+    for res in result.sentiment_analysis:
+        if res.sentiment == "POSITIVE":
+            positive += 1
+        elif res.sentiment == "NEGATIVE":
+            negative += 1
+        elif res.sentiment == "NEUTRAL":
+            neutral += 1
+
+    if max(positive, negative, neutral) == positive:
+        return "POSITIVE"
+    elif max(positive, negative, neutral) == negative:
+        return "NEGATIVE"
+    return "NEUTRAL"
+
+
+def get_sentiment_percents(result: SentimentAnalysisResult) -> SentimentPercents:
+    """
+    Determine the share of the user's sentences detected with each sentiment.
+
+    Args:
+        result (SentimentAnalysisResult): Sentiment of each of the user's sentences
+    Returns:
+        percents (SentimentPercents): Percentage of positive, negative, and neutral sentences, all 0 when there were none
+    """
+    total = len(result.sentiment_analysis)
+    if total == 0:
+        return SentimentPercents(positive=0, negative=0, neutral=0)
+    counts = {"POSITIVE": 0, "NEGATIVE": 0, "NEUTRAL": 0}
+    for res in result.sentiment_analysis:
+        counts[res.sentiment] += 1
+    return SentimentPercents(
+        positive=round(counts["POSITIVE"] / total * 100),
+        negative=round(counts["NEGATIVE"] / total * 100),
+        neutral=round(counts["NEUTRAL"] / total * 100),
+    )
+
+
+def reduce_sentiment(results: list[SentimentAnalysisResult]) -> SentimentAnalysisResult:
+    """
+    Combine the sentence sentiments of every answer into the interview's sentence sentiments.
+    """
+    return SentimentAnalysisResult(sentiment_analysis=[sentence for result in results for sentence in result.sentiment_analysis])
+
+
+# final analysis stages of interviews analyzed while in progress (see services.orchestrator.start_interview_analysis)
+
+async def live_filler_hedge_count(user_id: str, interview_id: str) -> FillerHedgeResponse:
+    """
+    Count the filler words and hedge phrases by reducing the counts of the interview's answers. This should be a job performed by a Redis RQ Worker.
+
+    Past its deadline, answers that weren't counted during the interview are counted locally instead of with the LLM.
+
+    Args:
+        user_id (str): User id that owns the interview to be analyzed.
+        interview_id (str): Interview id of the interview undergoing the count.
+
+    Returns:
+        result (FillerHedgeResponse): Counts for filler words, hedge phrases, and some of their most frequent examples.
+    """
+    logger.info(f"Starting filler word and hedge phrase reduce on interview={interview_id}...")
+
+    turnIndex = await getTurnIndex(user_id, interview_id)
+    answers = [answerText(turnIndex, k) for k in range(len(turnIndex.answer_starts))]
+    stored = get_answer_results(interview_id, FILLER_HEDGE_RESULTS, answers, get_redis_con())
+
+    degraded = None in stored and get_deadline_outcome(degradable=True) == AnalysisOutcome.DEGRADED
+    counts = []
+    for k, result in enumerate(stored):
+        if result is not None:
+            counts.append(FillerHedgeResponse.model_validate(result))
+        elif degraded:
+            filler_count, hedge_count, most_frequent = countFillerHedges(answers[k])
+            counts.append(FillerHedgeResponse(filler_count=filler_count, hedge_count=hedge_count, most_frequent=most_frequent))
+        else:
+            counts.append(count_answer_filler_hedges(answers[k], answer_cache_key(interview_id, k)))
+
+    result = reduce_filler_hedge(counts)
+
+    outcome = AnalysisOutcome.DEGRADED if degraded else AnalysisOutcome.FULL
+    await setStageResults(user_id, interview_id, "filler_hedge", {"metrics.filler_count": result.filler_count + result.hedge_count}, outcome)
+
+    logger.info(f"Filler/hedge count on interview={interview_id} successful!")
+    return result
+
+
+async def live_sentiment_analysis(user_id: str, interview_id: str) -> SentimentAnalysisResult:
+    """
+    Perform sentiment analysis by reducing the sentiments of the interview's answers. This should be a job performed by a Redis RQ Worker.
+
+    Past its deadline, answers that weren't analyzed during the interview are skipped.
+
+    Args:
+        user_id (str): User id that owns the interview to be analyzed.
+        interview_id (str): Interview id of the interview undergoing sentiment analysis.
+
+    Returns:
+        result (SentimentAnalysisResult): Sentiment analysis results according to SentimentAnalysisResult schema
+    """
+    logger.info(f"Starting sentiment reduce on interview={interview_id}...")
+
+    turnIndex = await getTurnIndex(user_id, interview_id)
+    answers = [answerText(turnIndex, k) for k in range(len(turnIndex.answer_starts))]
+    stored = get_answer_results(interview_id, SENTIMENT_RESULTS, answers, get_redis_con())
+
+    shed = None in stored and get_deadline_outcome(degradable=False) == AnalysisOutcome.SHED
+    if shed and all(result is None for result in stored):
+        await setStageResults(user_id, interview_id, "sentiment", {}, AnalysisOutcome.SHED)
+        return None
+
+    results = []
+    for k, result in enumerate(stored):
+        if result is not None:
+            results.append(SentimentAnalysisResult.model_validate(result))
+        elif not shed:
+            results.append(detect_answer_sentiment(answers[k], answer_cache_key(interview_id, k)))
+
+    result = reduce_sentiment(results)
+
+    outcome = AnalysisOutcome.DEGRADED if shed else AnalysisOutcome.FULL
+    await setStageResults(user_id, interview_id, "sentiment", {"sentiment": get_overall_sentiment(result)}, outcome)
+
+    logger.info(f"Sentiment analysis on interview={interview_id} successful!")
+    return result
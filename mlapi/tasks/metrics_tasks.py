@@ -0,0 +1,34 @@
+"""
+Deterministic interview metrics computed without the LLM.
+"""
+from schemas import SpeechTimings, SpeechMetrics
+from services.firebase_init import get_firestore_client
+from utils.speech_metrics import computeSpeechMetrics
+from utils.logger_config import get_logger
+
+logger = get_logger(__name__)
+
+
+async def speech_metrics(user_id: str, interview_id: str, speech: dict) -> SpeechMetrics:
+    """
+    Compute the speech-rate and pacing metrics of an interview from the candidate's word timestamps and store them on the interview. The
+    server-side WPM replaces the one sent by the client so the overall analysis uses it. This should be a job performed by a Redis RQ Worker.
+
+    Args:
+        user_id (str): User id that owns the interview to be analyzed.
+        interview_id (str): Id of the interview the word timestamps belong to.
+        speech (dict): The candidate's word timestamps in the shape of the SpeechTimings schema.
+
+    Returns:
+        result (SpeechMetrics): The interview's speech metrics
+    """
+    logger.info(f"Starting speech metrics on interview={interview_id}...")
+
+    metrics = computeSpeechMetrics(SpeechTimings.model_validate(speech))
+
+    db = get_firestore_client()
+    interviewRef = db.collection("users").document(user_id).collection("interviews").document(interview_id)
+    await interviewRef.update({"speech_metrics": metrics.model_dump(), "metrics.wpm": metrics.wpm})
+
+    logger.info(f"Speech metrics on interview={interview_id} successful! wpm={metrics.wpm}")
+    return metrics
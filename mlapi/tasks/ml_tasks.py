@@ -1,26 +1,34 @@
+import os
+from contextlib import contextmanager
 from schemas import (
     SentimentAnalysisResult,
-    StarFeedbackEvaluation,
     CompetencyFeedback,
+    CompetencyAnalysisResult,
     FillerHedgeResponse,
     OverallAnalysisResponse,
+    AnalysisOutcome,
+    Interview,
+    SentimentPercents,
 )
 from utils.logger_config import get_logger
-from utils.transcript import extractUserTranscript
-from data.users import getUser
-import os
-from openai import OpenAI
-from pydantic import ValidationError, BaseModel
+from utils.transcript import parseTranscript, candidateText, excerptText, questionText, answerText, countFillerHedges, TURN_INDEX_VERSION
+from pydantic import BaseModel, ValidationError
+from rq import get_current_job
 from dotenv import load_dotenv
 from data.interviews import (
-    getTranscriptById, 
+    getTurnIndex,
     getInterviewById,
-    setIsAnalyzed
+    setIsAnalyzed,
+    setStageResults,
 )
+from redisStore.deadlines import get_deadline_outcome
+from redisStore.circuit_breaker import CircuitOpenError
+from redisStore.worker import NON_RETRYABLE_ERRORS
 from services.firebase_init import get_firestore_client
+from services.llm_client import build_messages, complete, split_input
+from tasks.answer_tasks import evaluate_star_answers, reduce_star, reduce_filler_hedge, reduce_sentiment, get_overall_sentiment, get_sentiment_percents
 from tasks.prompts import (
     SENTIMENT_ANALYSIS_PROMPT,
-    STAR_PROMPT,
     COMPETENCY_FEEDBACK_PROMPT,
     FILLER_HEDGE_COUNT_PROMPT,
     OVERALL_FEEDBACK_PROMPT,
@@ -29,6 +37,37 @@ from tasks.prompts import (
 logger = get_logger(__name__)
 
 load_dotenv() # load environment variables
+
+OVERALL_EXCERPT_CHARS = int(os.getenv("OVERALL_EXCERPT_CHARS", 600)) # characters of the candidate's answers sent with the overall analysis, 0 to send none
+
+@contextmanager
+def llm_errors(stage: str, interview_id: str):
+    """
+    Fail the current job when its LLM requests fail. The errors the worker handles itself are re-raised as they are (see
+    redisStore.worker.AnalysisJob): jobs that hit an open circuit are parked without using up their retries and NON_RETRYABLE_ERRORS fail
+    without a retry. Any other error is raised as a BaseException to make sure the RQ job returns a failed status and is retried.
+
+    Args:
+        stage (str): Name of the analysis in log messages, e.g. "Sentiment analysis"
+        interview_id (str): Id of the interview being analyzed
+    """
+    try:
+        yield
+    except CircuitOpenError as e:
+        logger.warning(f"{e}, parking the job of interview={interview_id} until the LLM runner may be back")
+        raise
+    except NON_RETRYABLE_ERRORS as e:
+        logger.error(f"{stage} for interview={interview_id} failed, it would fail the same way again: {e}")
+        raise
+    except ValidationError as e:
+        logger.error(f"LLM {stage} on interview={interview_id} is in invalid shape. Reason: {e} Will attempt to retry...")
+        raise
+    except Exception as e:
+        logger.error(f"Error communicating with LLM: {e}")
+        logger.error(f"{stage} for interview={interview_id} failed. Will attempt a retry...")
+        raise BaseException(e)
+
+
 async def detect_audio_sentiment(user_id: str, interview_id: str) -> SentimentAnalysisResult:
     """
     Generate audio sentiment analysis using local LLM. This should be a job performed by a Redis RQ Worker.
@@ -42,85 +81,37 @@ async def detect_audio_sentiment(user_id: str, interview_id: str) -> SentimentAn
 
     logger.info(f"Starting sentiment analysis on interview={interview_id}...")
 
-    # extract relevant environment variables
-    base_url = os.getenv("LM_BASE_URL")
-    api_key = os.getenv("LM_API_KEY")
-    model_name = os.getenv("MODEL")
-    # initialize OpenAI-compliant LLM client
-    client = OpenAI(base_url=base_url, api_key=api_key)
-
-    # get interview's transcript
-    transcript = await getTranscriptById(user_id, interview_id)
-
-    # get user's name 
-    user = await getUser(user_id)
-    userTranscript = extractUserTranscript(transcript, user.name)
-
-    # initialize messages for LLM 
-    # system messages provide additional context to the LLM
-    # user messages are the messages the LLM actually responds to
-    model_messages = [
-                {
-                    "role": "system",
-                    "content": SENTIMENT_ANALYSIS_PROMPT
-                },
-                {
-                    "role": "user",
-                    "content": userTranscript # pass the transcript to the LLM for sentiment analysis
-                }
-            ]
-    try:
-        # response = client.chat.completions.create(
-        #     model=model_name, # llm model name from docker model runner (you can find this by running `docker model list` in your CMD)
-        #     messages = model_messages,
-        # )
-        response = client.beta.chat.completions.parse(
-            model=model_name, # llm model name from docker model runner (you can find this by running `docker model list` in your CMD)
-            messages = model_messages,
-            response_format=SentimentAnalysisResult,
-            max_tokens=8192
-        )
+    # the sentiment is optional on the interview so it's skipped when the job started past its deadline
+    if get_deadline_outcome(degradable=False) == AnalysisOutcome.SHED:
+        await setStageResults(user_id, interview_id, "sentiment", {}, AnalysisOutcome.SHED)
+        return None
 
-    except Exception as e:
-        logger.error(f"Error communicating with LLM: {e}")
-        logger.error(f"Sentiment analysis for interview={interview_id} failed. Will attempt a retry...")
-        # return SentimentAnalysisResult(error=f"Error communicating with LLM: {e}")
-        raise BaseException(e) # to make sure the RQ job returns a failed status, we must raise an exception
+    # get the lines spoken by the user from the interview's turn index
+    turnIndex = await getTurnIndex(user_id, interview_id)
+    userTranscript = candidateText(turnIndex)
+
+    # long transcripts are split into chunks that each fit in the context window along with the sentence-by-sentence response
+    chunks = split_input(SENTIMENT_ANALYSIS_PROMPT, userTranscript, SentimentAnalysisResult)
+
+    with llm_errors("Sentiment analysis", interview_id):
+        llm_responses = []
+        for chunk in chunks:
+            # the transcript goes first so the interview's other stages reuse its cached prefix (see services.llm_client)
+            model_messages = build_messages(SENTIMENT_ANALYSIS_PROMPT, chunk)
+            llm_responses.append(complete(model_messages, SentimentAnalysisResult, chunk, cache_key=interview_id)) # max_tokens grows with the chunk's length
     
     db = get_firestore_client()
     # parse and return LLM response
     try:
         logger.info(f"Verifying LLM sentiment analysis on interview={interview_id}...")
 
-        # llm_response = response.choices[0].message.content # extract LLM's JSON response string
-
-        llm_response = response.choices[0].message.parsed
-
-        logger.info(f"LLM response={llm_response}")
-        # verify LLM JSON response is the correct shape 
-        # validated_data = SentimentAnalysisResult.model_validate_json(llm_response) # parses JSON string, checks if it fits our response schema and instantiates our schema if successful 
-        validated_data = SentimentAnalysisResult.model_validate(llm_response)
+        logger.info(f"LLM response={llm_responses}")
+        # verify each LLM JSON response is the correct shape and merge the chunks' sentences
+        validated_data = reduce_sentiment([SentimentAnalysisResult.model_validate_json(llm_response) for llm_response in llm_responses]) # parse JSON string, checks if it fits our response schema and instantiates our schema if successful
         logger.info(f"Sentiment Analysis on interview={interview_id} successful!")
 
         # determine overall sentiment
-        data = validated_data.model_dump() # extract sentiment analysis from verified schema
-        positive = negative = neutral = 0 # initialize counters
-        
-        for res in data["sentiment_analysis"]:
-            if res["sentiment"] == "POSITIVE":
-                positive += 1
-            elif res["sentiment"] == "NEGATIVE":
-                negative += 1
-            elif res["sentiment"] == "NEUTRAL":
-                neutral += 1
-
-        overall_sentiment = "" 
-        if max(positive, negative, neutral) == positive:
-            overall_sentiment = "POSITIVE"
-        elif max(positive, negative, neutral) == negative:
-            overall_sentiment = "NEGATIVE"
-        else:
-            overall_sentiment = "NEUTRAL"
+        overall_sentiment = get_overall_sentiment(validated_data)
 
         # get reference to interview
         interviewRef = db.collection("users").document(user_id).collection("interviews").document(interview_id)
@@ -130,97 +121,49 @@ async def detect_audio_sentiment(user_id: str, interview_id: str) -> SentimentAn
     except ValidationError as e:
         logger.error(f"LLM sentiment analysis on interview={interview_id} is in invalid shape. Reason: {e} Will attempt to retry...")
 
-        raise ValidationError(f"LLM sentiment analysis on interview={interview_id} is in invalid shape: {llm_response} Reason: {e}") # to make sure the RQ job returns a failed status, we must raise an exception
+        raise ValidationError(f"LLM sentiment analysis on interview={interview_id} is in invalid shape: {llm_responses} Reason: {e}") # to make sure the RQ job returns a failed status, we must raise an exception
 
-async def star_analysis(user_id: str, interview_id: str) -> CompetencyFeedback:
+async def star_analysis(user_id: str, interview_id: str) -> dict:
     """
     Perform STAR analysis using local LLM. This should be a job performed by a Redis RQ Worker.
 
+    Each question/answer pair is evaluated with its own short request and the requests run concurrently (see
+    answer_tasks.evaluate_star_answers), then the per-answer results are reduced into the interview's score and feedback without the LLM.
+
     Args:
         user_id (str): User id that owns the interview to be analyzed.
         interview_id (str): Interview id of the interview undergoing STAR analysis.
 
     Returns:
-        result (StarFeedbackEvaluation): STAR analysis results according to StarFeedbackEvaluation schemas 
+        result (dict): The STAR score and summary stored on the interview
     """
 
     logger.info(f"Starting STAR analysis on interview={interview_id}...")
 
-    # extract relevant environment variables
-    base_url = os.getenv("LM_BASE_URL")
-    api_key = os.getenv("LM_API_KEY")
-    model_name = os.getenv("MODEL")
-
-    # initialize OpenAI-compliant LLM client
-    client = OpenAI(base_url=base_url, api_key=api_key)
-
-    # get interview's transcript
-    transcript = await getTranscriptById(user_id, interview_id)
-
-    # initialize messsages for LLM
-    # system messages provide additional context to the LLM before inference
-    # user messages are messages that the LLM responds to
-    model_messages = [
-        {
-            "role": "system",
-            "content": STAR_PROMPT
-        },
-        {
-            "role": "user",
-            "content": transcript # pass the transcript to the LLM for star analysis
-        }
-    ]
-    
-    # send task to local LLM
-    try:
-        # response = client.chat.completions.create(
-        #     model=model_name, # llm model name from docker model runner (you can find this by running `docker model list` in your CMD)
-        #     messages = model_messages,
-        # )
-        response = client.beta.chat.completions.parse(
-            model=model_name, # llm model name from docker model runner (you can find this by running `docker model list` in your CMD)
-            messages = model_messages,
-            response_format=StarFeedbackEvaluation,
-            max_tokens=8192
-        )
-    except Exception as e:
-        logger.error(f"Error communicating with LLM: {e}")
-        logger.error(f"STAR analysis for interview={interview_id} failed. Will attempt a retry...")
-        raise BaseException(e) # raise exception to set failed job status
-    
+    # get the interview's question/answer pairs from its turn index
+    turnIndex = await getTurnIndex(user_id, interview_id)
+    questions = [questionText(turnIndex, k) for k in range(len(turnIndex.answer_starts))]
+    answers = [answerText(turnIndex, k) for k in range(len(turnIndex.answer_starts))]
 
-    db = get_firestore_client()
+    with llm_errors("STAR analysis", interview_id):
+        evaluations = await evaluate_star_answers(interview_id, questions, answers)
 
-    # parse and return LLM response
-    try:
-        logger.info(f"Verifying LLM STAR analysis on interview={interview_id}...")
+    star_feedback = reduce_star(evaluations)
+    logger.info(f"STAR analysis on interview={interview_id} successful!")
 
-        # llm_response = response.choices[0].message.content
-        llm_response = response.choices[0].message.parsed
-        # extract LLM's JSON response string
-        logger.info(f"LLM response={llm_response}")
-        # verify LLM JSON response is the correct shape
-        # validated_data = StarFeedbackEvaluation.model_validate_json(llm_response) # parse JSON string, if it matches the schema then instantiate; otherwise throw
-        validated_data = StarFeedbackEvaluation.model_validate(llm_response)
-        logger.info(f"STAR analysis on interview={interview_id} successful!")
-
-        data = validated_data.model_dump() # generate dictionary of validated llm response
-        
-        # NOTE: Currently, we only store the final score and overall feedback from STAR analysis but feel free to use the entire LLM response. However, you may have to update the related schemas/interfaces from the backend and frontend to reflect the new shape.
-        star_response = {
-            "score": data["overall_score"],
-            "summary": data["feedback"],
-        }
+    # NOTE: Currently, we only store the final score and overall feedback from STAR analysis but feel free to use the per-answer results. However, you may have to update the related schemas/interfaces from the backend and frontend to reflect the new shape.
+    star_response = {
+        "score": star_feedback.overall_score,
+        "summary": star_feedback.feedback,
+    }
 
-        # add STAR analysis to user's interview
-        # get reference to interview
-        interviewRef = db.collection("users").document(user_id).collection("interviews").document(interview_id)
-        await interviewRef.update({"feedback.overall_competency.star": star_response})
+    # add STAR analysis to user's interview
+    # get reference to interview
+    db = get_firestore_client()
+    interviewRef = db.collection("users").document(user_id).collection("interviews").document(interview_id)
+    await interviewRef.update({"feedback.overall_competency.star": star_response})
 
-        return star_response
-    except ValidationError as e:
-        logger.error(f"LLM STAR analysis on interview={interview_id} is in invalid shape. Reason: {e} Will attempt to retry...")
-        raise ValidationError(f"LLM STAR analysis on interview={interview_id} is in invalid shape. Reason: {e} Will attempt to retry...") # raise error to set RQ job to failed status
+    return star_response
 
 async def analyze_competencies(user_id: str, interview_id: str):
     """
@@ -237,61 +180,19 @@ async def analyze_competencies(user_id: str, interview_id: str):
         result: Competency analysis results.
     """
 
-    class LLMResponse(BaseModel):
-        """
-        Response schema to define the shape of the expected LLM response for competency analysis.
-        """
-        clarity: CompetencyFeedback  # Evaluation on communication clarity
-        confidence: CompetencyFeedback # Evaluation on confidence
-        engagement: CompetencyFeedback # Evaluation on engagement
-
     logger.info(f"Starting competencies analysis on interview={interview_id}...")
 
-    # extract relevant environment variables
-    base_url = os.getenv("LM_BASE_URL")
-    api_key = os.getenv("LM_API_KEY")
-    model_name = os.getenv("MODEL")
-
-    # initialize OpenAI-compliant LLM client
-    client = OpenAI(base_url=base_url, api_key=api_key)
-
-    # get interview's transcript
-    transcript = await getTranscriptById(user_id, interview_id)
-
-    # get user's name 
-    user = await getUser(user_id)
-    userTranscript = extractUserTranscript(transcript, user.name)
-
-    # initialize messsages for LLM
-    # system messages provide additional context to the LLM before inference
-    # user messages are messages that the LLM responds to
-    model_messages = [
-        {
-            "role": "system",
-            "content": COMPETENCY_FEEDBACK_PROMPT
-        },
-        {
-            "role": "user",
-            "content": userTranscript # pass the transcript to the LLM for competencies analysis
-        }
-    ]
+    # get the lines spoken by the user from the interview's turn index
+    turnIndex = await getTurnIndex(user_id, interview_id)
+    userTranscript = candidateText(turnIndex)
+
+    # the transcript goes first so the interview's other stages reuse its cached prefix (see services.llm_client)
+    model_messages = build_messages(COMPETENCY_FEEDBACK_PROMPT, userTranscript)
 
     # send task to local LLM
-    try:
-        # response = client.chat.completions.create(
-        #     model=model_name, # llm model name from docker model runner (you can find this by running `docker model list` in your CMD)
-        #     messages = model_messages,
-        # )
-        response = client.beta.chat.completions.parse(
-            model=model_name,
-            messages=model_messages,
-            response_format=LLMResponse,
-            max_tokens=8192
-        )
-    except Exception as e:
-        logger.error(f"Error communicating with LLM: {e}")
-        logger.error(f"Competencies analysis for interview={interview_id} failed. Will attempt a retry...")
-        raise BaseException(e) # raise exception to set failed job status
+    # a transcript too long for the context window is rejected (PromptTooLongError) instead of split, these scores depend on all of it
+    with llm_errors("Competencies analysis", interview_id):
+        llm_response = complete(model_messages, CompetencyAnalysisResult, cache_key=interview_id) # max_tokens is sized for the response model
     
     db = get_firestore_client()
 
@@ -299,14 +200,10 @@ async def analyze_competencies(user_id: str, interview_id: str):
     try:
         logger.info(f"Verifying LLM competencies analysis on interview={interview_id}...")
 
-        # llm_response = response.choices[0].message.content
-        llm_response = response.choices[0].message.parsed
-        # extract LLM's JSON response string
         logger.info(f"LLM response={llm_response}")
 
         # verify LLM JSON response is in the correct shape
-        # validated_data = LLMResponse.model_validate_json(llm_response) # parse JSON string, if it matches the schema then instantiate; otherwise throw
-        validated_data = LLMResponse.model_validate(llm_response)
+        validated_data = CompetencyAnalysisResult.model_validate_json(llm_response) # parse JSON string, checks if it fits our response schema and instantiates our schema if successful
 
         logger.info(f"Competencies analysis on interview={interview_id} successful!")
 
@@ -348,51 +245,27 @@ async def filler_hedge_count(user_id: str, interview_id: str) -> FillerHedgeResp
 
     logger.info(f"Starting filler word and hedge phrase count on interview={interview_id}...")
 
-    # extract relevant environment variables
-    base_url = os.getenv("LM_BASE_URL")
-    api_key = os.getenv("LM_API_KEY")
-    model_name = os.getenv("MODEL")
-
-    # initialize OpenAI-compliant LLM client
-    client = OpenAI(base_url=base_url, api_key=api_key)
-
-    # get user's name 
-    user = await getUser(user_id)
-
-    # get interview's transcript
-    transcript = await getTranscriptById(user_id, interview_id)
-    userTranscript = extractUserTranscript(transcript, user.name)
-
-    # initialize messsages for LLM
-    # system messages provide additional context to the LLM before inference
-    # user messages are messages that the LLM responds to
-    model_messages = [
-        {
-            "role": "system",
-            "content": FILLER_HEDGE_COUNT_PROMPT
-        },
-        {
-            "role": "user",
-            "content": userTranscript # pass the transcript to the LLM for star analysis
-        }
-    ]
+    # get the lines spoken by the user from the interview's turn index
+    turnIndex = await getTurnIndex(user_id, interview_id)
+    userTranscript = candidateText(turnIndex)
+
+    # count the filler words and hedge phrases locally instead of with the LLM when the job started past its deadline
+    if get_deadline_outcome(degradable=True) == AnalysisOutcome.DEGRADED:
+        filler_count, hedge_count, most_frequent = countFillerHedges(userTranscript)
+        await setStageResults(user_id, interview_id, "filler_hedge", {"metrics.filler_count": filler_count + hedge_count}, AnalysisOutcome.DEGRADED)
+
+        return FillerHedgeResponse(filler_count=filler_count, hedge_count=hedge_count, most_frequent=most_frequent)
+
+    # long transcripts are split into chunks that each fit in the context window, their counts are added up
+    chunks = split_input(FILLER_HEDGE_COUNT_PROMPT, userTranscript, FillerHedgeResponse)
 
     # send task to local LLM
-    try:
-        # response = client.chat.completions.create(
-        #     model=model_name, # llm model name from docker model runner (you can find this by running `docker model list` in your CMD)
-        #     messages = model_messages,
-        # )
-        response = client.beta.chat.completions.parse(
-            model=model_name, # llm model name from docker model runner (you can find this by running `docker model list` in your CMD)
-            messages = model_messages,
-            response_format=FillerHedgeResponse,
-            max_tokens=8192
-        )
-    except Exception as e:
-        logger.error(f"Error communicating with LLM: {e}")
-        logger.error(f"Filler/hedge extraction for interview={interview_id} failed. Will attempt a retry...")
-        raise BaseException(e) # raise exception to set failed job status
+    with llm_errors("Filler/hedge extraction", interview_id):
+        llm_responses = []
+        for chunk in chunks:
+            # the transcript goes first so the interview's other stages reuse its cached prefix (see services.llm_client)
+            model_messages = build_messages(FILLER_HEDGE_COUNT_PROMPT, chunk)
+            llm_responses.append(complete(model_messages, FillerHedgeResponse, cache_key=interview_id)) # max_tokens is sized for the response model
 
     db = get_firestore_client()
 
@@ -400,16 +273,10 @@ async def filler_hedge_count(user_id: str, interview_id: str) -> FillerHedgeResp
     try:
         logger.info(f"Verifying LLM filler/hedge extraction on interview={interview_id}...")
 
-        # llm_response = response.choices[0].message.content
-        llm_response = response.choices[0].message.parsed
-
-        # extract LLM's JSON response string
-        logger.info(f"LLM response={llm_response}")
-        # verify LLM JSON response is the correct shape
-        # validated_data = FillerHedgeResponse.model_validate_json(llm_response)
-        validated_data = FillerHedgeResponse.model_validate(llm_response)
+        logger.info(f"LLM response={llm_responses}")
+        # verify each LLM JSON response is the correct shape and add up the chunks' counts
+        validated_data = reduce_filler_hedge([FillerHedgeResponse.model_validate_json(llm_response) for llm_response in llm_responses]) # parse JSON string, checks if it fits our response schema and instantiates our schema if successful
         
-        # parse JSON string, if it matches the schema then instantiate; otherwise throw
         logger.info(f"Filler/hedge extraction on interview={interview_id} successful!")
 
         data = validated_data.model_dump() # generate dictionary of validated llm response
@@ -439,54 +306,30 @@ async def overall_analysis(user_id: str, interview_id: str) -> OverallAnalysisRe
 
     logger.info(f"Starting final overall analysis on intervew={interview_id}...")
 
-    # extract relevant environment variables
-    base_url = os.getenv("LM_BASE_URL")
-    api_key = os.getenv("LM_API_KEY")
-    model_name = os.getenv("MODEL")
+    interview = await getInterviewById(user_id, interview_id) # get interview
 
-    # initialize OpenAI-compliant LLM client
-    client = OpenAI(base_url=base_url, api_key=api_key)
+    # score the interview from the other stages' results instead of with the LLM when the job started past its deadline
+    if get_deadline_outcome(degradable=True) == AnalysisOutcome.DEGRADED:
+        validated_data = degraded_overall_analysis(interview)
+        fields = {"metrics.overall_score": validated_data.overall_score, "feedback.ai_feedback": validated_data.overall_feedback}
+        await setStageResults(user_id, interview_id, "overall", fields, AnalysisOutcome.DEGRADED)
+        await setIsAnalyzed(user_id, interview_id)
 
-    interview = await getInterviewById(user_id, interview_id) # get interview
+        logger.info(f"Degraded analysis tasks on interview={interview_id} for user={user_id} successful!")
+        return validated_data
     
-    # extract transcript
-    # transcript = await getTranscriptById(user_id, interview_id)
-    transcript = interview.transcript
-
-    # extract WPM 
-    wpm = interview.metrics.wpm
-    # extract filler word count
-    filler_count = interview.metrics.filler_count
-    # initialize messsages for LLM
-    # system messages provide additional context to the LLM before inference
-    # user messages are messages that the LLM responds to
-    model_messages = [
-        {
-            "role": "system",
-            "content": OVERALL_FEEDBACK_PROMPT
-        },
-        {
-            "role": "user",
-            "content": f"TRANSCRIPT: {transcript}\nWPM: {wpm}\nFILLER WORD COUNT: {filler_count}" # pass the transcript, wpm, and filler word count to the LLM for final overall analysis
-        },
-    ]
+    # the upstream stages' structured results are sent instead of the whole transcript, along with a short excerpt of the candidate's
+    # answers (interviews created before the turn index existed are parsed here)
+    turnIndex = interview.turn_index
+    if turnIndex is None or turnIndex.version != TURN_INDEX_VERSION:
+        turnIndex = parseTranscript(interview.transcript)
+    excerpt = excerptText(candidateText(turnIndex), OVERALL_EXCERPT_CHARS) if OVERALL_EXCERPT_CHARS > 0 else ""
+    upstream = summarize_upstream_results(interview, get_dependency_results(), excerpt)
+    model_messages = build_messages(OVERALL_FEEDBACK_PROMPT, upstream)
 
     # send task to local LLM
-    try:
-        # response = client.chat.completions.create(
-        #     model=model_name, # llm model name from docker model runner (you can find this by running `docker model list` in your CMD)
-        #     messages = model_messages,
-        # )
-        response = client.beta.chat.completions.parse(
-            model=model_name, # llm model name from docker model runner (you can find this by running `docker model list` in your CMD)
-            messages = model_messages,
-            response_format=OverallAnalysisResponse,
-            max_tokens=8192
-        )
-    except Exception as e:
-        logger.error(f"Error communicating with LLM: {e}")
-        logger.error(f"Overall analysis for interview={interview_id} failed. Will attempt a retry...")
-        raise BaseException(e) # raise exception to set failed job status
+    with llm_errors("Overall analysis", interview_id):
+        llm_response = complete(model_messages, OverallAnalysisResponse, cache_key=interview_id) # max_tokens is sized for the response model
     
     db = get_firestore_client()
 
@@ -494,16 +337,11 @@ async def overall_analysis(user_id: str, interview_id: str) -> OverallAnalysisRe
     try:
         logger.info(f"Verifying LLM overall analysis on interview={interview_id}...")
 
-        # llm_response = response.choices[0].message.content
-        llm_response = response.choices[0].message.parsed
-        # extract LLM's JSON response string
         logger.info(f"LLM response={llm_response}")
 
         # verify LLM JSON response is the correct shape
-        # validated_data = OverallAnalysisResponse.model_validate_json(llm_response)
-        validated_data = OverallAnalysisResponse.model_validate(llm_response)
+        validated_data = OverallAnalysisResponse.model_validate_json(llm_response) # parse JSON string, checks if it fits our response schema and instantiates our schema if successful
 
-        # parse JSON string, if it matches the schema then instantiate; otherwise throw
         logger.info(f"Overall analysis on interview={interview_id} successful!")
 
         # get reference to interview
@@ -523,4 +361,97 @@ async def overall_analysis(user_id: str, interview_id: str) -> OverallAnalysisRe
     except ValidationError as e:
         logger.error(f"LLM overall analysis on interview={interview_id} is in invalid shape. Reason: {e} Will attempt to retry...")
 
-        raise ValidationError(f"LLM overall analysis on interview={interview_id} is in invalid shape: {llm_response} Reason: {e}") # to make sure the RQ job returns a failed status, we must raise an exception
\ No newline at end of file
+        raise ValidationError(f"LLM overall analysis on interview={interview_id} is in invalid shape: {llm_response} Reason: {e}") # to make sure the RQ job returns a failed status, we must raise an exception
+
+
+def get_dependency_results() -> dict[type, BaseModel]:
+    """
+    Get the results of the current job's dependencies, i.e. the upstream analysis stages of the overall analysis. Results that expired
+    or stages that were shed are left out.
+
+    Returns:
+        results (dict[type, BaseModel]): Each dependency's result by its type, e.g. SentimentAnalysisResult
+    """
+    job = get_current_job()
+    if job is None:
+        return {}
+    results = {}
+    for dependency in job.fetch_dependencies():
+        result = dependency.return_value()
+        if isinstance(result, BaseModel):
+            results[type(result)] = result
+    return results
+
+
+def summarize_upstream_results(interview: Interview, results: dict[type, BaseModel], excerpt: str = "") -> str:
+    """
+    Summarize the upstream analysis stages' results as the input of the overall analysis, a few hundred characters instead of the whole
+    transcript.
+
+    Args:
+        interview (Interview): The interview with the upstream stages' results
+        results (dict[type, BaseModel]): Results of the overall analysis job's dependencies, see get_dependency_results
+        excerpt (str): Short excerpt of the candidate's answers, left out when empty
+    Returns:
+        summary (str): One line per result
+    """
+    lines = []
+
+    competencies = interview.feedback.overall_competency if interview.feedback else None
+    if competencies is not None:
+        lines.append("COMPETENCIES (score out of 10: summary):")
+        for name, feedback in (("STAR", competencies.star), ("Clarity", competencies.clarity), ("Confidence", competencies.confidence), ("Engagement", competencies.engagement)):
+            lines.append(f"- {name}: {feedback.score:g}: {feedback.summary}")
+
+    sentiment = results.get(SentimentAnalysisResult)
+    if sentiment is not None:
+        percents = get_sentiment_percents(sentiment)
+        lines.append(f"SENTIMENT: {percents.positive}% positive, {percents.neutral}% neutral, {percents.negative}% negative sentences")
+    elif isinstance(interview.sentiment, SentimentPercents):
+        lines.append(f"SENTIMENT: {interview.sentiment.positive}% positive, {interview.sentiment.neutral}% neutral, {interview.sentiment.negative}% negative sentences")
+    elif interview.sentiment:
+        lines.append(f"SENTIMENT: mostly {interview.sentiment}")
+
+    metrics = interview.metrics
+    if interview.speech_metrics is not None:
+        lines.append(f"WPM: {interview.speech_metrics.wpm}")
+    elif metrics is not None and metrics.wpm is not None:
+        lines.append(f"WPM: {metrics.wpm}") # estimated by the client from the transcript, e.g. when the speech metrics stage failed
+
+    filler_hedge = results.get(FillerHedgeResponse)
+    if filler_hedge is not None:
+        lines.append(f"FILLER WORDS: {filler_hedge.filler_count}, HEDGE PHRASES: {filler_hedge.hedge_count}, MOST FREQUENT: {', '.join(filler_hedge.most_frequent) or 'none'}")
+    elif metrics is not None and metrics.filler_count is not None:
+        lines.append(f"FILLER WORD COUNT: {metrics.filler_count}")
+
+    speech = interview.speech_metrics
+    if speech is not None:
+        pause = f", median pause {speech.pause_median_ms}ms" if speech.pause_median_ms is not None else ""
+        lines.append(f"PACING: {speech.answer_count} answers averaging {speech.answer_words_mean:g} words and {speech.answer_seconds_mean:g}s, {speech.long_pause_count} long pauses{pause}")
+
+    if excerpt:
+        lines.append(f"EXCERPT OF THE CANDIDATE'S ANSWERS: {excerpt}")
+    return "\n".join(lines)
+
+
+def degraded_overall_analysis(interview: Interview) -> OverallAnalysisResponse:
+    """
+    Compute the overall analysis without the LLM by averaging the competency scores and combining their summaries. Used when the overall analysis job started past its deadline.
+
+    Args:
+        interview (Interview): The interview with the other analysis stages' results.
+
+    Returns:
+        result (OverallAnalysisResponse): Overall analysis results, i.e. overall feedback and overall score.
+    """
+    competencies = interview.feedback.overall_competency if interview.feedback else None
+    if competencies is None:
+        return OverallAnalysisResponse(overall_feedback="Your interview couldn't be analyzed in time. Please try again later.", overall_score=0)
+
+    feedbacks = [competencies.star, competencies.clarity, competencies.confidence, competencies.engagement]
+
+    # competencies are scored out of 10 while the overall score is out of 100
+    overall_score = round(sum(feedback.score for feedback in feedbacks) / len(feedbacks) * 10)
+    overall_feedback = " ".join(["Your detailed overall feedback was skipped because the analysis took longer than expected. Here's a summary of your competencies:"] + [feedback.summary for feedback in feedbacks])
+
+    return OverallAnalysisResponse(overall_feedback=overall_feedback, overall_score=overall_score)
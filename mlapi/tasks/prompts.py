@@ -1,137 +1,110 @@
-# Prompts for LLM to be exported for usage 
+# Prompts for LLM to be exported for usage
+# Each prompt is the task's instructions followed by a compact description of its response model's fields (see utils.prompt_schema),
+# the JSON structure itself is enforced by structured output decoding
+from schemas import (
+    SentimentAnalysisResult,
+    StarAnswerEvaluation,
+    CompetencyAnalysisResult,
+    FillerHedgeResponse,
+    OverallAnalysisResponse,
+)
+from utils.prompt_schema import buildPrompt, promptVersion
 
 # SENTIMENT_ANALYSIS
-SENTIMENT_ANALYSIS_PROMPT = """
-    You are an expert technical recruiter and behavioral analyst specializing in interviews. Your task is to analyze an interview transcript and evaluate the candidate's sentiment, emotional intelligence, and communication skills.
-
-    Analyze the transcript line-by-line. Ignore any sentences spoken by the interviewer if any. If the user didn't say much in their transcript or their transcript is empty, criticize them within your feedback because of a lack of participation.
-
-    Provide your response STRICTLY as a raw JSON object. 
-    CRITICAL: Do not use Markdown formatting. Do not wrap the JSON in backticks (e.g., ```json or ```). Do not include any introductory or concluding text. Your entire output must be directly parsable by a standard JSON parser.
-
-    Use the exact following JSON structure:
+SENTIMENT_ANALYSIS_PROMPT = buildPrompt(
+    """
+    You are an expert technical recruiter and behavioral analyst specializing in interviews. Analyze the candidate's sentiment in the
+    interview transcript line-by-line, ignoring any sentences spoken by the interviewer.
+    """,
+    SentimentAnalysisResult,
     {
-        "sentiment_analysis": [
-            {
-                "text": "[The specific sentence spoken by the candidate]",
-                "sentiment": "[Must be exactly 'POSITIVE', 'NEGATIVE', or 'NEUTRAL']",
-                "confidence": Float between 0.0 and 1.0
-            }
-        ]
-    }
-
-"""
-
-
-# STAR_SCORES
-STAR_PROMPT = """
-    You are an expert behavioral analyst specializing in interviews. 
-    FIRST: Analyze the interview transcript and deduce the specific job role or industry the candidate is targeting based on the context of their answers and assume the position as an interviewer specialized for that role.
-    SECOND: Analyze the interview transcript and evaluate how well the candidate utilized the STAR method (Situation, Task, Action, and Result) based on the specific skills and expectations of that deduced role.
-
-    For each question asked by the interviewer, evaluate the candidate's response. Score their overall adherence to the STAR framework out of 10, estimate the percentage of the response dedicated to each STAR category, and provide constructive feedback. If the user didn't say much in their transcript or their transcript is empty, give them a 0 in their overall score and criticize them within your feedback because of a lack of participation.
-
-    Provide your response STRICTLY as a raw JSON object. 
-    CRITICAL: Do not use Markdown formatting. Do not wrap the JSON in backticks (e.g., ```json or ```). Do not include any introductory or concluding text. 
-
-    IMPORTANT CONSTRAINTS:
-    1. Do not analyze any sentences from the interviewer (except to extract the question).
-    2. The four percentage values in "star_percentages" MUST mathematically add up exactly to 100.
-    3. The ideal percentage distribution is Situation (15%), Task (10%), Action (60%), and Result (15%). Use this baseline to inform your feedback.
-    4. Tailor your qualitative feedback to the inferred role. 
-
-    Use the exact following JSON structure:
+        "sentiment_analysis": "one entry per sentence spoken by the candidate",
+        "sentiment_analysis.text": "the sentence",
+        "sentiment_analysis.confidence": "0.0-1.0",
+    },
+)
+
+
+# STAR_SCORES (one question/answer pair per request, reduced by answer_tasks.reduce_star)
+STAR_ANSWER_PROMPT = buildPrompt(
+    """
+    You are an expert behavioral analyst specializing in interviews. You are given a question asked by the interviewer (after
+    "QUESTION:") and the candidate's answer (after "ANSWER:"). Evaluate how well the answer uses the STAR method (Situation, Task, Action,
+    Result) for the role the question suggests, and tailor your feedback to that role. The ideal distribution is Situation 15%, Task 10%,
+    Action 60%, Result 15%. If the answer is empty or very short, score it 0 and criticize the lack of participation.
+    """,
+    StarAnswerEvaluation,
     {
-    "star_analysis": [
-        {
-            "question": "[The exact question asked by the interviewer]",
-            "star_breakdown": {
-                "situation": "[Identify the situation described by the candidate, or 'Not Provided']",
-                "task": "[Identify the task or goal described by the candidate, or 'Not Provided']",
-                "action": "[Identify and summarize the specific actions the candidate took, or 'Not Provided']",
-                "result": "[Identify the measurable results or outcomes, or 'Not Provided']"
-            },
-            "star_percentages": {
-                "situation_percentage": Integer 0-100,
-                "task_percentage": Integer 0-100,
-                "action_percentage": Integer 0-100,
-                "result_percentage": Integer 0-100
-            }
-        }
-    ],
-    "overall_score": Integer between 0 and 10,
-    "feedback": "[2-3 sentences of actionable feedback speaking directly to the candidate (e.g., 'You did a great job...'). If their percentages deviate from the ideal distribution, advise them on how to rebalance their response.]"
-    }
-"""
+        "question": "the exact question",
+        "star_breakdown.situation": "the situation described, or 'Not Provided'",
+        "star_breakdown.task": "the task or goal described, or 'Not Provided'",
+        "star_breakdown.action": "summary of the candidate's specific actions, or 'Not Provided'",
+        "star_breakdown.result": "the measurable results, or 'Not Provided'",
+        "star_percentages": "share of the answer spent on each part, the four add up to exactly 100",
+        "score": "0-10 adherence to STAR",
+        "feedback": "1-2 sentences of actionable feedback to the candidate, on how to rebalance the answer if it deviates from the ideal distribution",
+    },
+)
 
 
 # COMPETENCY SCORES/FEEDBACK
-COMPETENCY_FEEDBACK_PROMPT = """
-    You are an expert interview analyst. 
-    FIRST: Analyze the interview transcript and deduce the specific job role or industry the candidate is targeting based on the context of their answers and assume the position as an interviewer specialized for that role.
-    SECOND: Analyze the interview transcript and evaluate the candidate's communication clarity, confidence, and engagement, judging them against the specific communication standards required for that inferred role.
-
-    Score each competency out of 10 and provide personalized, actionable feedback taking into account the candidate's strengths and weaknesses. Ignore any sentences spoken by the interviewer if any. If the user didn't say much in their transcript or its empty, give them a 0 for their clarity score, confidence score, and engagement score and also criticize them within your clarity, confidence, and engagement feedbacks because of a lack of participation.
-
-    Provide your response STRICTLY as a raw JSON object. 
-    CRITICAL: Do not use Markdown formatting. Do not wrap the JSON in backticks (e.g., ```json or ```). Do not include any introductory or concluding text. 
-
-    Use the exact following JSON structure:
+COMPETENCY_FEEDBACK_PROMPT = buildPrompt(
+    """
+    You are an expert interview analyst. Deduce the job role the candidate is targeting from their answers and, as an interviewer for
+    that role, evaluate the candidate's communication clarity, confidence, and engagement against that role's standards, ignoring any
+    sentences spoken by the interviewer. Give personalized, actionable feedback based on their strengths and weaknesses. If the transcript
+    is empty or very short, score every competency 0 and criticize the lack of participation.
+    """,
+    CompetencyAnalysisResult,
     {
-        "clarity": {
-            "score": Integer 0-10 rating communication clarity,
-            "summary": "[1-2 sentences of actionable feedback speaking directly to the candidate (e.g., 'You communicated clearly, but...').]"
-        },
-        "confidence": {
-            "score": Integer 0-10 rating candidate confidence,
-            "summary": "[1-2 sentences of actionable feedback speaking directly to the candidate advising them on how to improve confidence.]"
-        },
-        "engagement": {
-            "score": Integer 0-10 rating engagement and relevance to the interview context,
-            "summary": "[1-2 sentences of actionable feedback speaking directly to the candidate advising them on how to improve engagement.]"
-        }
-    }
-"""
+        "clarity.score": "0-10 communication clarity",
+        "confidence.score": "0-10 confidence",
+        "engagement.score": "0-10 engagement and relevance to the interview",
+        "clarity.summary": "1-2 sentences of actionable feedback to the candidate",
+        "confidence.summary": "1-2 sentences to the candidate on how to improve their confidence",
+        "engagement.summary": "1-2 sentences to the candidate on how to improve their engagement",
+    },
+)
 
 # FILLER WORD AND HEDGE PHRASE COUNT
-FILLER_HEDGE_COUNT_PROMPT = """
-    You are an expert interview analyst evaluating a candidate's speech patterns. Analyze the provided interview transcript.
-
-    Identify and extract all instances of contextual filler words (e.g., "like", "you know") ONLY when used as disfluencies, NOT when used grammatically correctly. 
-
-    Identify hedge phrases that undermine confidence (e.g., "I guess", "I think maybe", "sort of", "kind of"). Ignore any sentences spoken by the interviewer if any. 
-
-    Provide your response STRICTLY as a raw JSON object. 
-    CRITICAL: Do not use Markdown formatting. Do not wrap the JSON in backticks (e.g., ```json or ```). Do not include any introductory or concluding text. 
-
-    Use the exact following JSON structure:
+FILLER_HEDGE_COUNT_PROMPT = buildPrompt(
+    """
+    You are an expert interview analyst evaluating a candidate's speech patterns, ignoring any sentences spoken by the interviewer. Count
+    contextual filler words (e.g. "like", "you know") ONLY when used as disfluencies, not when used grammatically (e.g. "I like this
+    job"), and hedge phrases that undermine confidence (e.g. "I guess", "I think maybe", "sort of", "kind of").
+    """,
+    FillerHedgeResponse,
     {
-        "filler_count": Integer representing the total number of contextual fillers,
-        "hedge_count": Integer representing the total number of hedge phrases,
-        "most_frequent": [
-            "[String of the #1 most used phrase]", 
-            "[String of the #2 most used phrase]"
-        ]
-    }
-"""
-
-# FINAL OVERALL FEEDBACK
-OVERALL_FEEDBACK_PROMPT = """
-    You are an expert career coach and interview evaluator. 
-    FIRST: Analyze the interview transcript and deduce the specific job role or industry the candidate is targeting based on the context of their answers and assume the posiition as an interviewer specialized for that role.
-    SECOND: Analyze the interview transcript and evaluate the candidate's interview performance and provided quantitative speech metrics (Words Per Minute and Filler Word Count). If the user didn't say much in their transcript or their transcript is empty, give them a 0 in their overall score and criticize them within your feedback because of a lack of participation.
-
-    Evaluation Criteria:
-    1. Content Quality & Role Fit: Evaluate the transcript for clarity, structure (e.g., use of the STAR method), relevance to the questions, how well the candidate demonstrated the specific hard and soft skills expected of the inferred role, and the overall strength of the answers. Ignore any sentences spoken by the interviewer if any.
-    2. Words Per Minute (WPM): Assess their pacing. A clear, conversational pace is 120-160 WPM. Penalize the score slightly if they speak too fast (nervous rushing) or too slow (hesitant).
-    3. Filler Words: High filler word counts (e.g., ums, uhs, likes) detract from confidence. Address this in your feedback if the count is high.
-
-    Provide your response STRICTLY as a raw JSON object. 
-    CRITICAL: Do not use Markdown formatting. Do not wrap the JSON in backticks (e.g., ```json or ```). Do not include any introductory or concluding text.
-
-    Use the exact following JSON structure:
+        "filler_count": "total contextual fillers",
+        "hedge_count": "total hedge phrases",
+        "most_frequent": "the most used fillers and hedges, most used first",
+    },
+)
+
+# FINAL OVERALL FEEDBACK (built from the other stages' results, see ml_tasks.summarize_upstream_results)
+OVERALL_FEEDBACK_PROMPT = buildPrompt(
+    """
+    You are an expert career coach and interview evaluator. You are given the results of analyzing a candidate's interview: each
+    competency's score and summary, the sentiment of their sentences, their speech metrics, and possibly an excerpt of their answers.
+    Deduce the job role the candidate is targeting and, as an interviewer for that role, evaluate their overall performance from these
+    results. A conversational pace is 120-160 words per minute, penalize slightly if faster (rushing) or slower (hesitant). Many filler
+    words, hedge phrases, or long pauses detract from confidence. If the results show little or no participation (e.g. scores of 0 or
+    no answers), score 0 and criticize the lack of participation.
+    """,
+    OverallAnalysisResponse,
     {
-        "overall_feedback": "[3-4 sentences of highly personalized, actionable feedback speaking directly to the candidate (e.g., 'You provided strong technical examples, but...'). Give specific techniques to improve their speech metrics (e.g., 'Take a one-second pause instead of saying um'), and explicitly summarize their readiness for the inferred role based on their answers.]",
-        "overall_score": Integer between 0 and 100 reflecting combined content and speech metrics
-    }
-"""
\ No newline at end of file
+        "overall_feedback": "3-4 sentences of personalized, actionable feedback to the candidate, with specific techniques to improve their speech metrics (e.g. 'Take a one-second pause instead of saying um') and their readiness for the role",
+        "overall_score": "0-100 combining the competencies and speech metrics",
+    },
+)
+
+# task -> (system prompt, response model), used to report each task's prompt size
+TASK_PROMPTS = {
+    "sentiment": (SENTIMENT_ANALYSIS_PROMPT, SentimentAnalysisResult),
+    "star": (STAR_ANSWER_PROMPT, StarAnswerEvaluation),
+    "competency": (COMPETENCY_FEEDBACK_PROMPT, CompetencyAnalysisResult),
+    "filler_hedge": (FILLER_HEDGE_COUNT_PROMPT, FillerHedgeResponse),
+    "overall": (OVERALL_FEEDBACK_PROMPT, OverallAnalysisResponse),
+}
+
+PROMPT_VERSION = promptVersion(*(prompt for prompt, _ in TASK_PROMPTS.values())) # changes whenever any prompt does
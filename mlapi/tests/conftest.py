@@ -0,0 +1,18 @@
+import pytest
+import fakeredis
+
+
+@pytest.fixture
+def redis_conn():
+    """
+    In-memory Redis (with Lua scripting) standing in for the Redis server, its responses are bytes like the app's connections.
+    """
+    return fakeredis.FakeRedis()
+
+
+@pytest.fixture
+def async_redis_conn():
+    """
+    Asyncio counterpart of redis_conn, for the code the API runs.
+    """
+    return fakeredis.FakeAsyncRedis()
@@ -0,0 +1,83 @@
+import pytest
+from redisStore import circuit_breaker
+from redisStore.circuit_breaker import CircuitOpenError, allow_request, record_success, record_failure, release_probe, get_circuit
+
+
+@pytest.fixture(autouse=True)
+def thresholds(monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "CIRCUIT_FAILURE_THRESHOLD", 2)
+    monkeypatch.setattr(circuit_breaker, "CIRCUIT_OPEN_SECONDS", 30)
+
+
+def open_circuit(redis_conn, opened_ago: float = 0):
+    for _ in range(circuit_breaker.CIRCUIT_FAILURE_THRESHOLD):
+        record_failure("runner", redis_conn)
+    redis_conn.hincrbyfloat(circuit_breaker.CIRCUIT_KEY.format(name="runner"), "opened_at", -opened_ago)
+
+
+def test_closed_circuit_lets_requests_through(redis_conn):
+    assert allow_request("runner", redis_conn) is False # not a probe
+    record_failure("runner", redis_conn)
+    assert allow_request("runner", redis_conn) is False
+    assert get_circuit("runner", redis_conn)["state"] == "closed"
+
+
+def test_consecutive_failures_open_the_circuit(redis_conn):
+    open_circuit(redis_conn)
+    assert get_circuit("runner", redis_conn)["state"] == "open"
+    with pytest.raises(CircuitOpenError) as error:
+        allow_request("runner", redis_conn)
+    assert error.value.retry_at == pytest.approx(get_circuit("runner", redis_conn)["opened_at"] + 30)
+
+
+def test_success_resets_the_failures(redis_conn):
+    record_failure("runner", redis_conn)
+    record_success("runner", redis_conn)
+    record_failure("runner", redis_conn)
+    assert get_circuit("runner", redis_conn) == {"state": "closed", "failures": 1, "opened_at": None}
+
+
+def test_a_single_probe_goes_through_once_the_circuit_has_been_open_long_enough(redis_conn):
+    open_circuit(redis_conn, opened_ago=31)
+    assert allow_request("runner", redis_conn) is True
+    assert get_circuit("runner", redis_conn)["state"] == "half_open"
+    with pytest.raises(CircuitOpenError):
+        allow_request("runner", redis_conn) # the probe is still in flight
+
+    release_probe("runner", redis_conn)
+    assert allow_request("runner", redis_conn) is True
+
+
+def test_probe_outcome_closes_or_reopens_the_circuit(redis_conn):
+    open_circuit(redis_conn, opened_ago=31)
+    allow_request("runner", redis_conn)
+    record_failure("runner", redis_conn)
+    assert get_circuit("runner", redis_conn)["state"] == "open"
+    with pytest.raises(CircuitOpenError):
+        allow_request("runner", redis_conn)
+
+    redis_conn.hincrbyfloat(circuit_breaker.CIRCUIT_KEY.format(name="runner"), "opened_at", -31)
+    allow_request("runner", redis_conn)
+    record_success("runner", redis_conn)
+    assert allow_request("runner", redis_conn) is False
+    assert get_circuit("runner", redis_conn)["state"] == "closed"
+
+
+def test_requests_are_allowed_when_redis_is_down():
+    import fakeredis
+    server = fakeredis.FakeServer()
+    server.connected = False
+    assert allow_request("runner", fakeredis.FakeRedis(server=server)) is False
+
+
+def test_retry_budget(redis_conn, monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "RETRY_BUDGET_MAX", 2)
+    monkeypatch.setattr(circuit_breaker, "RETRY_BUDGET_RATIO", 0.5)
+    assert [circuit_breaker.spend_retry(redis_conn) for _ in range(3)] == [True, True, False]
+    circuit_breaker.earn_retry(redis_conn)
+    assert circuit_breaker.spend_retry(redis_conn) is False
+    circuit_breaker.earn_retry(redis_conn)
+    assert circuit_breaker.spend_retry(redis_conn) is True
+    for _ in range(10):
+        circuit_breaker.earn_retry(redis_conn)
+    assert float(redis_conn.get(circuit_breaker.RETRY_BUDGET_KEY)) == 2
@@ -0,0 +1,79 @@
+import pytest
+from rq.queue import Queue
+from rq.job import JobStatus
+from redisStore import fair_share
+
+
+@pytest.fixture
+def queue(redis_conn, monkeypatch):
+    # nothing is dispatched while the jobs are enqueued, as when the RQ queue is already full
+    monkeypatch.setattr(fair_share, "FAIR_SHARE_WINDOW", 0)
+    return Queue("default", connection=redis_conn)
+
+
+def enqueue(queue, tenant, name, score=None):
+    return fair_share.enqueue(queue, tenant, "builtins.print", name, score=score).id
+
+
+def run_all(queue, monkeypatch) -> list[str]:
+    """
+    Take every job off the RQ queue one at a time the way workers do, topping it up before each one.
+    """
+    monkeypatch.setattr(fair_share, "FAIR_SHARE_WINDOW", 1)
+    order = []
+    while True:
+        fair_share.dispatch(queue)
+        job_id = queue.connection.lpop(queue.key)
+        if job_id is None:
+            return order
+        order.append(job_id.decode())
+
+
+def test_tenants_take_turns(queue, monkeypatch):
+    a1, a2, a3 = (enqueue(queue, "a", name) for name in ("a1", "a2", "a3"))
+    b1 = enqueue(queue, "b", "b1")
+    assert run_all(queue, monkeypatch) == [a1, b1, a2, a3]
+    assert fair_share.pending_count("default", queue.connection) == 0
+    assert queue.connection.llen(fair_share.RING_KEY.format(priority="default")) == 0
+
+
+def test_weight_is_jobs_per_round(queue, monkeypatch):
+    fair_share.set_tenant_weight("a", 2, queue.connection)
+    a1, a2, a3 = (enqueue(queue, "a", name) for name in ("a1", "a2", "a3"))
+    b1, b2 = (enqueue(queue, "b", name) for name in ("b1", "b2"))
+    assert run_all(queue, monkeypatch) == [a1, a2, b1, a3, b2]
+
+
+def test_tenant_jobs_run_in_order_of_score(queue, monkeypatch):
+    late = enqueue(queue, "a", "late", score=10)
+    later = enqueue(queue, "a", "later", score=20)
+    urgent = enqueue(queue, "a", "urgent", score=1)
+    assert run_all(queue, monkeypatch) == [urgent, late, later]
+
+
+def test_held_jobs_are_deferred_until_dispatched(queue, monkeypatch):
+    job_id = enqueue(queue, "a", "held")
+    assert queue.fetch_job(job_id).get_status() == JobStatus.DEFERRED
+    assert queue.deferred_job_registry.get_job_ids() == [job_id]
+
+    monkeypatch.setattr(fair_share, "FAIR_SHARE_WINDOW", 1)
+    assert fair_share.dispatch(queue) == [job_id]
+    assert queue.fetch_job(job_id).get_status() == JobStatus.QUEUED
+    assert queue.deferred_job_registry.get_job_ids() == []
+    assert queue.job_ids == [job_id]
+
+
+def test_expired_jobs_are_dropped(queue, monkeypatch):
+    expired = enqueue(queue, "a", "expired")
+    kept = enqueue(queue, "a", "kept")
+    queue.connection.delete(queue.job_class.key_for(expired))
+    assert run_all(queue, monkeypatch) == [kept]
+    assert fair_share.pending_count("default", queue.connection) == 0
+
+
+def test_dispatch_stops_at_the_window(queue, monkeypatch):
+    monkeypatch.setattr(fair_share, "FAIR_SHARE_WINDOW", 2)
+    a0, b0, *_ = (enqueue(queue, tenant, f"{tenant}{i}") for i in range(3) for tenant in ("a", "b"))
+    assert queue.job_ids == [a0, b0]
+    assert fair_share.dispatch(queue) == []
+    assert fair_share.pending_count("default", queue.connection) == 4
@@ -0,0 +1,46 @@
+import pytest
+from rq.queue import Queue
+from rq.worker_registration import WORKERS_BY_QUEUE_KEY
+from redisStore import fair_share
+from redisStore.health import count_workers, queue_health, record_completion, record_recovery
+
+
+def add_worker(redis_conn, name: str, queues: list[str], state: str = "idle"):
+    key = f"rq:worker:{name}"
+    if state is not None:
+        redis_conn.hset(key, "state", state)
+    for queue in queues:
+        redis_conn.sadd(WORKERS_BY_QUEUE_KEY % queue, key)
+
+
+def test_workers_of_several_queues_are_counted_once(redis_conn):
+    add_worker(redis_conn, "both", ["high", "default"])
+    add_worker(redis_conn, "high", ["high"], state="busy")
+    add_worker(redis_conn, "dead", ["default"], state=None) # registered, but its key expired
+    assert count_workers(redis_conn) == 2
+    assert count_workers(redis_conn, ["default"]) == 1
+
+
+def test_queue_health(redis_conn, monkeypatch):
+    monkeypatch.setattr(fair_share, "FAIR_SHARE_WINDOW", 1)
+    queue = Queue("default", connection=redis_conn)
+    queue.enqueue("builtins.print", "waiting")
+    fair_share.enqueue(queue, "user", "builtins.print", "held")
+    add_worker(redis_conn, "idle", ["default"])
+    add_worker(redis_conn, "busy", ["default"], state="busy")
+    for _ in range(3):
+        record_completion("default", redis_conn)
+    record_recovery("default", 4, redis_conn)
+    record_recovery("default", 2, redis_conn)
+
+    report = {queue["queue"]: queue for queue in queue_health(redis_conn, ["high", "default"])["queues"]}
+    default = report["default"]
+    assert (default["depth"], default["fair_share_pending"], default["deferred"]) == (1, 1, 0)
+    assert default["oldest_job_age"] == pytest.approx(0, abs=5)
+    assert (default["workers"], default["busy_workers"], default["utilization"]) == (2, 1, 0.5)
+    assert default["throughput_per_minute"] > 0
+    assert (default["requeued"], default["mean_recovery_seconds"]) == (2, 3)
+
+    high = report["high"]
+    assert (high["depth"], high["fair_share_pending"], high["workers"], high["oldest_job_age"]) == (0, 0, 0, None)
+    assert (high["throughput_per_minute"], high["mean_recovery_seconds"]) == (0, None)
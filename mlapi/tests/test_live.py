@@ -0,0 +1,62 @@
+import asyncio
+import pytest
+from schemas import LiveTurn
+from services.live import LIVE_SESSION_TTL, LiveSessionOwnerError, ingest_turns, live_keys
+
+TRANSCRIPT = [
+    "Interviewer: Tell me about yourself.",
+    "Candidate: I build things.",
+    "Candidate: Mostly APIs.",
+    "Interviewer: Why this role?",
+    "Candidate: It's a good fit.",
+    "Interviewer: Thanks!",
+]
+
+
+def send(redis_conn, seqs: list[int], user_id: str = "user", transcript: list[str] = TRANSCRIPT):
+    turns = [LiveTurn(seq=seq, text=transcript[seq]) for seq in seqs]
+    return asyncio.run(ingest_turns(user_id, "interview", turns, redis_conn))
+
+
+def test_answers_are_claimed_once_the_interviewer_speaks_again(async_redis_conn):
+    index, claimed = send(async_redis_conn, [0, 1, 2])
+    assert (len(index.speakers), claimed) == (3, []) # the candidate may still be answering
+
+    index, claimed = send(async_redis_conn, [3, 4])
+    assert (len(index.speakers), claimed) == (5, [0])
+    index, claimed = send(async_redis_conn, [5])
+    assert claimed == [1]
+
+
+def test_answers_are_claimed_exactly_once(async_redis_conn):
+    assert send(async_redis_conn, [0, 1, 2, 3])[1] == [0]
+    assert send(async_redis_conn, [0, 1, 2, 3])[1] == [] # retried request
+    assert send(async_redis_conn, [4])[1] == []
+
+
+def test_turns_after_a_missing_one_wait_for_it(async_redis_conn):
+    index, claimed = send(async_redis_conn, [0, 1, 3, 4, 5])
+    assert (len(index.speakers), claimed) == (2, [])
+    index, claimed = send(async_redis_conn, [2])
+    assert (len(index.speakers), claimed) == (6, [0, 1])
+
+
+def test_turns_that_were_already_received_are_kept(async_redis_conn):
+    send(async_redis_conn, [0, 1])
+    edited = TRANSCRIPT[:1] + ["Candidate: Something else."] + TRANSCRIPT[2:]
+    index, claimed = send(async_redis_conn, [1, 2, 3], transcript=edited)
+    assert claimed == [0]
+    assert "Something else" not in index.text
+
+
+def test_session_keys_expire(async_redis_conn):
+    send(async_redis_conn, [0, 1, 2, 3])
+    owner_key, turns_key, claimed_key, _ = live_keys("interview")
+    for key in (owner_key, turns_key, claimed_key):
+        assert 0 < asyncio.run(async_redis_conn.ttl(key)) <= LIVE_SESSION_TTL
+
+
+def test_interview_belongs_to_the_user_who_started_it(async_redis_conn):
+    send(async_redis_conn, [0])
+    with pytest.raises(LiveSessionOwnerError):
+        send(async_redis_conn, [1], user_id="someone else")
@@ -0,0 +1,54 @@
+import time
+import pytest
+import fakeredis
+from redisStore import llm_slots
+from redisStore.llm_slots import SLOT_KEY, SlotWaitTimeoutError, lease_slot
+
+
+@pytest.fixture(autouse=True)
+def short_leases(monkeypatch):
+    monkeypatch.setattr(llm_slots, "LLM_SLOT_LEASE_SECONDS", 3)
+    monkeypatch.setattr(llm_slots, "LLM_SLOT_WAIT_TIMEOUT", 0.3)
+
+
+def test_preferred_slot_is_leased_when_free(redis_conn):
+    with lease_slot("runner", 4, 2, redis_conn) as slot:
+        assert slot == 2
+        assert redis_conn.exists(SLOT_KEY.format(name="runner", slot=2))
+    assert not redis_conn.exists(SLOT_KEY.format(name="runner", slot=2))
+
+
+def test_next_free_slot_is_leased_when_preferred_is_taken(redis_conn):
+    with lease_slot("runner", 3, 2, redis_conn) as first, lease_slot("runner", 3, 2, redis_conn) as second:
+        with lease_slot("runner", 3, 2, redis_conn) as third:
+            assert (first, second, third) == (2, 0, 1)
+
+
+def test_waiting_for_a_slot_times_out(redis_conn):
+    with lease_slot("runner", 1, 0, redis_conn):
+        started = time.monotonic()
+        with pytest.raises(SlotWaitTimeoutError):
+            with lease_slot("runner", 1, 0, redis_conn):
+                pass
+        assert time.monotonic() - started >= 0.3
+
+
+def test_lease_is_refreshed_while_in_flight(redis_conn):
+    key = SLOT_KEY.format(name="runner", slot=0)
+    with lease_slot("runner", 1, 0, redis_conn):
+        time.sleep(1.5) # past the first refresh at a third of the lease
+        assert redis_conn.pttl(key) > 2000 # about 1500 without it
+
+
+def test_expired_lease_is_not_released_by_its_old_holder(redis_conn):
+    key = SLOT_KEY.format(name="runner", slot=0)
+    with lease_slot("runner", 1, 0, redis_conn):
+        redis_conn.set(key, "another lease") # the lease expired and another request took the slot
+    assert redis_conn.get(key) == b"another lease"
+
+
+def test_requests_go_to_their_preferred_slot_when_redis_is_down():
+    server = fakeredis.FakeServer()
+    server.connected = False
+    with lease_slot("runner", 4, 3, fakeredis.FakeRedis(server=server)) as slot:
+        assert slot == 3
@@ -0,0 +1,55 @@
+import time
+import pytest
+from rq.job import JobStatus
+from redisStore.queue import SLACK_KEY, SlackQueue
+from redisStore.worker import AnalysisJob, AnalysisWorker
+
+
+@pytest.fixture
+def queue(redis_conn):
+    return SlackQueue("default", connection=redis_conn)
+
+
+def enqueue(queue, name, deadline_in=None, **options):
+    meta = {"deadline": time.time() + deadline_in} if deadline_in is not None else None
+    job = queue.enqueue("builtins.print", name, meta=meta, **options)
+    return job.id
+
+
+def test_jobs_are_ordered_by_slack(queue):
+    relaxed = enqueue(queue, "relaxed", 3600)
+    no_deadline = enqueue(queue, "no deadline")
+    urgent = enqueue(queue, "urgent", 600)
+    also_urgent = enqueue(queue, "also urgent", 600)
+    most_urgent = enqueue(queue, "most urgent", 300)
+    assert queue.job_ids == [most_urgent, urgent, also_urgent, relaxed, no_deadline]
+
+
+def test_released_dependents_are_ordered_by_slack(queue):
+    relaxed = enqueue(queue, "relaxed", 3600)
+    parent = enqueue(queue, "parent")
+    dependent = enqueue(queue, "dependent", 300, depends_on=parent)
+    assert queue.fetch_job(dependent).get_status() == JobStatus.DEFERRED
+
+    queue.connection.lrem(queue.key, 0, parent)
+    job = queue.fetch_job(parent)
+    job.set_status(JobStatus.FINISHED)
+    queue.enqueue_dependents(job)
+    assert queue.job_ids == [dependent, relaxed]
+
+
+def test_jobs_no_longer_on_the_queue_are_skipped(queue):
+    dequeued = enqueue(queue, "dequeued", 3600)
+    queue.connection.lrem(queue.key, 0, dequeued) # e.g. taken by a worker that didn't clean up the slack order
+    urgent = enqueue(queue, "urgent", 300)
+    assert queue.job_ids == [urgent]
+    assert queue.connection.zscore(SLACK_KEY.format(priority="default"), dequeued) is None
+
+
+def test_workers_remove_dequeued_jobs_from_the_slack_order(queue):
+    urgent = enqueue(queue, "urgent", 300)
+    enqueue(queue, "relaxed", 3600)
+    worker = AnalysisWorker([queue.name], connection=queue.connection, job_class=AnalysisJob, queue_class=SlackQueue)
+    job, _ = worker.dequeue_job_and_maintain_ttl(1)
+    assert job.id == urgent
+    assert queue.connection.zcard(SLACK_KEY.format(priority="default")) == 1
@@ -0,0 +1,60 @@
+import random
+import pytest
+from schemas.interview import SpeechTimings
+from utils.speech_metrics import computeSpeechMetrics, computeSpeechMetricsBatch
+
+
+def timings(words: list[tuple[int, int, int]]) -> SpeechTimings:
+    """
+    Word timestamps from (start, end, answer) tuples.
+    """
+    starts, ends, answers = (list(column) for column in zip(*words)) if words else ([], [], [])
+    return SpeechTimings(starts=starts, ends=ends, answers=answers)
+
+
+# two answers: 3 words over 2.5s with a 1.1s pause, then 2 words over 3.5s with a 2.7s pause
+INTERVIEW = timings([(0, 400, 0), (500, 900, 0), (2000, 2500, 0), (5000, 5300, 1), (8000, 8500, 1)])
+
+
+def test_metrics_of_an_interview():
+    metrics = computeSpeechMetrics(INTERVIEW)
+    assert (metrics.wpm, metrics.speaking_seconds) == (50, 6.0) # silence between answers isn't speaking time
+    assert (metrics.rate_timeline, metrics.timeline_bucket_seconds) == ([10], 30)
+    assert (metrics.pause_count, metrics.long_pause_count) == (2, 1) # the 100ms gap is part of normal speech
+    assert (metrics.pause_median_ms, metrics.pause_p90_ms) == (1100, 1100)
+    assert metrics.pause_histogram == [0, 0, 1, 1]
+    assert (metrics.answer_count, metrics.answer_words_mean, metrics.answer_words_median, metrics.answer_words_max) == (2, 2.5, 2.0, 3)
+    assert (metrics.answer_seconds_mean, metrics.answer_seconds_max) == (3.0, 3.5)
+
+
+def test_metrics_of_an_interview_without_words():
+    metrics = computeSpeechMetrics(timings([]))
+    assert (metrics.wpm, metrics.speaking_seconds, metrics.rate_timeline) == (0, 0.0, [])
+    assert (metrics.pause_count, metrics.pause_median_ms, metrics.pause_p90_ms, metrics.pause_histogram) == (0, None, None, [0, 0, 0, 0])
+    assert (metrics.answer_count, metrics.answer_words_mean, metrics.answer_words_max) == (0, 0.0, 0)
+
+
+def test_timeline_counts_the_words_started_in_each_window():
+    metrics = computeSpeechMetrics(timings([(0, 100, 0), (31_000, 31_200, 0), (32_000, 32_200, 0), (95_000, 95_100, 1)]))
+    assert metrics.rate_timeline == [2, 4, 0, 2]
+
+
+def test_batch_matches_each_interview_on_its_own():
+    rng = random.Random(0)
+    batch = [INTERVIEW, timings([])]
+    for _ in range(20):
+        words, clock = [], rng.randrange(0, 10_000)
+        for answer in range(rng.randrange(0, 4)):
+            for _ in range(rng.randrange(1, 30)):
+                start = clock + rng.randrange(0, 3000)
+                clock = start + rng.randrange(50, 800)
+                words.append((start, clock, answer))
+            clock += 5000
+        batch.append(timings(words))
+    assert computeSpeechMetricsBatch(batch) == [computeSpeechMetrics(interview) for interview in batch]
+    assert computeSpeechMetricsBatch([]) == []
+
+
+def test_timestamps_must_be_parallel():
+    with pytest.raises(ValueError):
+        computeSpeechMetricsBatch([SpeechTimings.model_construct(starts=[0, 100], ends=[50], answers=[0, 0])])
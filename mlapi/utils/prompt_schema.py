@@ -0,0 +1,71 @@
+"""
+Helper functions to build compact LLM prompts from the response models' JSON schemas
+
+Structured output decoding already forces the response to be raw JSON of the right shape, so prompts don't need JSON examples or
+formatting warnings. They only describe what each field should contain, in one short line per field generated from the schema.
+"""
+import hashlib
+from pydantic import BaseModel
+
+def resolveSchema(schema: dict, defs: dict) -> dict:
+    """
+    Follows a schema's $ref to its definition, if it has one.
+    """
+    while "$ref" in schema:
+        schema = defs[schema["$ref"].split("/")[-1]]
+    return schema
+
+def describeFields(schema: dict, defs: dict, hints: dict[str, str], path: str = "", depth: int = 0) -> list[str]:
+    """
+    Describes every field of an object schema, recursing into nested objects and lists of objects.
+
+    - **schema**: (dict) JSON schema of the object
+    - **defs**: (dict) The root schema's $defs
+    - **hints**: (dict[str, str]) What each field should contain, by dotted path (e.g. "clarity.score"); items of lists share the
+    list's path
+    - **path**: (str) Dotted path of the object
+    - **depth**: (int) Nesting depth, used to indent nested fields
+
+    Returns one line per field.
+    """
+    lines = []
+    for name, field in schema.get("properties", {}).items():
+        fieldPath = f"{path}.{name}" if path else name
+        field = resolveSchema(field, defs)
+        items = resolveSchema(field.get("items", {}), defs) if field.get("type") == "array" else None
+
+        if "enum" in field:
+            kind = "one of " + ", ".join(str(value) for value in field["enum"])
+        elif items is not None:
+            kind = "list of objects" if items.get("type") == "object" else f"list of {items.get('type', 'values')}s"
+        else:
+            kind = field.get("type", "value")
+
+        hint = hints.get(fieldPath)
+        lines.append(f"{'  ' * depth}- {name} ({kind})" + (f": {hint}" if hint else ""))
+
+        if field.get("type") == "object":
+            lines += describeFields(field, defs, hints, fieldPath, depth + 1)
+        elif items is not None and items.get("type") == "object":
+            lines += describeFields(items, defs, hints, fieldPath, depth + 1)
+    return lines
+
+def buildPrompt(instructions: str, responseModel: type[BaseModel], hints: dict[str, str]) -> str:
+    """
+    Builds a system prompt from a task's instructions and a compact description of its response model's fields.
+
+    - **instructions**: (str) What the LLM should do, without any description of the response format
+    - **responseModel**: (type[BaseModel]) Schema the response must follow
+    - **hints**: (dict[str, str]) What each field should contain, by dotted path, see describeFields
+
+    Returns the system prompt.
+    """
+    schema = responseModel.model_json_schema()
+    fields = describeFields(schema, schema.get("$defs", {}), hints)
+    return " ".join(instructions.split()) + "\nRespond with JSON:\n" + "\n".join(fields)
+
+def promptVersion(*prompts: str) -> str:
+    """
+    Short hash identifying the text of one or more prompts, changes whenever any of them does.
+    """
+    return hashlib.sha1("\0".join(prompts).encode()).hexdigest()[:12]
@@ -0,0 +1,133 @@
+"""
+Helper functions to compute speech-rate and pacing metrics from the candidate's word timestamps
+
+Every interview's words are concatenated into flat NumPy arrays and every metric is computed with grouped array operations
+(bincount, reduceat, lexsort) instead of Python loops, so a batch of thousands of interviews is processed in a single pass.
+"""
+import numpy as np
+from schemas.interview import SpeechTimings, SpeechMetrics
+
+TIMELINE_BUCKET_SECONDS = 30 # width of each window of the speaking-rate timeline
+MIN_PAUSE_MS = 250 # shorter silences between words are part of normal speech
+LONG_PAUSE_MS = 2000 # pauses at least this long are counted as long pauses
+PAUSE_HISTOGRAM_EDGES_MS = [MIN_PAUSE_MS, 500, 1000, LONG_PAUSE_MS] # lower edge of each pause histogram bin, the last bin is open-ended
+
+def groupQuantile(values: np.ndarray, groups: np.ndarray, groupCount: int, q: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Computes a quantile (nearest rank) of the values of every group in one sort.
+
+    - **values**: (np.ndarray) Values to take the quantile of
+    - **groups**: (np.ndarray) Group of each value, between 0 and groupCount - 1
+    - **groupCount**: (int) Number of groups
+    - **q**: (float) Quantile between 0 and 1, e.g. 0.5 for the median
+
+    Returns the quantile of each group (0 for empty groups) and the number of values in each group.
+    """
+    counts = np.bincount(groups, minlength=groupCount)
+    result = np.zeros(groupCount, dtype=values.dtype)
+    if len(values) == 0:
+        return result, counts
+
+    ordered = values[np.lexsort((values, groups))] # sorted by group, then by value
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    nonEmpty = counts > 0
+    result[nonEmpty] = ordered[offsets[nonEmpty] + np.floor((counts[nonEmpty] - 1) * q).astype(np.int64)]
+    return result, counts
+
+def computeSpeechMetricsBatch(batch: list[SpeechTimings]) -> list[SpeechMetrics]:
+    """
+    Computes the speech metrics of many interviews at once.
+
+    - **batch**: (list[SpeechTimings]) Word timestamps of each interview, in the order the words were spoken
+
+    Returns the speech metrics of each interview, in the same order.
+    """
+    n = len(batch)
+    if n == 0:
+        return []
+
+    lengths = np.array([len(timings.starts) for timings in batch], dtype=np.int64)
+    for timings in batch:
+        if not len(timings.starts) == len(timings.ends) == len(timings.answers):
+            raise ValueError("Word timestamps must have the same number of starts, ends, and answers.")
+
+    # one flat array per field, interview i's words are the ones where interview == i
+    interview = np.repeat(np.arange(n), lengths)
+    starts = np.concatenate([np.asarray(timings.starts, dtype=np.int64) for timings in batch])
+    ends = np.concatenate([np.asarray(timings.ends, dtype=np.int64) for timings in batch])
+    answers = np.concatenate([np.asarray(timings.answers, dtype=np.int64) for timings in batch])
+    ends = np.maximum(ends, starts) # guard against words with a negative duration
+
+    # answers: runs of consecutive words of the same interview and answer
+    firstWord = np.ones(len(starts), dtype=bool)
+    firstWord[1:] = (interview[1:] != interview[:-1]) | (answers[1:] != answers[:-1])
+    firstIndex = np.flatnonzero(firstWord)
+    answer = np.cumsum(firstWord) - 1 # answer of each word
+    answerInterview = interview[firstIndex]
+    answerWords = np.bincount(answer, minlength=len(firstIndex)) if len(firstIndex) else np.zeros(0, dtype=np.int64)
+    answerMs = (np.maximum.reduceat(ends, firstIndex) - starts[firstIndex]) if len(firstIndex) else np.zeros(0, dtype=np.int64)
+
+    # speaking rate
+    words = np.bincount(interview, minlength=n)
+    speakingMs = np.bincount(answerInterview, weights=answerMs, minlength=n)
+    wpm = np.divide(words * 60000, speakingMs, out=np.zeros(n), where=speakingMs > 0)
+
+    # answer lengths
+    answerCount = np.bincount(answerInterview, minlength=n)
+    hasAnswers = answerCount > 0
+    answerWordsMean = np.divide(np.bincount(answerInterview, weights=answerWords, minlength=n), answerCount, out=np.zeros(n), where=hasAnswers)
+    answerSecondsMean = np.divide(speakingMs / 1000, answerCount, out=np.zeros(n), where=hasAnswers)
+    answerWordsMedian, _ = groupQuantile(answerWords.astype(np.float64), answerInterview, n, 0.5)
+    answerWordsMax = np.zeros(n, dtype=np.int64)
+    answerMsMax = np.zeros(n, dtype=np.int64)
+    if len(firstIndex):
+        firstAnswer = np.flatnonzero(np.concatenate(([True], answerInterview[1:] != answerInterview[:-1])))
+        answerWordsMax[answerInterview[firstAnswer]] = np.maximum.reduceat(answerWords, firstAnswer)
+        answerMsMax[answerInterview[firstAnswer]] = np.maximum.reduceat(answerMs, firstAnswer)
+
+    # pauses: silences between consecutive words of the same answer
+    gaps = starts[1:] - ends[:-1]
+    isPause = ~firstWord[1:] & (gaps >= MIN_PAUSE_MS)
+    pauses = gaps[isPause]
+    pauseInterview = interview[1:][isPause]
+    pauseMedian, pauseCount = groupQuantile(pauses, pauseInterview, n, 0.5)
+    pauseP90, _ = groupQuantile(pauses, pauseInterview, n, 0.9)
+    longPauseCount = np.bincount(pauseInterview, weights=pauses >= LONG_PAUSE_MS, minlength=n).astype(np.int64)
+    bins = len(PAUSE_HISTOGRAM_EDGES_MS)
+    pauseBin = np.searchsorted(PAUSE_HISTOGRAM_EDGES_MS, pauses, side="right") - 1
+    pauseHistogram = np.bincount(pauseInterview * bins + pauseBin, minlength=n * bins).reshape(n, bins)
+
+    # speaking-rate timeline: words started in each window, scaled to words per minute
+    bucketMs = TIMELINE_BUCKET_SECONDS * 1000
+    bucket = starts // bucketMs
+    bucketCounts = np.zeros(n, dtype=np.int64) # windows in each interview's timeline, up to its last word
+    np.maximum.at(bucketCounts, interview, bucket + 1)
+    bucketOffsets = np.concatenate(([0], np.cumsum(bucketCounts)))
+    timeline = np.bincount(bucketOffsets[interview] + bucket, minlength=bucketOffsets[-1]) * (60 / TIMELINE_BUCKET_SECONDS)
+
+    return [
+        SpeechMetrics(
+            wpm=round(float(wpm[i])),
+            speaking_seconds=round(float(speakingMs[i]) / 1000, 1),
+            rate_timeline=np.rint(timeline[bucketOffsets[i]:bucketOffsets[i + 1]]).astype(np.int64).tolist(),
+            timeline_bucket_seconds=TIMELINE_BUCKET_SECONDS,
+            pause_count=int(pauseCount[i]),
+            long_pause_count=int(longPauseCount[i]),
+            pause_median_ms=int(pauseMedian[i]) if pauseCount[i] else None,
+            pause_p90_ms=int(pauseP90[i]) if pauseCount[i] else None,
+            pause_histogram=pauseHistogram[i].tolist(),
+            answer_count=int(answerCount[i]),
+            answer_words_mean=round(float(answerWordsMean[i]), 1),
+            answer_words_median=float(answerWordsMedian[i]),
+            answer_words_max=int(answerWordsMax[i]),
+            answer_seconds_mean=round(float(answerSecondsMean[i]), 1),
+            answer_seconds_max=round(float(answerMsMax[i]) / 1000, 1),
+        )
+        for i in range(n)
+    ]
+
+def computeSpeechMetrics(timings: SpeechTimings) -> SpeechMetrics:
+    """
+    Computes the speech metrics of a single interview, see computeSpeechMetricsBatch.
+    """
+    return computeSpeechMetricsBatch([timings])[0]
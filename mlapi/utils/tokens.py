@@ -0,0 +1,130 @@
+"""
+Helper functions to estimate token counts and size the output budget (max_tokens) of LLM requests
+
+The local runner's tokenizer isn't available in the workers, so token counts are estimated from the number of characters using a
+characters-per-token ratio that's calibrated against the prompt token counts the runner reports (see services.llm_client).
+"""
+import os
+import re
+from pydantic import BaseModel
+from dotenv import load_dotenv
+
+load_dotenv() # load environment variables
+
+CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", 8192)) # context window of the model, shared by the prompt and the response
+DEFAULT_CHARS_PER_TOKEN = float(os.getenv("LLM_CHARS_PER_TOKEN", 3.5)) # ratio used until it's been calibrated, low so prompts are overestimated
+MESSAGE_OVERHEAD_TOKENS = 8 # tokens the chat template adds around each message
+SAFETY_MARGIN = 1.1 # estimates are inflated by this factor since a prompt that overflows fails the whole request
+TRUNCATION_RETRY_FACTOR = 3 # a response cut off at its output budget is requested again once with this many times the budget
+
+# expected size of each response model's output: fixed tokens plus tokens per token of input (for outputs that repeat or grow with
+# the input, e.g. the sentiment of every sentence), models that aren't listed get DEFAULT_OUTPUT_BUDGET
+OUTPUT_BUDGETS = {
+    "SentimentAnalysisResult": (128, 1.6), # every sentence is repeated with its sentiment and confidence
+    "FillerHedgeResponse": (160, 0.0),
+    "CompetencyAnalysisResult": (640, 0.0),
+    "StarAnswerEvaluation": (640, 0.0),
+    "OverallAnalysisResponse": (640, 0.0),
+}
+DEFAULT_OUTPUT_BUDGET = (1024, 0.0)
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+class PromptTooLongError(ValueError):
+    """
+    Raised when a prompt and its expected response don't fit in the model's context window.
+    """
+
+class ResponseTruncatedError(ValueError):
+    """
+    Raised when a response is cut off at its output budget even after it was requested again with a larger budget. Retrying the job
+    would fail the same way.
+    """
+
+def estimateTokens(text: str, charsPerToken: float = DEFAULT_CHARS_PER_TOKEN) -> int:
+    """
+    Estimates the number of tokens of a text.
+
+    - **text**: (str) Text to estimate
+    - **charsPerToken**: (float) Calibrated characters per token of the model
+
+    Returns the estimated number of tokens, rounded up.
+    """
+    return int(len(text) / charsPerToken * SAFETY_MARGIN) + 1
+
+def estimateMessagesTokens(messages: list[dict], charsPerToken: float = DEFAULT_CHARS_PER_TOKEN) -> int:
+    """
+    Estimates the number of prompt tokens of chat messages, including the chat template around each message.
+    """
+    return sum(estimateTokens(message["content"], charsPerToken) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+def getMaxTokens(responseModel: type[BaseModel], inputTokens: int, promptTokens: int) -> int:
+    """
+    Computes the output budget of a request from the response model's expected size.
+
+    - **responseModel**: (type[BaseModel]) Schema the response must follow
+    - **inputTokens**: (int) Estimated tokens of the text being analyzed (e.g. the transcript), without the instructions
+    - **promptTokens**: (int) Estimated tokens of the whole prompt
+
+    Returns max_tokens for the request. Raises PromptTooLongError if the prompt leaves no room for the expected response.
+    """
+    fixed, perInputToken = OUTPUT_BUDGETS.get(responseModel.__name__, DEFAULT_OUTPUT_BUDGET)
+    expected = int(fixed + perInputToken * inputTokens)
+    available = CONTEXT_TOKENS - promptTokens
+    if available < expected:
+        raise PromptTooLongError(f"Prompt of ~{promptTokens} tokens leaves {available} of the {CONTEXT_TOKENS} tokens of context for a {responseModel.__name__} response that needs ~{expected}.")
+    return expected
+
+def getRetryMaxTokens(maxTokens: int, promptTokens: int) -> int:
+    """
+    Computes the larger output budget a response that was cut off is requested again with.
+
+    - **maxTokens**: (int) Output budget the response was cut off at
+    - **promptTokens**: (int) Estimated tokens of the whole prompt
+
+    Returns max_tokens for the new request, within the context window (at most maxTokens when there's no room for more).
+    """
+    return max(maxTokens, min(maxTokens * TRUNCATION_RETRY_FACTOR, CONTEXT_TOKENS - promptTokens))
+
+def getMaxInputTokens(responseModel: type[BaseModel], instructionTokens: int) -> int:
+    """
+    Computes how many tokens of input fit in a single request along with its instructions and expected response, used to chunk
+    inputs that are too long.
+
+    - **responseModel**: (type[BaseModel]) Schema the response must follow
+    - **instructionTokens**: (int) Estimated tokens of the prompt without the input (e.g. the system prompt)
+    """
+    fixed, perInputToken = OUTPUT_BUDGETS.get(responseModel.__name__, DEFAULT_OUTPUT_BUDGET)
+    return max(0, int((CONTEXT_TOKENS - instructionTokens - fixed - MESSAGE_OVERHEAD_TOKENS) / (1 + perInputToken)))
+
+def splitText(text: str, maxTokens: int, charsPerToken: float = DEFAULT_CHARS_PER_TOKEN) -> list[str]:
+    """
+    Splits a text into chunks of at most maxTokens estimated tokens, at sentence boundaries when possible.
+
+    - **text**: (str) Text to split
+    - **maxTokens**: (int) Most estimated tokens per chunk
+    - **charsPerToken**: (float) Calibrated characters per token of the model
+
+    Returns the chunks, a single chunk when the text already fits.
+    """
+    if estimateTokens(text, charsPerToken) <= maxTokens:
+        return [text]
+
+    maxChars = max(1, int(maxTokens * charsPerToken / SAFETY_MARGIN))
+    chunks, current = [], ""
+    for sentence in SENTENCE_END.split(text):
+        # sentences longer than a chunk are cut at the chunk size
+        while len(sentence) > maxChars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(sentence[:maxChars])
+            sentence = sentence[maxChars:]
+        if current and len(current) + 1 + len(sentence) > maxChars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
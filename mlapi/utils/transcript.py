@@ -2,24 +2,147 @@
 Helper functions related to modifying an interview transcript
 """
 import re
+from schemas.interview import Speaker, TurnIndex
 
-def extractUserTranscript(transcript: str, username: str) -> str:
+TURN_INDEX_VERSION = 1 # bump when parseTranscript changes so stored indexes are rebuilt
+
+# a speaker label is a short name followed by a colon at the start of a line, e.g. "Interviewer: ..." or "Alex Smith: ..."
+SPEAKER_LABEL = re.compile(r"^\s*([^:\n]{1,40}?)\s*:\s*(.*)$")
+MAX_LABEL_WORDS = 4 # longer "labels" are sentences that happen to contain a colon
+INTERVIEWER_LABELS = {"interviewer"} # labels (lowercase) of the avatar's lines, every other speaker is the candidate
+
+def parseTranscript(transcript: str | list[str] | None) -> TurnIndex:
     """
-    Takes a full interview's transcript and extracts the lines spoken by the user.
+    Parses an interview transcript into its speaker-turn index. Each line of the transcript is a turn in the form of '<speaker>: <text>'
+    (as written by the app); lines without a speaker label continue the previous turn. Any speaker other than the interviewer is the
+    candidate so turns aren't missed when the user's name is formatted differently than in their profile.
+
+    - **transcript**: (str | list[str]) Full interview transcript, either a single string or a list of dialogues
 
-    - **transcript**: (str) Full interview transcript
-    - **username**: (str) Speaker's name
+    Returns the turn index, see schemas.TurnIndex.
     """
+    if isinstance(transcript, list):
+        transcript = "\n".join(transcript)
+
+    # group lines into (speaker, text) turns
+    turns = []
+    for line in (transcript or "").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        match = SPEAKER_LABEL.match(line)
+        if match and len(match.group(1).split()) <= MAX_LABEL_WORDS:
+            label, text = match.groups()
+            speaker = Speaker.INTERVIEWER if " ".join(label.lower().split()) in INTERVIEWER_LABELS else Speaker.CANDIDATE
+            if text:
+                turns.append((speaker, text))
+        elif turns:
+            turns[-1] = (turns[-1][0], f"{turns[-1][1]} {line}")
+        else:
+            turns.append((Speaker.CANDIDATE, line)) # unlabeled transcript, assume it's the candidate talking
+
+    texts, speakers, starts, ends, words = [], [], [], [], []
+    offset = 0
+    for speaker, text in turns:
+        speakers.append(speaker)
+        starts.append(offset)
+        ends.append(offset + len(text))
+        words.append(len(text.split()))
+        texts.append(text)
+        offset += len(text) + 1 # turns are separated by a newline
 
-    #  extract user sentences from transcript
-    # userLines = transcript.split(/\n+/).filter((line) => line.startsWith(name))
-    transcript = transcript.strip()
-    sentences = re.split(r"\n+", transcript) # each sentence is separated by a newline character
-    userLines = [line for line in sentences if line.startswith(username.strip())]
+    # pair every run of interviewer turns with the run of candidate turns that follows it
+    question_starts, answer_starts, answer_ends = [], [], []
+    i = 0
+    while i < len(turns):
+        question_start = i
+        while i < len(turns) and speakers[i] == Speaker.INTERVIEWER:
+            i += 1
+        answer_start = i
+        while i < len(turns) and speakers[i] == Speaker.CANDIDATE:
+            i += 1
+        if i > answer_start: # questions the candidate didn't answer (e.g. the closing remarks) aren't paired
+            question_starts.append(question_start)
+            answer_starts.append(answer_start)
+            answer_ends.append(i)
+
+    return TurnIndex(
+        version=TURN_INDEX_VERSION,
+        text="\n".join(texts),
+        speakers=speakers,
+        starts=starts,
+        ends=ends,
+        words=words,
+        question_starts=question_starts,
+        answer_starts=answer_starts,
+        answer_ends=answer_ends,
+    )
+
+def turnRangeText(index: TurnIndex, start: int, end: int) -> str:
+    """
+    Returns the text of turns start to end (exclusive) in a single slice, turns are separated by newlines.
+    """
+    if start >= end:
+        return ""
+    return index.text[index.starts[start]:index.ends[end - 1]]
+
+def questionText(index: TurnIndex, question: int) -> str:
+    """
+    Returns the interviewer's text of a question (empty if the candidate spoke before any question).
+    """
+    return turnRangeText(index, index.question_starts[question], index.answer_starts[question])
+
+def answerText(index: TurnIndex, question: int) -> str:
+    """
+    Returns the candidate's answer to a question.
+    """
+    return turnRangeText(index, index.answer_starts[question], index.answer_ends[question])
+
+def candidateText(index: TurnIndex) -> str:
+    """
+    Returns every line spoken by the candidate combined into a single string (replaces extracting the user's lines by their name).
+    """
+    return " ".join(index.text[start:end] for speaker, start, end in zip(index.speakers, index.starts, index.ends) if speaker == Speaker.CANDIDATE)
+
+def candidateWordCount(index: TurnIndex) -> int:
+    """
+    Returns the number of words spoken by the candidate.
+    """
+    return sum(words for speaker, words in zip(index.speakers, index.words) if speaker == Speaker.CANDIDATE)
+
+def excerptText(text: str, maxChars: int) -> str:
+    """
+    Returns the beginning of a text, cut after the last full sentence that fits in maxChars characters (or at maxChars if no sentence
+    ends before it).
+    """
+    if len(text) <= maxChars:
+        return text
+    cut = max(text.rfind(end, 0, maxChars) for end in (". ", "! ", "? "))
+    return text[:cut + 1] if cut > 0 else text[:maxChars]
+
+def formatDialogue(index: TurnIndex) -> str:
+    """
+    Returns the transcript with normalized speaker labels ('Interviewer: ...' and 'Candidate: ...'), one turn per line.
+    """
+    labels = {Speaker.INTERVIEWER: "Interviewer", Speaker.CANDIDATE: "Candidate"}
+    return "\n".join(f"{labels[speaker]}: {index.text[start:end]}" for speaker, start, end in zip(index.speakers, index.starts, index.ends))
+
+# words and phrases counted by countFillerHedges (the LLM's count is preferred since it takes context into account, e.g. "like" isn't always a filler word)
+FILLER_WORDS = ["um", "uh", "uhm", "erm", "er", "ah", "hmm", "you know", "i mean", "basically", "literally"]
+HEDGE_PHRASES = ["i think", "i guess", "i believe", "i feel like", "i'm not sure", "maybe", "probably", "perhaps", "possibly", "sort of", "kind of"]
+
+def countFillerHedges(userText: str) -> tuple[int, int, list[str]]:
+    """
+    Counts filler words and hedge phrases in the user's lines without an LLM. Used when there's no time for the LLM's contextual count.
+
+    - **userText**: (str) Lines spoken by the user, see candidateText
+
+    Returns the filler count, hedge count, and the three phrases used most.
+    """
+    text = userText.lower()
+    counts = {phrase: len(re.findall(rf"\b{re.escape(phrase)}\b", text)) for phrase in FILLER_WORDS + HEDGE_PHRASES}
 
-    # remove the user's name from the transcript (Note: the user's name is in the form of '<name>:' within the transcript)
-    # userText = userLines.map((line) => line.replace(`${name}: `, "")).join(" ")
-    userLines = [line.replace(f"{username}: ", "") for line in userLines]
-    # combine them all into a single string.
-    userText = " ".join(userLines)
-    return userText
\ No newline at end of file
+    fillerCount = sum(counts[phrase] for phrase in FILLER_WORDS)
+    hedgeCount = sum(counts[phrase] for phrase in HEDGE_PHRASES)
+    mostFrequent = [phrase for phrase, count in sorted(counts.items(), key=lambda item: item[1], reverse=True)[:3] if count > 0]
+    return fillerCount, hedgeCount, mostFrequent